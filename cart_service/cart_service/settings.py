@@ -51,6 +51,31 @@ MICROSERVICE_URLS = {
     'CUSTOMER_SERVICE': 'http://localhost:8002/api',
 }
 
+# Shared HTTP client for inter-service calls (see carts/http_client.py)
+HTTP_CLIENT = {
+    'CONNECT_TIMEOUT': 2.0,
+    'READ_TIMEOUT': 5.0,
+    'MAX_RETRIES': 2,
+    'BACKOFF_FACTOR': 0.1,
+    'POOL_CONNECTIONS': 10,
+    'POOL_MAXSIZE': 50,
+    'METRICS_LOG_INTERVAL': 60,  # Per-host call/latency summary in the log
+}
+
+# Product snapshot cache used by add-to-cart (see carts/cache.py).
+# Set BACKEND to an alias from CACHES (e.g. a Redis cache) to share
+# snapshots between worker processes.
+PRODUCT_CACHE = {
+    'MAX_SIZE': 10000,
+    'LOCAL_TTL': 10,
+    'TTL': 300,
+    'BACKEND': None,
+}
+
+# Shared with product_service, which sends it in the X-Service-Token header of
+# its product events; other callers of product-events/ get 403
+PRODUCT_EVENT_TOKEN = 'dev-product-event-token'
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
@@ -19,6 +19,10 @@ class CartAdmin(admin.ModelAdmin):
     readonly_fields = ['id', 'total_price', 'total_items', 'created_at', 'updated_at']
     inlines = [CartItemInline]
     
+    def get_queryset(self, request):
+        # Totals in list_display are computed from the prefetched items
+        return super().get_queryset(request).prefetch_related('items')
+    
     def total_price(self, obj):
         return obj.total_price
     
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Defaults used when settings.PRODUCT_CACHE does not override them
+DEFAULT_CONFIG = {
+    'MAX_SIZE': 10000,   # entries kept in the per-process LRU
+    'LOCAL_TTL': 10,     # seconds an entry lives in the per-process LRU
+    'TTL': 300,          # seconds an entry lives in the shared backend
+    'BACKEND': None,     # alias from settings.CACHES, or None for LRU only
+}
+
+
+class LRUCache:
+    """Thread-safe bounded LRU with per-entry expiry"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class ProductCache:
+    """Read-through cache of product snapshots used by add-to-cart
+
+    Lookups check the per-process LRU first, then the optional shared
+    backend, and only then call the loader (the product service). Entries
+    are dropped by invalidate() when product_service publishes a price or
+    stock change. Other worker processes keep their local copy for at most
+    LOCAL_TTL seconds, so that value bounds how stale a snapshot can be.
+    """
+
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_CONFIG, **getattr(settings, 'PRODUCT_CACHE', {}), **(config or {})}
+        self.local = LRUCache(self.config['MAX_SIZE'], self.config['LOCAL_TTL'])
+        self.shared = caches[self.config['BACKEND']] if self.config['BACKEND'] else None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(product_type, product_id):
+        return f"product:{product_type}:{product_id}"
+
+    def get(self, product_type, product_id, loader):
+        """Return the cached snapshot, calling loader() to fill a miss"""
+        key = self.make_key(product_type, product_id)
+
+        product_data = self.local.get(key)
+        if product_data is None and self.shared is not None:
+            product_data = self.shared.get(key)
+            if product_data is not None:
+                self.local.set(key, product_data)
+
+        if product_data is not None:
+            self.hits += 1
+            return product_data
+
+        self.misses += 1
+        product_data = loader()
+        # Missing products and service errors are not cached
+        if product_data is not None:
+            self.set(product_type, product_id, product_data)
+        return product_data
+
+    def set(self, product_type, product_id, product_data):
+        key = self.make_key(product_type, product_id)
+        self.local.set(key, product_data)
+        if self.shared is not None:
+            self.shared.set(key, product_data, self.config['TTL'])
+
+    def invalidate(self, product_type, product_id):
+        key = self.make_key(product_type, product_id)
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+
+_product_cache = None
+_product_cache_lock = threading.Lock()
+
+
+def get_product_cache():
+    """Return the process-wide ProductCache, creating it on first use"""
+    global _product_cache
+    if _product_cache is None:
+        with _product_cache_lock:
+            if _product_cache is None:
+                _product_cache = ProductCache()
+    return _product_cache
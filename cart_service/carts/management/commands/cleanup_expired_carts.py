@@ -1,17 +1,75 @@
+import time
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
-from carts.models import Cart
+from carts.models import Cart, CartItem
 
 class Command(BaseCommand):
     help = 'Clean up expired cart data from database'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of carts deleted per transaction')
+        parser.add_argument('--max-batches-per-second', type=float, default=5.0,
+                            help='Rate limit for delete batches (0 disables it)')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running and sweep again every --interval seconds')
+        parser.add_argument('--interval', type=int, default=300,
+                            help='Seconds to wait between sweeps in --loop mode')
+
     def handle(self, *args, **options):
-        # Get expired carts
-        expired_carts = Cart.objects.filter(
-            expires_at__lt=timezone.now()
-        )
-        
-        count = expired_carts.count()
-        expired_carts.delete()
-        
-        self.stdout.write(self.style.SUCCESS(f'Successfully cleaned up {count} expired carts'))
\ No newline at end of file
+        if not options['loop']:
+            self.sweep(options['batch_size'], options['max_batches_per_second'])
+            return
+
+        self.stdout.write(f"Sweeping expired carts every {options['interval']}s (Ctrl+C to stop)")
+        try:
+            while True:
+                self.sweep(options['batch_size'], options['max_batches_per_second'])
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Stopped cart sweeper')
+
+    def sweep(self, batch_size, max_batches_per_second):
+        """Delete expired carts and their items in bounded batches"""
+        cutoff = timezone.now()
+        min_batch_time = 1.0 / max_batches_per_second if max_batches_per_second > 0 else 0
+        started = time.monotonic()
+        carts_deleted = 0
+        items_deleted = 0
+        batches = 0
+
+        while True:
+            batch_started = time.monotonic()
+
+            with transaction.atomic():
+                # Uses the expires_at index, so each batch reads only expired rows
+                cart_ids = list(
+                    Cart.objects.filter(expires_at__lt=cutoff)
+                    .order_by('expires_at')
+                    .values_list('id', flat=True)[:batch_size]
+                )
+                if not cart_ids:
+                    break
+
+                items_deleted += CartItem.objects.filter(cart_id__in=cart_ids).delete()[0]
+                carts_deleted += Cart.objects.filter(id__in=cart_ids).delete()[0]
+
+            batches += 1
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"Batch {batches}: {carts_deleted} carts, {items_deleted} items deleted "
+                f"({carts_deleted / max(elapsed, 1e-6):.0f} carts/s)"
+            )
+
+            # Rate limit so the sweep doesn't starve regular traffic
+            batch_time = time.monotonic() - batch_started
+            if batch_time < min_batch_time:
+                time.sleep(min_batch_time - batch_time)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully cleaned up {carts_deleted} expired carts '
+            f'and {items_deleted} items in {elapsed:.1f}s'
+        ))
+        return carts_deleted
@@ -1,5 +1,7 @@
 import uuid
 from django.db import models
+from django.db.models import prefetch_related_objects
+from django.utils.functional import cached_property
 from django.utils import timezone
 from datetime import timedelta
 from django.conf import settings
@@ -9,7 +11,7 @@ class Cart(models.Model):
     customer_id = models.UUIDField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    expires_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
     
     def __str__(self):
         return f"Cart {self.id} - Customer: {self.customer_id or 'Guest'}"
@@ -20,17 +22,44 @@ class Cart(models.Model):
             self.expires_at = timezone.now() + timedelta(days=settings.CART_EXPIRY_DAYS)
         super().save(*args, **kwargs)
     
+    @cached_property
+    def summary(self):
+        """Cart totals computed in a single pass over the items
+        
+        Load carts with prefetch_related('items') (or call refresh_items)
+        so this reads the prefetched list instead of querying again.
+        """
+        total_price = 0
+        total_items = 0
+        line_count = 0
+        for item in self.items.all():
+            total_price += item.subtotal
+            total_items += item.quantity
+            line_count += 1
+        return {
+            'total_price': total_price,
+            'total_items': total_items,
+            'line_count': line_count,
+        }
+    
+    def refresh_items(self):
+        """Reload the items with one query and drop the cached totals"""
+        if hasattr(self, '_prefetched_objects_cache'):
+            self._prefetched_objects_cache.pop('items', None)
+        self.__dict__.pop('summary', None)
+        prefetch_related_objects([self], 'items')
+    
     @property
     def total_price(self):
-        return sum(item.subtotal for item in self.items.all())
+        return self.summary['total_price']
     
     @property
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.summary['total_items']
     
     @property
     def is_empty(self):
-        return self.items.count() == 0
+        return self.summary['line_count'] == 0
 
 class CartItem(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
@@ -0,0 +1,18 @@
+import hmac
+
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+
+TOKEN_HEADER = 'X-Service-Token'
+
+class IsProductService(BasePermission):
+    """Allows only calls carrying settings.PRODUCT_EVENT_TOKEN
+
+    Product events come from product_service, never from users. An empty
+    token setting rejects every call.
+    """
+
+    def has_permission(self, request, view):
+        expected = getattr(settings, 'PRODUCT_EVENT_TOKEN', '')
+        token = request.headers.get(TOKEN_HEADER, '')
+        return bool(expected) and hmac.compare_digest(token.encode(), expected.encode())
@@ -54,4 +54,11 @@ class UpdateCartItemSerializer(serializers.Serializer):
 
 class CartMergeSerializer(serializers.Serializer):
     source_cart_id = serializers.UUIDField()
-    destination_cart_id = serializers.UUIDField()
\ No newline at end of file
+    destination_cart_id = serializers.UUIDField()
+
+class ProductEventSerializer(serializers.Serializer):
+    product_id = UUIDField()
+    product_type = serializers.ChoiceField(choices=[('book', 'Book'), 
+                                                    ('clothing', 'Clothing'), 
+                                                    ('mobile', 'Mobile')])
+    changed_fields = serializers.ListField(child=serializers.CharField(), required=False)
\ No newline at end of file
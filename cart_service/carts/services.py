@@ -0,0 +1,75 @@
+import logging
+import requests
+from django.conf import settings
+
+from .http_client import get_client
+
+logger = logging.getLogger(__name__)
+
+# products/batch/ accepts at most this many references per call
+PRODUCT_BATCH_SIZE = 200
+
+class ProductLookupRejected(Exception):
+    """Product service refused a lookup with a 4xx; detail holds its errors"""
+    
+    def __init__(self, response):
+        super().__init__(f"Product service rejected the lookup: HTTP {response.status_code}")
+        self.status_code = response.status_code
+        try:
+            self.detail = response.json()
+        except ValueError:
+            self.detail = response.text
+
+class ProductServiceClient:
+    """Client for interacting with the Product Service API"""
+    
+    def __init__(self):
+        self.base_url = settings.MICROSERVICE_URLS['PRODUCT_SERVICE']
+    
+    def get_products(self, items):
+        """Fetch every referenced product, PRODUCT_BATCH_SIZE per batch call
+        
+        Returns a dict keyed by (product_type, product_id), or None if the
+        product service could not be reached or failed (5xx). Raises
+        ProductLookupRejected when it refuses the lookup (4xx): the
+        references themselves are bad, so retrying or skipping validation
+        would be wrong.
+        """
+        url = f"{self.base_url}/products/batch/"
+        refs = sorted({(item['product_type'], str(item['product_id'])) for item in items})
+        
+        products = {}
+        for start in range(0, len(refs), PRODUCT_BATCH_SIZE):
+            payload = {
+                'items': [
+                    {'product_type': product_type, 'product_id': product_id}
+                    for product_type, product_id in refs[start:start + PRODUCT_BATCH_SIZE]
+                ]
+            }
+            try:
+                # Batch lookup is read-only, so it is safe to retry
+                response = get_client().post(url, json=payload, retry=True)
+            except requests.RequestException as e:
+                logger.warning("Product batch lookup failed: %s", e)
+                return None
+            
+            if 400 <= response.status_code < 500:
+                raise ProductLookupRejected(response)
+            if response.status_code != 200:
+                logger.warning("Product batch lookup failed: HTTP %s", response.status_code)
+                return None
+            products.update(
+                ((product['product_type'], str(product['id'])), product)
+                for product in response.json()['products']
+            )
+        return products
+    
+    def get_product(self, product_type, product_id):
+        try:
+            products = self.get_products([{'product_type': product_type, 'product_id': product_id}])
+        except ProductLookupRejected:
+            # A reference product service refuses is not a product we can sell
+            return None
+        if products:
+            return products.get((product_type, str(product_id)))
+        return None
@@ -1,3 +1,109 @@
-from django.test import TestCase
+import uuid
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from .cache import ProductCache
+from .models import Cart, CartItem
+
+
+class CartReadQueryCountTests(TestCase):
+    # Cart lookup plus one prefetch query for its items
+    EXPECTED_QUERIES = 2
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _make_cart(self, item_count):
+        cart = Cart.objects.create()
+        CartItem.objects.bulk_create([
+            CartItem(
+                cart=cart,
+                product_id=uuid.uuid4(),
+                product_type='book',
+                quantity=2,
+                name=f'Book {i}',
+                price=Decimal('5.00'),
+            )
+            for i in range(item_count)
+        ])
+        return cart
+
+    def test_get_cart_query_count_is_fixed(self):
+        for item_count in (0, 1, 10, 50):
+            with self.subTest(item_count=item_count):
+                cart = self._make_cart(item_count)
+
+                with self.assertNumQueries(self.EXPECTED_QUERIES):
+                    response = self.client.get(f'/api/carts/{cart.id}/')
+
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['items']), item_count)
+                self.assertEqual(response.data['total_items'], 2 * item_count)
+                self.assertEqual(Decimal(response.data['total_price']), Decimal('10.00') * item_count)
+
+
+class ProductCacheTests(TestCase):
+    def setUp(self):
+        self.cache = ProductCache(config={'BACKEND': None})
+        self.product_id = str(uuid.uuid4())
+        self.loader = mock.Mock(return_value={'id': self.product_id, 'price': '5.00'})
+
+    def test_miss_loads_the_product_and_hit_serves_it(self):
+        first = self.cache.get('book', self.product_id, self.loader)
+        second = self.cache.get('book', self.product_id, self.loader)
+
+        self.assertEqual(first, second)
+        self.loader.assert_called_once()
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_missing_products_are_not_cached(self):
+        self.loader.return_value = None
+
+        self.cache.get('book', self.product_id, self.loader)
+        self.cache.get('book', self.product_id, self.loader)
+
+        self.assertEqual(self.loader.call_count, 2)
+
+
+@override_settings(PRODUCT_EVENT_TOKEN='test-token')
+class ProductEventTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.cache = ProductCache(config={'BACKEND': None})
+        self.product_id = str(uuid.uuid4())
+        self.loader = mock.Mock(return_value={'id': self.product_id, 'price': '5.00'})
+        self.cache.get('book', self.product_id, self.loader)
+
+    def _send_event(self, **headers):
+        with mock.patch('carts.views.get_product_cache', return_value=self.cache):
+            return self.client.post(
+                '/api/product-events/',
+                {'product_type': 'book', 'product_id': self.product_id, 'changed_fields': ['price']},
+                format='json',
+                **headers
+            )
+
+    def test_event_from_product_service_invalidates_the_snapshot(self):
+        response = self._send_event(HTTP_X_SERVICE_TOKEN='test-token')
+
+        self.assertEqual(response.status_code, 200)
+        self.cache.get('book', self.product_id, self.loader)
+        self.assertEqual(self.loader.call_count, 2)
+
+    def test_event_without_the_service_token_is_rejected(self):
+        for headers in ({}, {'HTTP_X_SERVICE_TOKEN': 'wrong'}):
+            with self.subTest(headers=headers):
+                response = self._send_event(**headers)
+
+                self.assertEqual(response.status_code, 403)
+                self.cache.get('book', self.product_id, self.loader)
+                self.loader.assert_called_once()
+
+    @override_settings(PRODUCT_EVENT_TOKEN='')
+    def test_no_configured_token_rejects_every_event(self):
+        response = self._send_event(HTTP_X_SERVICE_TOKEN='')
+
+        self.assertEqual(response.status_code, 403)
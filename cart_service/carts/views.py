@@ -1,17 +1,19 @@
-import requests
 from rest_framework import status
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from django.shortcuts import get_object_or_404
 from django.conf import settings
 from django.utils import timezone
 from django.db import transaction
 
 from .models import Cart, CartItem
+from .services import ProductServiceClient
+from .cache import get_product_cache
+from .permissions import IsProductService
 from .serializers import (
     CartSerializer, AddToCartSerializer, 
-    UpdateCartItemSerializer, CartMergeSerializer
+    UpdateCartItemSerializer, CartMergeSerializer, ProductEventSerializer
 )
 
 class CartView(APIView):
@@ -35,6 +37,8 @@ class CartView(APIView):
         # Clean up expired items (optional)
         self._clean_stale_items(cart)
             
+        # Load items with one query; totals are computed from that list
+        cart.refresh_items()
         serializer = CartSerializer(cart)
         return Response(serializer.data)
     
@@ -98,6 +102,7 @@ class CartView(APIView):
                 cart.save()
             
             # Return updated cart
+            cart.refresh_items()
             cart_serializer = CartSerializer(cart)
             return Response(cart_serializer.data)
             
@@ -124,42 +129,23 @@ class CartView(APIView):
         cart.save()
         
         # Return empty cart
+        cart.refresh_items()
         serializer = CartSerializer(cart)
         return Response(serializer.data)
     
     def _get_product_data(self, product_id, product_type):
-        try:
-            # Convert to string format if it's a UUID object
-            product_id_str = str(product_id)
-            
-            url = f"{settings.MICROSERVICE_URLS['PRODUCT_SERVICE']}/{product_type}s/{product_id_str}/"
-            response = requests.get(url)
-            
-            if response.status_code == 200:
-                return response.json()
-                
-            # If standard UUID string didn't work, try with the Base64 format
-            if response.status_code == 404:
-                try:
-                    # Format as Base64 if it's a UUID object
-                    if isinstance(product_id, uuid.UUID):
-                        base64_id = base64.b64encode(product_id.bytes).decode('ascii')
-                        url = f"{settings.MICROSERVICE_URLS['PRODUCT_SERVICE']}/{product_type}s/{base64_id}/"
-                        response = requests.get(url)
-                        if response.status_code == 200:
-                            return response.json()
-                except:
-                    pass
-            
-            return None
-        except requests.RequestException:
-            # In a real app, log this error
-            return None
+        """Get a product snapshot, hitting product service only on a cache miss"""
+        # Stock in the snapshot may be slightly stale; the order service
+        # re-validates stock at checkout
+        return get_product_cache().get(
+            product_type, product_id,
+            lambda: ProductServiceClient().get_product(product_type, product_id)
+        )
     
     def _clean_stale_items(self, cart):
         """Clean up expired items (optional)"""
-        # This is a simple placeholder for more complex logic
-        # You might want to periodically clean expired cart items
+        # Expired guest carts are removed in bulk by the
+        # cleanup_expired_carts management command (see --loop for worker mode)
         pass
 
 class CartItemView(APIView):
@@ -187,6 +173,7 @@ class CartItemView(APIView):
             cart.save()
             
             # Return updated cart
+            cart.refresh_items()
             cart_serializer = CartSerializer(cart)
             return Response(cart_serializer.data)
             
@@ -206,6 +193,7 @@ class CartItemView(APIView):
         cart.save()
         
         # Return updated cart
+        cart.refresh_items()
         serializer = CartSerializer(cart)
         return Response(serializer.data)
 
@@ -217,38 +205,66 @@ def merge_carts(request):
         source_cart_id = serializer.validated_data['source_cart_id']
         destination_cart_id = serializer.validated_data['destination_cart_id']
         
+        if source_cart_id == destination_cart_id:
+            return Response(
+                {"error": "Cannot merge a cart into itself"}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
         try:
-            source_cart = Cart.objects.get(id=source_cart_id)
-            destination_cart = Cart.objects.get(id=destination_cart_id)
-            
             with transaction.atomic():
-                # Transfer items
-                for item in source_cart.items.all():
-                    # Check if item exists in destination cart
-                    existing_item = destination_cart.items.filter(
-                        product_id=item.product_id,
-                        product_type=item.product_type
-                    ).first()
-                    
+                # Lock both carts in a fixed order so concurrent merges (e.g. two
+                # logins with the same guest cart) run one after the other
+                carts = {
+                    cart.id: cart
+                    for cart in Cart.objects.select_for_update()
+                    .filter(id__in=[source_cart_id, destination_cart_id])
+                    .order_by('id')
+                }
+                if len(carts) != 2:
+                    raise Cart.DoesNotExist
+                source_cart = carts[source_cart_id]
+                destination_cart = carts[destination_cart_id]
+                
+                # Load each cart's items once and match them in memory
+                source_items = list(source_cart.items.all())
+                destination_items = {
+                    (item.product_id, item.product_type): item
+                    for item in destination_cart.items.all()
+                }
+                
+                items_to_update = []
+                items_to_create = []
+                for item in source_items:
+                    existing_item = destination_items.get((item.product_id, item.product_type))
                     if existing_item:
                         # Update quantity if item exists
                         existing_item.quantity += item.quantity
-                        existing_item.save()
+                        items_to_update.append(existing_item)
                     else:
                         # Create new item in destination cart
-                        item.pk = None  # Create new instance
-                        item.id = uuid.uuid4()
-                        item.cart = destination_cart
-                        item.save()
+                        items_to_create.append(CartItem(
+                            cart=destination_cart,
+                            product_id=item.product_id,
+                            product_type=item.product_type,
+                            quantity=item.quantity,
+                            name=item.name,
+                            price=item.price,
+                            image_url=item.image_url,
+                        ))
+                
+                CartItem.objects.bulk_update(items_to_update, ['quantity'])
+                CartItem.objects.bulk_create(items_to_create)
                 
                 # Clear source cart
-                source_cart.items.all().delete()
+                CartItem.objects.filter(cart=source_cart).delete()
                 
                 # Update cart timestamps
                 destination_cart.updated_at = timezone.now()
                 destination_cart.save()
             
             # Return merged cart
+            destination_cart.refresh_items()
             serializer = CartSerializer(destination_cart)
             return Response(serializer.data)
             
@@ -258,4 +274,23 @@ def merge_carts(request):
                 status=status.HTTP_404_NOT_FOUND
             )
     
+    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+@api_view(['POST'])
+@authentication_classes([])
+@permission_classes([IsProductService])
+def product_event(request):
+    """Drop cached product snapshots when product service reports a change
+    
+    Only product service may call it: it sends PRODUCT_EVENT_TOKEN in the
+    X-Service-Token header.
+    """
+    serializer = ProductEventSerializer(data=request.data)
+    if serializer.is_valid():
+        get_product_cache().invalidate(
+            serializer.validated_data['product_type'],
+            serializer.validated_data['product_id']
+        )
+        return Response({'status': 'invalidated'})
+    
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
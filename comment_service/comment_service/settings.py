@@ -96,6 +96,49 @@ MICROSERVICE_URLS = {
     'SHIPMENT_SERVICE': 'http://localhost:8005/api',
 }
 
+# Shared HTTP client for inter-service calls (see comments/http_client.py)
+HTTP_CLIENT = {
+    'CONNECT_TIMEOUT': 2.0,
+    'READ_TIMEOUT': 5.0,
+    'MAX_RETRIES': 2,
+    'BACKOFF_FACTOR': 0.1,
+    'POOL_CONNECTIONS': 10,
+    'POOL_MAXSIZE': 50,
+    'METRICS_LOG_INTERVAL': 60,  # Per-host call/latency summary in the log
+}
+
+# Load the sentiment model, tokenizer and spaCy pipeline when a WSGI worker
+# boots instead of on first use (see comments/model_registry.py). Comment
+# requests no longer score inline, so web workers leave this off
+SENTIMENT_MODEL_WARMUP = False
+
+# Aspect extraction (comments/aspects.py): texts per nlp.pipe batch, worker
+# processes for large batches, aspects kept per text and cached texts.
+# N_PROCESS > 1 forks the (TensorFlow-loaded) process on every large batch,
+# so it stays 1 here; the single-process backfill can opt in with
+# `analyze_existing_comments --aspect-processes N`
+SENTIMENT_ASPECTS = {
+    'BATCH_SIZE': 64,
+    'N_PROCESS': 1,
+    'MAX_ASPECTS': 5,
+    'CACHE_SIZE': 10000,
+}
+
+# Queued sentiment scoring, drained by `manage.py process_sentiment_jobs`.
+# Failed jobs are retried after RETRY_BACKOFF * 2^(attempt - 1) seconds and
+# jobs locked longer than VISIBILITY_TIMEOUT are assumed abandoned. A worker
+# whose poll fails (e.g. the database is busy) waits up to MAX_ERROR_BACKOFF
+# seconds before trying again
+SENTIMENT_JOBS = {
+    'WORKERS': 2,
+    'BATCH_SIZE': 64,
+    'POLL_INTERVAL': 1.0,
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BACKOFF': 30,
+    'VISIBILITY_TIMEOUT': 300,
+    'MAX_ERROR_BACKOFF': 60,
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -130,3 +173,10 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.1/howto/static-files/
 
 STATIC_URL = '/static/'
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
+# AutoField, as in the existing migrations; models without a UUID primary key
+# are queues read in id order
+
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'comment_service.settings')
 
 application = get_wsgi_application()
+
+# Load the ML models once at worker boot so the first requests don't pay for it
+from django.conf import settings
+
+if getattr(settings, 'SENTIMENT_MODEL_WARMUP', False):
+    from comments.model_registry import registry
+    registry.warm_up()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Comment, CommentFlag
+from .models import Comment, CommentFlag, SentimentJob
 
 class CommentFlagInline(admin.TabularInline):
     model = CommentFlag
@@ -54,4 +54,12 @@ class CommentFlagAdmin(admin.ModelAdmin):
     list_display = ('id', 'comment', 'customer_id', 'reason', 'created_at')
     list_filter = ('created_at',)
     search_fields = ('comment__customer_name', 'comment__content', 'reason')
-    readonly_fields = ('id', 'created_at')
\ No newline at end of file
+    readonly_fields = ('id', 'created_at')
+
+@admin.register(SentimentJob)
+class SentimentJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'comment', 'status', 'attempts', 'available_at', 'locked_by', 'updated_at')
+    list_filter = ('status',)
+    search_fields = ('comment__id', 'last_error')
+    readonly_fields = ('created_at', 'updated_at')
+    raw_id_fields = ('comment',)
@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+from django.conf import settings
+
+from .model_registry import registry
+
+class AspectExtractor:
+    """Extracts product aspects (noun chunks) from review texts
+
+    Texts are run through nlp.pipe in batches, optionally on several
+    processes for large batches (off by default: forking a process that
+    has TensorFlow loaded is slow and unsafe). The spaCy pipeline is
+    loaded without NER and the lemmatizer, which noun_chunks doesn't need. Results are cached by
+    text, so duplicate reviews ("Great product!") are parsed once.
+    """
+
+    def __init__(self, max_aspects=5, batch_size=64, n_process=1, cache_size=10000):
+        self.max_aspects = max_aspects
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def nlp(self):
+        return registry.get('spacy')
+
+    def extract(self, text):
+        return self.extract_many([text])[0]
+
+    def extract_many(self, texts):
+        """Return the aspect list for every text, in order"""
+        results = [None] * len(texts)
+        todo = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                aspects = self._cache.get(text)
+                if aspects is not None:
+                    self._cache.move_to_end(text)
+                    results[i] = list(aspects)
+                    self.hits += 1
+                else:
+                    todo.setdefault(text, []).append(i)
+            self.misses += len(todo)
+
+        if todo:
+            unique_texts = list(todo)
+            parsed = self._parse(unique_texts)
+            with self._lock:
+                for text, aspects in zip(unique_texts, parsed):
+                    self._cache[text] = aspects
+                    for i in todo[text]:
+                        results[i] = list(aspects)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return results
+
+    def _parse(self, texts):
+        # Forking worker processes only pays off when each gets full batches
+        n_process = self.n_process if len(texts) >= self.batch_size * self.n_process else 1
+        return [
+            self._aspects(doc)
+            for doc in self.nlp.pipe(texts, batch_size=self.batch_size, n_process=n_process)
+        ]
+
+    def _aspects(self, doc):
+        return [chunk.text.lower() for chunk in doc.noun_chunks][:self.max_aspects]
+
+    def stats(self):
+        return {'cached': len(self._cache), 'hits': self.hits, 'misses': self.misses}
+
+_aspect_extractor = None
+_aspect_extractor_lock = threading.Lock()
+
+def get_aspect_extractor():
+    """Return the process-wide AspectExtractor configured by SENTIMENT_ASPECTS"""
+    global _aspect_extractor
+    if _aspect_extractor is None:
+        with _aspect_extractor_lock:
+            if _aspect_extractor is None:
+                config = getattr(settings, 'SENTIMENT_ASPECTS', {})
+                _aspect_extractor = AspectExtractor(
+                    max_aspects=config.get('MAX_ASPECTS', 5),
+                    batch_size=config.get('BATCH_SIZE', 64),
+                    n_process=config.get('N_PROCESS', 1),
+                    cache_size=config.get('CACHE_SIZE', 10000),
+                )
+    return _aspect_extractor
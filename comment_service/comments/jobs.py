@@ -0,0 +1,193 @@
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .http_client import get_client
+from .models import Comment, EntityType, JobStatus, SentimentJob
+
+logger = logging.getLogger(__name__)
+
+JOB_UPDATE_FIELDS = ['status', 'available_at', 'locked_at', 'locked_by', 'last_error', 'updated_at']
+
+def _config(key, default):
+    return getattr(settings, 'SENTIMENT_JOBS', {}).get(key, default)
+
+def enqueue_sentiment_job(comment):
+    """Queue sentiment scoring for a comment
+
+    Call it inside the transaction that saves the comment, so a comment is
+    never stored without its job.
+    """
+    return SentimentJob.objects.create(comment=comment)
+
+def claim_jobs(batch_size, worker_id):
+    """Lock up to batch_size due jobs for this worker and return them
+
+    Jobs left PROCESSING for longer than VISIBILITY_TIMEOUT (their worker
+    died mid-batch) are claimed again, so every job is eventually scored.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=_config('VISIBILITY_TIMEOUT', 300))
+
+    with transaction.atomic():
+        # SKIP LOCKED lets several workers claim side by side on backends
+        # that support it; elsewhere locked_by settles who got the job
+        claimable = SentimentJob.objects.filter(
+            Q(status=JobStatus.PENDING, available_at__lte=now) |
+            Q(status=JobStatus.PROCESSING, locked_at__lt=stale)
+        )
+        job_ids = list(
+            claimable.select_for_update(skip_locked=True)
+            .order_by('available_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not job_ids:
+            return []
+
+        # Only rows still claimable are taken: where SKIP LOCKED is a no-op
+        # (SQLite) another worker may have claimed some of them meanwhile
+        claimable.filter(id__in=job_ids).update(
+            status=JobStatus.PROCESSING,
+            locked_at=now,
+            locked_by=worker_id,
+            attempts=F('attempts') + 1,
+            updated_at=now,
+        )
+
+    return list(
+        SentimentJob.objects.filter(id__in=job_ids, locked_by=worker_id, locked_at=now)
+        .select_related('comment')
+    )
+
+def forward_sentiment(comments):
+    """Send scored product reviews to product service, one request per batch"""
+    events = [
+        {
+            'product_id': str(comment.entity_id),
+            'comment_id': str(comment.id),
+            'rating': comment.rating,
+            'sentiment_score': comment.sentiment_score,
+            'sentiment_aspects': comment.sentiment_aspects,
+        }
+        for comment in comments if comment.entity_type == EntityType.PRODUCT
+    ]
+    if not events:
+        return
+
+    url = f"{settings.MICROSERVICE_URLS['PRODUCT_SERVICE']}/products/sentiment/batch/"
+    response = get_client().post(url, json={'events': events}, retry=True)
+    # Product service being down is worth retrying, a rejected payload is not
+    if response.status_code >= 500:
+        response.raise_for_status()
+    if response.status_code >= 400:
+        logger.warning("Product service rejected a sentiment batch of %d: HTTP %s",
+                       len(events), response.status_code)
+
+def process_jobs(jobs, sentiment_service):
+    """Score a batch of claimed jobs, store the results and forward them
+
+    Comments already scored by an earlier attempt (forwarding failed) are
+    not scored again. Forwarded jobs are deleted. If forwarding fails the
+    jobs go back to PENDING with exponential backoff until MAX_ATTEMPTS,
+    then stay FAILED.
+    """
+    to_score = [job.comment for job in jobs if job.comment.sentiment_score is None]
+    if to_score:
+        results = sentiment_service.analyze_batch([comment.content for comment in to_score])
+        for comment, sentiment_data in zip(to_score, results):
+            comment.sentiment_score = sentiment_data['normalized_score']
+            comment.sentiment_aspects = sentiment_data['aspects']
+        Comment.objects.bulk_update(to_score, ['sentiment_score', 'sentiment_aspects'])
+
+    now = timezone.now()
+    try:
+        forward_sentiment([job.comment for job in jobs])
+    except requests.RequestException as e:
+        for job in jobs:
+            _retry_later(job, e, now)
+        SentimentJob.objects.bulk_update(jobs, JOB_UPDATE_FIELDS)
+    else:
+        # Finished jobs are deleted, so the table only holds work still to do
+        SentimentJob.objects.filter(id__in=[job.id for job in jobs]).delete()
+
+def release_jobs(jobs, error):
+    """Put a batch that could not be processed back on the queue"""
+    now = timezone.now()
+    for job in jobs:
+        _retry_later(job, error, now)
+    SentimentJob.objects.bulk_update(jobs, JOB_UPDATE_FIELDS)
+
+def _unlock(job, now):
+    job.locked_at = None
+    job.locked_by = ''
+    job.updated_at = now
+
+def _retry_later(job, error, now):
+    job.last_error = str(error)
+    if job.attempts >= _config('MAX_ATTEMPTS', 5):
+        job.status = JobStatus.FAILED
+    else:
+        job.status = JobStatus.PENDING
+        job.available_at = now + timedelta(seconds=_config('RETRY_BACKOFF', 30) * 2 ** (job.attempts - 1))
+    _unlock(job, now)
+
+class SentimentWorker(threading.Thread):
+    """Claims and processes job batches until stop() is called"""
+
+    def __init__(self, sentiment_service, batch_size, poll_interval, index=0, once=False):
+        super().__init__(name=f'sentiment-worker-{index}', daemon=True)
+        self.sentiment_service = sentiment_service
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.once = once
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{index}'
+        self.processed = 0
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        errors = 0
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    idle = self._poll()
+                except Exception:
+                    # e.g. SQLite's "database is locked": back off and keep going,
+                    # jobs claimed meanwhile are reclaimed after VISIBILITY_TIMEOUT
+                    errors += 1
+                    logger.exception("%s: polling the job queue failed", self.name)
+                    self._stop_event.wait(min(self.poll_interval * 2 ** errors, _config('MAX_ERROR_BACKOFF', 60)))
+                    continue
+                errors = 0
+                if idle:
+                    if self.once:
+                        break
+                    self._stop_event.wait(self.poll_interval)
+        finally:
+            close_old_connections()
+
+    def _poll(self):
+        """Claim and process one batch, returns True if no job was due"""
+        close_old_connections()
+        jobs = claim_jobs(self.batch_size, self.worker_id)
+        if not jobs:
+            return True
+
+        try:
+            process_jobs(jobs, self.sentiment_service)
+        except Exception as e:
+            logger.exception("%s: batch of %d jobs failed", self.name, len(jobs))
+            release_jobs(jobs, e)
+        else:
+            self.processed += len(jobs)
+        return False
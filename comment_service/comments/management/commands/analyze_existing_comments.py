@@ -1,47 +1,144 @@
-from django.core.management.base import BaseCommand
-from comments.models import Comment
-from comments.services import SentimentAnalysisService
-import requests
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
 from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from comments.models import Comment, EntityType, JobStatus, SentimentJob
+from comments.aspects import get_aspect_extractor
+from comments.services import get_sentiment_service
+
+def _init_worker():
+    # Each worker process loads its own copy of the models, once
+    import django
+    django.setup()
+    from comments.model_registry import registry
+    registry.warm_up()
+
+def _analyze_chunk(texts):
+    return get_sentiment_service().analyze_batch(texts)
 
 class Command(BaseCommand):
     help = 'Analyze existing comments with CNN sentiment model'
-    
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=256,
+                            help='Comments read, scored and written per chunk')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Worker processes scoring chunks in parallel, one model each')
+        parser.add_argument('--aspect-processes', type=int, default=None,
+                            help='spaCy processes for aspect extraction (only without --workers)')
+        parser.add_argument('--checkpoint', default=os.path.join(settings.BASE_DIR, '.analyze_existing_comments.json'),
+                            help='File recording the last finished chunk, used to resume')
+        parser.add_argument('--reset', action='store_true',
+                            help='Ignore the checkpoint and start from the first comment')
+
     def handle(self, *args, **options):
-        sentiment_service = SentimentAnalysisService()
-        
-        # Get comments without sentiment analysis
-        comments = Comment.objects.filter(sentiment_score__isnull=True)
-        total = comments.count()
-        
-        self.stdout.write(f"Analyzing {total} comments...")
-        
-        for i, comment in enumerate(comments):
-            # Analyze comment text
-            sentiment_data = sentiment_service.analyze_text(comment.content)
-            
-            # Update comment with sentiment data
+        self.checkpoint_path = options['checkpoint']
+        batch_size = options['batch_size']
+        workers = options['workers']
+        aspect_processes = options['aspect_processes']
+        if aspect_processes and aspect_processes > 1 and workers > 1:
+            # Each worker would fork its own spaCy processes: workers x N in total
+            raise CommandError('--aspect-processes cannot be combined with --workers')
+
+        checkpoint = {} if options['reset'] else self.load_checkpoint()
+        last_id = checkpoint.get('last_id')
+        if last_id:
+            self.stdout.write(f"Resuming after comment {last_id}")
+
+        self.started = time.monotonic()
+        self.processed = 0
+
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+                # Keep a couple of chunks per worker in flight, but write them
+                # back in key order so the checkpoint never skips a chunk
+                pending = deque()
+                for chunk in self.iter_chunks(last_id, batch_size):
+                    pending.append((chunk, executor.submit(_analyze_chunk, [c.content for c in chunk])))
+                    if len(pending) >= workers * 2:
+                        self.finish_chunk(*self.pop_result(pending))
+                while pending:
+                    self.finish_chunk(*self.pop_result(pending))
+        else:
+            sentiment_service = get_sentiment_service()
+            if aspect_processes:
+                get_aspect_extractor().n_process = aspect_processes
+            for chunk in self.iter_chunks(last_id, batch_size):
+                self.finish_chunk(chunk, sentiment_service.analyze_batch([c.content for c in chunk]))
+
+        # Comment ids are random UUIDs, so new comments can sort before the
+        # checkpoint; a finished run must not make the next one skip them
+        self.clear_checkpoint()
+
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(self.style.SUCCESS(
+            f'Successfully analyzed {self.processed} comments in {elapsed:.1f}s '
+            f'({self.processed / max(elapsed, 1e-6):.1f} comments/s)'
+        ))
+
+    def iter_chunks(self, last_id, batch_size):
+        """Yield unscored comments in primary key order, one chunk per query"""
+        # Comments with a live job are scored by the sentiment job workers
+        comments = (Comment.objects.filter(sentiment_score__isnull=True)
+                    .exclude(sentiment_jobs__status__in=[JobStatus.PENDING, JobStatus.PROCESSING])
+                    .order_by('id')
+                    .only('id', 'entity_type', 'content'))
+        while True:
+            page = comments.filter(id__gt=last_id) if last_id else comments
+            chunk = list(page[:batch_size])
+            if not chunk:
+                return
+            yield chunk
+            last_id = chunk[-1].id
+
+    def pop_result(self, pending):
+        chunk, future = pending.popleft()
+        return chunk, future.result()
+
+    def finish_chunk(self, chunk, results):
+        """Write a scored chunk back and advance the checkpoint past it"""
+        for comment, sentiment_data in zip(chunk, results):
             comment.sentiment_score = sentiment_data['normalized_score']
             comment.sentiment_aspects = sentiment_data['aspects']
-            comment.save()
-            
-            # Notify product service if this is a product comment
-            if comment.entity_type == 'product':
-                try:
-                    url = f"{settings.SERVICE_URLS['product_service']}/api/products/{comment.entity_id}/sentiment/"
-                    data = {
-                        'comment_id': str(comment.id),
-                        'user_id': str(comment.user_id),
-                        'rating': comment.rating,
-                        'sentiment_score': sentiment_data['normalized_score'],
-                        'sentiment_aspects': sentiment_data['aspects']
-                    }
-                    requests.post(url, json=data)
-                except Exception as e:
-                    self.stdout.write(self.style.WARNING(f"Error notifying product service for comment {comment.id}: {e}"))
-            
-            # Show progress
-            if (i + 1) % 100 == 0 or (i + 1) == total:
-                self.stdout.write(f"Processed {i + 1}/{total} comments")
-        
-        self.stdout.write(self.style.SUCCESS('Successfully analyzed all comments'))
\ No newline at end of file
+
+        with transaction.atomic():
+            Comment.objects.bulk_update(chunk, ['sentiment_score', 'sentiment_aspects'])
+            # Product reviews are forwarded by the sentiment job workers; they
+            # find the score already set and only send it on
+            SentimentJob.objects.bulk_create([
+                SentimentJob(comment=comment)
+                for comment in chunk if comment.entity_type == EntityType.PRODUCT
+            ])
+
+        self.processed += len(chunk)
+        self.save_checkpoint({'last_id': str(chunk[-1].id)})
+
+        elapsed = time.monotonic() - self.started
+        self.stdout.write(
+            f"Processed {self.processed} comments "
+            f"({self.processed / max(elapsed, 1e-6):.1f} comments/s)"
+        )
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def save_checkpoint(self, checkpoint):
+        # Write-then-rename so a crash never leaves a half-written checkpoint
+        tmp_path = f'{self.checkpoint_path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def clear_checkpoint(self):
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
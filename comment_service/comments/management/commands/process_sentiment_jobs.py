@@ -0,0 +1,57 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from comments.jobs import SentimentWorker
+from comments.model_registry import registry
+from comments.services import get_sentiment_service
+
+class Command(BaseCommand):
+    help = 'Run a pool of workers that score queued comments and forward the results'
+    
+    def add_arguments(self, parser):
+        config = getattr(settings, 'SENTIMENT_JOBS', {})
+        parser.add_argument('--workers', type=int, default=config.get('WORKERS', 2),
+                            help='Number of worker threads sharing the loaded models')
+        parser.add_argument('--batch-size', type=int, default=config.get('BATCH_SIZE', 64),
+                            help='Jobs claimed and scored per model call')
+        parser.add_argument('--poll-interval', type=float, default=config.get('POLL_INTERVAL', 1.0),
+                            help='Seconds an idle worker waits before polling the queue again')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue has no due jobs left')
+    
+    def handle(self, *args, **options):
+        # Load the models before claiming anything so the first batch doesn't
+        # sit locked while they load
+        registry.warm_up()
+        sentiment_service = get_sentiment_service()
+        
+        workers = [
+            SentimentWorker(
+                sentiment_service,
+                batch_size=options['batch_size'],
+                poll_interval=options['poll_interval'],
+                index=index,
+                once=options['once'],
+            )
+            for index in range(options['workers'])
+        ]
+        self.stdout.write(f"Starting {len(workers)} sentiment workers (Ctrl+C to stop)")
+        
+        started = time.monotonic()
+        for worker in workers:
+            worker.start()
+        try:
+            while any(worker.is_alive() for worker in workers):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.stop()
+            for worker in workers:
+                worker.join()
+        
+        processed = sum(worker.processed for worker in workers)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {processed} sentiment jobs in {elapsed:.1f}s'
+        ))
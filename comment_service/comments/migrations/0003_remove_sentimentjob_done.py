@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0002_sentimentjob'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sentimentjob',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('PROCESSING', 'Processing'), ('FAILED', 'Failed')], default='PENDING', max_length=20),
+        ),
+    ]
@@ -0,0 +1,86 @@
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), '../models')
+
+
+class ModelRegistry:
+    """Process-wide registry that loads each ML model once, on first use
+
+    Loading is thread-safe: concurrent requests for a model that is not
+    loaded yet wait for a single load instead of each loading their own
+    copy. Load times are kept for reporting.
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._locks = {}
+        self._registry_lock = threading.Lock()
+        self.load_times = {}
+
+    def register(self, name, loader):
+        with self._registry_lock:
+            self._loaders[name] = loader
+            self._locks[name] = threading.Lock()
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited
+            if name not in self._models:
+                started = time.monotonic()
+                self._models[name] = self._loaders[name]()
+                self.load_times[name] = time.monotonic() - started
+                logger.info("Loaded model '%s' in %.2fs", name, self.load_times[name])
+        return self._models[name]
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def warm_up(self, names=None):
+        """Load the given (default: all) models now, e.g. at worker boot"""
+        for name in names or list(self._loaders):
+            self.get(name)
+        return dict(self.load_times)
+
+    def stats(self):
+        return {
+            name: {
+                'loaded': self.is_loaded(name),
+                'load_time_seconds': self.load_times.get(name),
+            }
+            for name in self._loaders
+        }
+
+
+def _load_sentiment_model():
+    import tensorflow as tf
+    return tf.keras.models.load_model(os.path.join(MODELS_DIR, 'cnn_sentiment_model'))
+
+
+def _load_tokenizer():
+    import tensorflow as tf
+    with open(os.path.join(MODELS_DIR, 'tokenizer.json'), 'r') as f:
+        tokenizer_json = json.load(f)
+    return tf.keras.preprocessing.text.tokenizer_from_json(tokenizer_json)
+
+
+def _load_spacy():
+    import spacy
+    # Only noun_chunks is used (tagger + parser); skip loading the rest
+    return spacy.load('en_core_web_sm', exclude=['ner', 'lemmatizer'])
+
+
+registry = ModelRegistry()
+registry.register('sentiment_model', _load_sentiment_model)
+registry.register('tokenizer', _load_tokenizer)
+registry.register('spacy', _load_spacy)
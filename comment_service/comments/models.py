@@ -73,4 +73,34 @@ class CommentFlag(models.Model):
         unique_together = ['comment', 'customer_id']
     
     def __str__(self):
-        return f"Flag on comment {self.comment.id} by customer {self.customer_id}"
\ No newline at end of file
+        return f"Flag on comment {self.comment.id} by customer {self.customer_id}"
+
+class JobStatus(models.TextChoices):
+    PENDING = 'PENDING', 'Pending'
+    PROCESSING = 'PROCESSING', 'Processing'
+    FAILED = 'FAILED', 'Failed'
+
+class SentimentJob(models.Model):
+    """Queued sentiment scoring for a comment, drained by process_sentiment_jobs"""
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name='sentiment_jobs')
+    status = models.CharField(
+        max_length=20,
+        choices=JobStatus.choices,
+        default=JobStatus.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)  # Not picked up before this (retry backoff)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=64, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['available_at']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+    
+    def __str__(self):
+        return f"Sentiment job for comment {self.comment_id} ({self.status})"
@@ -18,9 +18,10 @@ class CommentSerializer(serializers.ModelSerializer):
             'id', 'entity_type', 'entity_id', 'customer_id', 'customer_name', 
             'customer_email', 'content', 'rating', 'status', 'created_at', 
             'updated_at', 'is_anonymous', 'parent_comment', 'replies', 
-            'reply_count', 'has_replies'
+            'reply_count', 'has_replies', 'sentiment_score', 'sentiment_aspects'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'status']
+        read_only_fields = ['id', 'created_at', 'updated_at', 'status',
+                            'sentiment_score', 'sentiment_aspects']
     
     def validate(self, data):
         entity_type = data.get('entity_type')
@@ -1,63 +1,102 @@
 import numpy as np
-import tensorflow as tf
-import json
-import os
+
+from .aspects import get_aspect_extractor
+from .model_registry import registry
 
 class SentimentAnalysisService:
     def __init__(self):
-        # Load your pre-trained CNN model
-        model_path = os.path.join(os.path.dirname(__file__), '../models/cnn_sentiment_model')
-        self.model = tf.keras.models.load_model(model_path)
-        
-        # Load your tokenizer or vocabulary
-        with open(os.path.join(os.path.dirname(__file__), '../models/tokenizer.json'), 'r') as f:
-            tokenizer_json = json.load(f)
-            self.tokenizer = tf.keras.preprocessing.text.tokenizer_from_json(tokenizer_json)
-            
+        # The CNN model, tokenizer and spaCy pipeline are loaded once per
+        # process by the model registry, the first time they are used
+        self.registry = registry
+        
         # Maximum sequence length your model expects
         self.max_sequence_length = 100
         
+        # Number of texts sent to the model in a single predict call
+        self.batch_size = 256
+        
+    @property
+    def model(self):
+        return self.registry.get('sentiment_model')
+    
+    @property
+    def tokenizer(self):
+        return self.registry.get('tokenizer')
+    
+    @property
+    def aspect_extractor(self):
+        return get_aspect_extractor()
+    
     def preprocess_text(self, text):
         """Convert text to the format expected by your CNN model"""
-        # Tokenize and pad the text according to your model's requirements
-        sequences = self.tokenizer.texts_to_sequences([text])
-        padded_sequences = tf.keras.preprocessing.sequence.pad_sequences(
-            sequences, maxlen=self.max_sequence_length, padding='post'
-        )
-        return padded_sequences
+        return self.preprocess_batch([text])
+    
+    def preprocess_batch(self, texts):
+        """Tokenize a batch of texts and pad it into one int32 matrix
+        
+        Matches pad_sequences(padding='post'): sequences are zero-padded at
+        the end and long ones keep their last max_sequence_length tokens.
+        """
+        sequences = self.tokenizer.texts_to_sequences(texts)
+        batch = np.zeros((len(sequences), self.max_sequence_length), dtype=np.int32)
+        for i, sequence in enumerate(sequences):
+            if sequence:
+                sequence = sequence[-self.max_sequence_length:]
+                batch[i, :len(sequence)] = sequence
+        return batch
+    
+    def predict_scores(self, texts):
+        """Return the raw model score (0-1) for every text, one predict call per batch"""
+        scores = np.empty(len(texts), dtype=np.float32)
+        for start in range(0, len(texts), self.batch_size):
+            chunk = texts[start:start + self.batch_size]
+            predictions = self.model.predict(
+                self.preprocess_batch(chunk), batch_size=len(chunk), verbose=0
+            )
+            scores[start:start + len(chunk)] = predictions[:, 0]
+        return scores
         
     def analyze_text(self, text):
         """Analyze text using your CNN model and return sentiment data"""
-        # Preprocess the text for the model
-        processed_text = self.preprocess_text(text)
+        return self.analyze_batch([text])[0]
+    
+    def analyze_batch(self, texts):
+        """Analyze many texts at once and return sentiment data for each
         
-        # Get prediction from model
-        prediction = self.model.predict(processed_text)[0]
+        Scores for the whole batch come from a single predict call per
+        batch_size texts instead of one call per text.
+        """
+        texts = list(texts)
+        if not texts:
+            return []
         
         # Extract sentiment score (assuming binary sentiment: negative/positive)
         # For a multi-class model, adjust this accordingly
-        sentiment_score = float(prediction[0])  # Convert to Python float
+        scores = self.predict_scores(texts)
+        normalized_scores = (scores * 2) - 1  # Convert to -1 to 1 scale
         
-        # Extract aspects (keywords) from the text
-        aspects = self.extract_key_aspects(text)
+        # Extract aspects (keywords) for the whole batch in one nlp.pipe run
+        aspects = self.aspect_extractor.extract_many(texts)
         
-        return {
-            'score': sentiment_score,  # Between 0-1, with 1 being most positive
-            'normalized_score': (sentiment_score * 2) - 1,  # Convert to -1 to 1 scale
-            'magnitude': abs((sentiment_score * 2) - 1),
-            'aspects': aspects
-        }
+        results = []
+        for score, normalized_score, text_aspects in zip(scores.tolist(), normalized_scores.tolist(), aspects):
+            results.append({
+                'score': score,  # Between 0-1, with 1 being most positive
+                'normalized_score': normalized_score,
+                'magnitude': abs(normalized_score),
+                'aspects': text_aspects
+            })
+        return results
         
     def extract_key_aspects(self, text):
         """Extract key product aspects mentioned in the review text"""
-        # Simple keyword extraction - replace with more sophisticated NLP if needed
-        import spacy
-        nlp = spacy.load('en_core_web_sm')
-        doc = nlp(text)
-        
-        aspects = []
-        for chunk in doc.noun_chunks:
-            if len(chunk.text.split()) >= 1:
-                aspects.append(chunk.text.lower())
-                
-        return aspects[:5]  # Return top 5 aspects
\ No newline at end of file
+        return self.aspect_extractor.extract(text)
+
+_sentiment_service = None
+
+def get_sentiment_service():
+    """Return the process-wide SentimentAnalysisService"""
+    global _sentiment_service
+    if _sentiment_service is None:
+        _sentiment_service = SentimentAnalysisService()
+    return _sentiment_service
\ No newline at end of file
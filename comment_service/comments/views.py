@@ -4,6 +4,7 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
 from django.conf import settings
+from django.db import transaction
 from django.db.models import Count
 
 from .models import Comment, CommentFlag, CommentStatus, EntityType
@@ -11,6 +12,8 @@ from .serializers import (
     CommentSerializer, CommentCreateSerializer, 
     CommentStatusUpdateSerializer, CommentFlagSerializer
 )
+from .http_client import get_client
+from .jobs import enqueue_sentiment_job
 
 class CommentViewSet(viewsets.ModelViewSet):
     queryset = Comment.objects.filter(parent_comment=None)
@@ -75,8 +78,13 @@ class CommentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Auto-approve comments for now (can be changed to require moderation)
-        comment = serializer.save(status=CommentStatus.APPROVED)
+        # Sentiment scoring and the push to product service happen in the
+        # background (see comments/jobs.py); the job is stored in the same
+        # transaction as the comment so no comment goes unscored
+        with transaction.atomic():
+            # Auto-approve comments for now (can be changed to require moderation)
+            comment = serializer.save(status=CommentStatus.APPROVED)
+            enqueue_sentiment_job(comment)
         
         # If this is a product review with rating, notify product service
         if entity_type == EntityType.PRODUCT and serializer.validated_data.get('rating'):
@@ -156,7 +164,7 @@ class CommentViewSet(viewsets.ModelViewSet):
                 # Try each product type endpoint since we don't know which type it is
                 for product_type in ['books', 'clothing', 'mobiles']:
                     endpoint = f"{settings.MICROSERVICE_URLS['PRODUCT_SERVICE']}/{product_type}/{entity_id}/"
-                    response = requests.get(endpoint)
+                    response = get_client().get(endpoint)
                     if response.status_code == 200:
                         return True
                 
@@ -164,11 +172,11 @@ class CommentViewSet(viewsets.ModelViewSet):
                 return False
                     
             elif entity_type == EntityType.ORDER:
-                response = requests.get(f"{settings.MICROSERVICE_URLS['ORDER_SERVICE']}/orders/{entity_id}/")
+                response = get_client().get(f"{settings.MICROSERVICE_URLS['ORDER_SERVICE']}/orders/{entity_id}/")
                 return response.status_code == 200
                 
             elif entity_type == EntityType.SHIPMENT:
-                response = requests.get(f"{settings.MICROSERVICE_URLS['SHIPMENT_SERVICE']}/shipments/{entity_id}/")
+                response = get_client().get(f"{settings.MICROSERVICE_URLS['SHIPMENT_SERVICE']}/shipments/{entity_id}/")
                 return response.status_code == 200
                 
             # Add more entity types as needed
@@ -183,53 +191,11 @@ class CommentViewSet(viewsets.ModelViewSet):
         """Notify product service about a new product rating"""
         try:
             url = f"{settings.MICROSERVICE_URLS['PRODUCT_SERVICE']}/products/{product_id}/rate/"
-            requests.post(url, json={'rating': rating})
+            get_client().post(url, json={'rating': rating})
         except requests.RequestException:
             # Log error but don't fail the request
             pass
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.sentiment_service = SentimentAnalysisService()
-    
-    def create(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        
-        # Analyze sentiment using your CNN model
-        content = serializer.validated_data['content']
-        sentiment_data = self.sentiment_service.analyze_text(content)
-        
-        # Save comment with sentiment data
-        comment = serializer.save(
-            sentiment_score=sentiment_data['normalized_score'],
-            sentiment_aspects=sentiment_data['aspects']
-        )
-        
-        # Push sentiment data to product service for recommendations
-        self._notify_product_service(comment, sentiment_data)
-        
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-        
-    def _notify_product_service(self, comment, sentiment_data):
-        """Send sentiment data to product service"""
-        if comment.entity_type != 'product':
-            return
-            
-        try:
-            url = f"{settings.SERVICE_URLS['product_service']}/api/products/{comment.entity_id}/sentiment/"
-            data = {
-                'comment_id': str(comment.id),
-                'user_id': str(comment.user_id),
-                'rating': comment.rating,
-                'sentiment_score': sentiment_data['normalized_score'],
-                'sentiment_aspects': sentiment_data['aspects']
-            }
-            requests.post(url, json=data, headers={'Content-Type': 'application/json'})
-        except Exception as e:
-            # Log error but don't fail the request
-            print(f"Error notifying product service: {e}")
-
 class CommentFlagViewSet(viewsets.ModelViewSet):
     queryset = CommentFlag.objects.all().order_by('-created_at')
     serializer_class = CommentFlagSerializer
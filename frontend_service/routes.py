@@ -1,4 +1,6 @@
 import os
+import re
+import time
 import requests
 from flask import render_template, request, session, redirect, url_for
 from app import app
@@ -6,17 +8,37 @@ from app import app
 # Use environment variables for service URLs
 PRODUCT_SERVICE_URL = os.environ.get('PRODUCT_SERVICE_URL')
 
+# Top-rated products are the same for every visitor: keep the last list and,
+# once its Cache-Control max-age runs out, revalidate it with its ETag
+_top_rated = {'products': [], 'etag': None, 'expires_at': 0.0}
+MAX_AGE_RE = re.compile(r'max-age=(\d+)')
+
+def get_top_rated_products():
+    if time.monotonic() < _top_rated['expires_at']:
+        return _top_rated['products']
+    
+    headers = {'If-None-Match': _top_rated['etag']} if _top_rated['etag'] else {}
+    response = requests.get(f"{PRODUCT_SERVICE_URL}/recommendations/top_rated/", headers=headers)
+    if response.status_code == 200:
+        _top_rated['products'] = response.json()
+        _top_rated['etag'] = response.headers.get('ETag')
+    elif response.status_code != 304:
+        return _top_rated['products']
+    
+    max_age = MAX_AGE_RE.search(response.headers.get('Cache-Control', ''))
+    _top_rated['expires_at'] = time.monotonic() + (int(max_age.group(1)) if max_age else 0)
+    return _top_rated['products']
+
 @app.route('/')
 def home():
     """Homepage with recommendations"""
     # Fetch top-rated products
     top_rated_products = []
     try:
-        response = requests.get(f"{PRODUCT_SERVICE_URL}/recommendations/top_rated/")
-        if response.status_code == 200:
-            top_rated_products = response.json()
+        top_rated_products = get_top_rated_products()
     except Exception as e:
         app.logger.error(f"Error fetching top rated products: {e}")
+        top_rated_products = _top_rated['products']  # Last good list, if any
     
     # Fetch personalized recommendations if user is logged in
     personalized_recommendations = []
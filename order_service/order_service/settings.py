@@ -57,6 +57,20 @@ MICROSERVICE_URLS = {
     'CUSTOMER_SERVICE': 'http://localhost:8002/api',
 }
 
+# Shared HTTP client for inter-service calls (see orders/http_client.py)
+HTTP_CLIENT = {
+    'CONNECT_TIMEOUT': 2.0,
+    'READ_TIMEOUT': 5.0,
+    'MAX_RETRIES': 2,
+    'BACKOFF_FACTOR': 0.1,
+    'POOL_CONNECTIONS': 10,
+    'POOL_MAXSIZE': 50,
+    'METRICS_LOG_INTERVAL': 60,  # Per-host call/latency summary in the log
+}
+
+# Overall deadline (seconds) for the customer/product checks on order creation
+ORDER_VALIDATION_TIMEOUT = 3.0
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -1,4 +1,7 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, Sum, Value, When
+from django.utils import timezone
+from decimal import Decimal
 import uuid
 
 class OrderStatus(models.TextChoices):
@@ -11,6 +14,18 @@ class OrderStatus(models.TextChoices):
     CANCELED = 'CANCELED', 'Canceled'
     REFUNDED = 'REFUNDED', 'Refunded'
 
+# Statuses an order may move to from each status
+ORDER_STATUS_TRANSITIONS = {
+    OrderStatus.CREATED: {OrderStatus.PROCESSING, OrderStatus.PAYMENT_PENDING, OrderStatus.PAID, OrderStatus.CANCELED},
+    OrderStatus.PROCESSING: {OrderStatus.PAYMENT_PENDING, OrderStatus.PAID, OrderStatus.SHIPPED, OrderStatus.CANCELED},
+    OrderStatus.PAYMENT_PENDING: {OrderStatus.PROCESSING, OrderStatus.PAID, OrderStatus.CANCELED},
+    OrderStatus.PAID: {OrderStatus.PROCESSING, OrderStatus.SHIPPED, OrderStatus.CANCELED, OrderStatus.REFUNDED},
+    OrderStatus.SHIPPED: {OrderStatus.DELIVERED, OrderStatus.REFUNDED},
+    OrderStatus.DELIVERED: {OrderStatus.REFUNDED},
+    OrderStatus.CANCELED: set(),
+    OrderStatus.REFUNDED: set(),
+}
+
 class PaymentMethod(models.TextChoices):
     CREDIT_CARD = 'CREDIT_CARD', 'Credit Card'
     DEBIT_CARD = 'DEBIT_CARD', 'Debit Card'
@@ -18,6 +33,96 @@ class PaymentMethod(models.TextChoices):
     BANK_TRANSFER = 'BANK_TRANSFER', 'Bank Transfer'
     CASH_ON_DELIVERY = 'CASH_ON_DELIVERY', 'Cash on Delivery'
 
+class OrderManager(models.Manager):
+    def create_with_items(self, items_data, status_comment="Order created", **order_data):
+        """Create an order, its items and its first status entry in one transaction
+        
+        Items are inserted with a single bulk_create and the total is computed
+        in memory, so the number of queries does not grow with the item count.
+        """
+        items = [OrderItem(**item_data) for item_data in items_data]
+        for item in items:
+            item.subtotal = item.calculate_subtotal()
+        
+        with transaction.atomic():
+            order = self.model(
+                total_amount=sum((item.subtotal for item in items), Decimal('0')),
+                **order_data
+            )
+            order.save(force_insert=True, recalculate_total=False)
+            
+            for item in items:
+                item.order = order
+            OrderItem.objects.bulk_create(items)
+            
+            OrderStatusHistory.objects.create(
+                order=order,
+                status=order.status,
+                comment=status_comment
+            )
+        
+        return order
+    
+    def bulk_update_status(self, updates):
+        """Apply (order_id, status, comment) updates in one transaction
+        
+        The orders are locked and read with one query and every transition
+        is checked in memory, in the order given, so one order may move
+        through several statuses. A status an order already has is skipped.
+        If any update is invalid nothing is written; otherwise the orders
+        change with one UPDATE ... CASE and the history rows are inserted
+        with one bulk_create. Totals are left alone: items don't change here.
+        
+        Returns (changed order ids by new status, errors); errors is a list
+        of {'index', 'order_id', 'detail'} dicts.
+        """
+        with transaction.atomic():
+            current = dict(
+                self.select_for_update()
+                .filter(id__in={order_id for order_id, _, _ in updates})
+                .values_list('id', 'status')
+            )
+            
+            errors, history = [], []
+            for index, (order_id, new_status, comment) in enumerate(updates):
+                old_status = current.get(order_id)
+                if old_status is None:
+                    errors.append({'index': index, 'order_id': order_id, 'detail': 'Order not found'})
+                elif new_status == old_status:
+                    continue
+                elif new_status not in ORDER_STATUS_TRANSITIONS[old_status]:
+                    errors.append({
+                        'index': index,
+                        'order_id': order_id,
+                        'detail': f'Cannot change status from {old_status} to {new_status}'
+                    })
+                else:
+                    current[order_id] = new_status
+                    history.append(OrderStatusHistory(order_id=order_id, status=new_status, comment=comment))
+            
+            if errors:
+                return {}, errors
+            
+            changed = {}
+            for entry in history:
+                # An order updated more than once ends in its last status
+                changed[entry.order_id] = current[entry.order_id]
+            ids_by_status = {}
+            for order_id, new_status in changed.items():
+                ids_by_status.setdefault(new_status, []).append(order_id)
+            
+            if changed:
+                self.filter(id__in=changed).update(
+                    status=Case(
+                        *[When(id__in=ids, then=Value(new_status)) for new_status, ids in ids_by_status.items()],
+                        output_field=models.CharField()
+                    ),
+                    updated_at=timezone.now()
+                )
+                OrderStatusHistory.objects.bulk_create(history)
+        
+        return ids_by_status, []
+
 class Order(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     order_number = models.CharField(max_length=20, unique=True, editable=False)
@@ -41,7 +146,9 @@ class Order(models.Model):
     payment_details = models.JSONField(null=True, blank=True)  # Store payment details as JSON
     notes = models.TextField(blank=True, null=True)
     
-    def save(self, *args, **kwargs):
+    objects = OrderManager()
+    
+    def save(self, *args, recalculate_total=True, **kwargs):
         # Generate order number on first save
         if not self.order_number:
             # Format: ORD-{year}{month}{day}-{random_6_digits}
@@ -52,11 +159,15 @@ class Order(models.Model):
             self.order_number = f"ORD-{now.strftime('%Y%m%d')}-{rand}"
         
         # Calculate total if order items exist and this is an update
-        if self.pk:  # If the object has already been created
-            self.total_amount = sum(item.subtotal for item in self.items.all())
+        if recalculate_total and not self._state.adding:
+            self.total_amount = self.calculate_total()
         
         super().save(*args, **kwargs)
     
+    def calculate_total(self):
+        """Sum the item subtotals with a single aggregate query"""
+        return self.items.aggregate(total=Sum('subtotal'))['total'] or Decimal('0')
+    
     def __str__(self):
         return f"Order {self.order_number}"
 
@@ -72,11 +183,14 @@ class OrderItem(models.Model):
     
     def save(self, *args, **kwargs):
         # Calculate subtotal
-        self.subtotal = self.unit_price * self.quantity
+        self.subtotal = self.calculate_subtotal()
         super().save(*args, **kwargs)
         
         # Update order total
-        self.order.save()
+        self.order.save(update_fields=['total_amount', 'updated_at'])
+    
+    def calculate_subtotal(self):
+        return self.unit_price * self.quantity
     
     def __str__(self):
         return f"{self.quantity} x {self.product_data.get('name', 'Unknown Product')}"
@@ -2,6 +2,10 @@ from rest_framework import serializers
 from .models import Order, OrderItem, OrderStatusHistory
 
 class OrderItemSerializer(serializers.ModelSerializer):
+    product_type = serializers.ChoiceField(choices=[('book', 'Book'), 
+                                                    ('clothing', 'Clothing'), 
+                                                    ('mobile', 'Mobile')])
+    
     class Meta:
         model = OrderItem
         fields = ['id', 'product_id', 'product_type', 'product_data', 
@@ -34,24 +38,18 @@ class OrderCreateSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         items_data = validated_data.pop('items')
-        order = Order.objects.create(**validated_data)
-        
-        # Create initial status history entry
-        OrderStatusHistory.objects.create(
-            order=order,
-            status=order.status,
-            comment="Order created"
-        )
-        
-        # Create order items
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
-        
-        # Recalculate total (triggers save method)
-        order.save()
         
-        return order
+        # Order, items and initial status history are written in one transaction
+        return Order.objects.create_with_items(items_data, **validated_data)
 
 class OrderStatusUpdateSerializer(serializers.Serializer):
     status = serializers.ChoiceField(choices=OrderStatusHistory.status.field.choices)
-    comment = serializers.CharField(required=False, allow_blank=True)
\ No newline at end of file
+    comment = serializers.CharField(required=False, allow_blank=True)
+
+class BulkOrderStatusItemSerializer(serializers.Serializer):
+    order_id = serializers.UUIDField()
+    status = serializers.ChoiceField(choices=OrderStatusHistory.status.field.choices)
+    comment = serializers.CharField(required=False, allow_blank=True, default='')
+
+class BulkOrderStatusUpdateSerializer(serializers.Serializer):
+    updates = BulkOrderStatusItemSerializer(many=True, allow_empty=False, max_length=5000)
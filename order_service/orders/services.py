@@ -1,6 +1,44 @@
+import logging
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, wait
 from django.conf import settings
 
+from .http_client import get_client
+
+logger = logging.getLogger(__name__)
+
+# Shared pool for downstream lookups made while creating an order
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='order-validation')
+
+# products/batch/ accepts at most this many references per call
+PRODUCT_BATCH_SIZE = 200
+
+class ProductLookupRejected(Exception):
+    """Product service refused a lookup with a 4xx; detail holds its errors"""
+    
+    def __init__(self, response):
+        super().__init__(f"Product service rejected the lookup: HTTP {response.status_code}")
+        self.status_code = response.status_code
+        try:
+            self.detail = response.json()
+        except ValueError:
+            self.detail = response.text
+
+def _call_options(deadline, retry):
+    """Request options for a call that must finish by deadline (monotonic)
+    
+    Returns None once the deadline has passed. With a deadline the call
+    gets only the time left and no retries, so the worker running it is
+    free again by the deadline instead of finishing orphaned work.
+    """
+    if deadline is None:
+        return {'retry': retry}
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return None
+    return {'retry': False, 'timeout': remaining}
+
 class ProductServiceClient:
     """Client for interacting with the Product Service API"""
     
@@ -10,7 +48,7 @@ class ProductServiceClient:
     def get_product(self, product_type, product_id):
         url = f"{self.base_url}/{product_type}s/{product_id}/"
         try:
-            response = requests.get(url)
+            response = get_client().get(url)
             if response.status_code == 200:
                 return response.json()
         except requests.RequestException:
@@ -18,10 +56,53 @@ class ProductServiceClient:
             pass
         return None
     
+    def get_products(self, items, deadline=None):
+        """Fetch every referenced product, PRODUCT_BATCH_SIZE per batch call
+        
+        Returns a dict keyed by (product_type, product_id), or None if the
+        product service could not be reached or failed (5xx). Raises
+        ProductLookupRejected when it refuses the lookup (4xx): the
+        references themselves are bad, so retrying or skipping validation
+        would be wrong. With a deadline (time.monotonic() value) every call
+        is bounded by the time left, and running out counts as unreachable.
+        """
+        url = f"{self.base_url}/products/batch/"
+        refs = sorted({(item['product_type'], str(item['product_id'])) for item in items})
+        
+        products = {}
+        for start in range(0, len(refs), PRODUCT_BATCH_SIZE):
+            payload = {
+                'items': [
+                    {'product_type': product_type, 'product_id': product_id}
+                    for product_type, product_id in refs[start:start + PRODUCT_BATCH_SIZE]
+                ]
+            }
+            # Batch lookup is read-only, so it is safe to retry
+            options = _call_options(deadline, retry=True)
+            if options is None:
+                logger.warning("Product batch lookup ran out of time")
+                return None
+            try:
+                response = get_client().post(url, json=payload, **options)
+            except requests.RequestException as e:
+                logger.warning("Product batch lookup failed: %s", e)
+                return None
+            
+            if 400 <= response.status_code < 500:
+                raise ProductLookupRejected(response)
+            if response.status_code != 200:
+                logger.warning("Product batch lookup failed: HTTP %s", response.status_code)
+                return None
+            products.update(
+                ((product['product_type'], str(product['id'])), product)
+                for product in response.json()['products']
+            )
+        return products
+    
     def update_stock(self, product_type, product_id, quantity):
         url = f"{self.base_url}/{product_type}s/{product_id}/update_stock/"
         try:
-            response = requests.patch(url, json={"quantity_change": -quantity})
+            response = get_client().patch(url, json={"quantity_change": -quantity})
             return response.status_code == 200
         except requests.RequestException:
             # Log error
@@ -36,10 +117,57 @@ class CustomerServiceClient:
     def get_customer(self, customer_id):
         url = f"{self.base_url}/customers/{customer_id}/"
         try:
-            response = requests.get(url)
+            response = get_client().get(url)
             if response.status_code == 200:
                 return response.json()
         except requests.RequestException:
             # Log error
             pass
-        return None
\ No newline at end of file
+        return None
+    
+    def customer_exists(self, customer_id, deadline=None):
+        """Check a customer exists, assuming it does if the service is down"""
+        url = f"{self.base_url}/customers/{customer_id}/"
+        options = _call_options(deadline, retry=None)
+        if options is None:
+            return True
+        try:
+            response = get_client().get(url, **options)
+            return response.status_code == 200
+        except requests.RequestException:
+            # Fault tolerance in microservices
+            return True
+
+def fetch_order_dependencies(customer_id, items, timeout=None):
+    """Check the customer and fetch every product concurrently
+    
+    Both lookups share one deadline, so order validation takes as long as
+    the slowest downstream call instead of the sum of all of them. Returns
+    (customer_exists, products); a lookup that misses the deadline falls
+    back to the same result as an unreachable service.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'ORDER_VALIDATION_TIMEOUT', 5.0)
+    
+    # The calls themselves are bounded by the deadline too, so a slow service
+    # can't leave the shared pool full of requests nobody waits for
+    deadline = time.monotonic() + timeout
+    customer_future = _executor.submit(CustomerServiceClient().customer_exists, customer_id, deadline)
+    products_future = _executor.submit(ProductServiceClient().get_products, items, deadline)
+    wait([customer_future, products_future], timeout=timeout)
+    
+    customer_exists = True
+    if customer_future.done():
+        customer_exists = customer_future.result()
+    else:
+        customer_future.cancel()
+        logger.warning("Customer lookup for %s missed the %.1fs deadline", customer_id, timeout)
+    
+    products = None
+    if products_future.done():
+        products = products_future.result()
+    else:
+        products_future.cancel()
+        logger.warning("Product lookup missed the %.1fs deadline", timeout)
+    
+    return customer_exists, products
\ No newline at end of file
@@ -1,3 +1,300 @@
+import uuid
+from decimal import Decimal
+from unittest import mock
+
+import requests
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .http_client import ServiceClient
+from .models import Order, OrderStatus, OrderStatusHistory
+from .serializers import OrderCreateSerializer
+from .services import (
+    PRODUCT_BATCH_SIZE, ProductLookupRejected, ProductServiceClient, fetch_order_dependencies
+)
+from .views import OrderViewSet
+
+
+class OrderCreateQueryCountTests(TestCase):
+    # SAVEPOINT, order INSERT, items bulk INSERT, history INSERT, RELEASE SAVEPOINT
+    EXPECTED_QUERIES = 5
+
+    def _order_data(self, line_count):
+        return {
+            'customer_id': str(uuid.uuid4()),
+            'shipping_address': {'street': '1 Main St', 'city': 'Hanoi'},
+            'items': [
+                {
+                    'product_id': str(uuid.uuid4()),
+                    'product_type': 'book',
+                    'product_data': {'name': f'Book {i}'},
+                    'quantity': 2,
+                    'unit_price': '10.50',
+                }
+                for i in range(line_count)
+            ],
+        }
+
+    def test_query_count_does_not_grow_with_items(self):
+        for line_count in (1, 10, 100):
+            with self.subTest(line_count=line_count):
+                serializer = OrderCreateSerializer(data=self._order_data(line_count))
+                self.assertTrue(serializer.is_valid(), serializer.errors)
+
+                with self.assertNumQueries(self.EXPECTED_QUERIES):
+                    order = serializer.save()
+
+                order = Order.objects.get(pk=order.pk)
+                self.assertEqual(order.items.count(), line_count)
+                self.assertEqual(order.total_amount, Decimal('21.00') * line_count)
+                self.assertEqual(
+                    OrderStatusHistory.objects.filter(order=order).count(), 1
+                )
+
+    def test_item_save_updates_order_total(self):
+        serializer = OrderCreateSerializer(data=self._order_data(3))
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        order = serializer.save()
+
+        item = order.items.first()
+        item.quantity = 4
+        item.save()
+
+        order.refresh_from_db()
+        self.assertEqual(order.total_amount, Decimal('84.00'))
+
+
+class OrderCreateViewTests(TestCase):
+    def test_prices_from_product_service_are_converted(self):
+        product_id = uuid.uuid4()
+        # Prices arrive from the batch lookup as JSON strings
+        products = {('book', str(product_id)): {
+            'id': str(product_id), 'name': 'Book', 'price': '12.50',
+            'category': 'fiction', 'stock_quantity': 5,
+        }}
+        data = {
+            'customer_id': str(uuid.uuid4()),
+            'shipping_address': {'city': 'Hanoi'},
+            'items': [{
+                'product_id': str(product_id),
+                'product_type': 'book',
+                'product_data': {},
+                'quantity': 3,
+                'unit_price': '1.00',
+            }],
+        }
+
+        with mock.patch('orders.views.fetch_order_dependencies', return_value=(True, products)):
+            response = APIClient().post('/api/orders/', data, format='json')
+
+        self.assertEqual(response.status_code, 201, response.data)
+        order = Order.objects.get()
+        self.assertEqual(order.total_amount, Decimal('37.50'))
+        self.assertEqual(order.items.get().unit_price, Decimal('12.50'))
+
+
+class BulkOrderStatusUpdateTests(TestCase):
+    # SAVEPOINT, locked SELECT, UPDATE ... CASE, history INSERT, RELEASE SAVEPOINT
+    EXPECTED_QUERIES = 5
+
+    def _create_orders(self, count):
+        return [
+            Order.objects.create_with_items(
+                [], customer_id=uuid.uuid4(), shipping_address={'city': 'Hanoi'}
+            )
+            for _ in range(count)
+        ]
+
+    def test_query_count_does_not_grow_with_orders(self):
+        for count in (1, 10, 100):
+            with self.subTest(count=count):
+                orders = self._create_orders(count)
+                updates = [
+                    (order.id, OrderStatus.PAID if i % 2 else OrderStatus.CANCELED, 'bulk')
+                    for i, order in enumerate(orders)
+                ]
+
+                with self.assertNumQueries(self.EXPECTED_QUERIES):
+                    changed, errors = Order.objects.bulk_update_status(updates)
+
+                self.assertEqual(errors, [])
+                for order_id, new_status, _ in updates:
+                    self.assertEqual(Order.objects.get(pk=order_id).status, new_status)
+                    self.assertEqual(
+                        OrderStatusHistory.objects.filter(order_id=order_id, status=new_status).count(), 1
+                    )
+
+    def test_invalid_transition_writes_nothing(self):
+        paid, delivered = self._create_orders(2)
+        Order.objects.filter(pk=delivered.pk).update(status=OrderStatus.DELIVERED)
+
+        changed, errors = Order.objects.bulk_update_status([
+            (paid.id, OrderStatus.PAID, ''),
+            (delivered.id, OrderStatus.SHIPPED, ''),
+            (uuid.uuid4(), OrderStatus.PAID, ''),
+        ])
+
+        self.assertEqual(changed, {})
+        self.assertEqual([error['index'] for error in errors], [1, 2])
+        self.assertEqual(Order.objects.get(pk=paid.pk).status, OrderStatus.CREATED)
+        self.assertFalse(OrderStatusHistory.objects.filter(status=OrderStatus.PAID).exists())
+
+    def test_order_can_move_through_several_statuses(self):
+        order, = self._create_orders(1)
+
+        changed, errors = Order.objects.bulk_update_status([
+            (order.id, OrderStatus.PAID, ''),
+            (order.id, OrderStatus.SHIPPED, ''),
+            (order.id, OrderStatus.SHIPPED, 'retry'),
+        ])
+
+        self.assertEqual(errors, [])
+        self.assertEqual(changed, {OrderStatus.SHIPPED: [order.id]})
+        self.assertEqual(Order.objects.get(pk=order.pk).status, OrderStatus.SHIPPED)
+        self.assertEqual(order.status_history.count(), 3)  # CREATED, PAID, SHIPPED
+
+
+class OrderStatusUpdateViewTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.order = Order.objects.create_with_items(
+            [], customer_id=uuid.uuid4(), shipping_address={'city': 'Hanoi'}
+        )
+
+    def _update_status(self, new_status):
+        return self.client.post(
+            f'/api/orders/{self.order.id}/update_status/', {'status': new_status}, format='json'
+        )
+
+    def test_invalid_transition_is_rejected(self):
+        Order.objects.filter(pk=self.order.pk).update(status=OrderStatus.DELIVERED)
+
+        response = self._update_status(OrderStatus.SHIPPED)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).status, OrderStatus.DELIVERED)
+        self.assertEqual(self.order.status_history.count(), 1)
+
+    def test_unchanged_status_adds_no_history(self):
+        response = self._update_status(OrderStatus.CREATED)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['status'], 'status unchanged')
+        self.assertEqual(self.order.status_history.count(), 1)
+
+    def test_canceled_orders_are_handled_in_one_call(self):
+        other = Order.objects.create_with_items(
+            [], customer_id=uuid.uuid4(), shipping_address={'city': 'Hanoi'}
+        )
+
+        with mock.patch.object(OrderViewSet, '_handle_cancellations') as handle_cancellations:
+            response = self.client.post('/api/orders/bulk_update_status/', [
+                {'order_id': str(self.order.id), 'status': OrderStatus.CANCELED},
+                {'order_id': str(other.id), 'status': OrderStatus.CANCELED},
+            ], format='json')
+
+        self.assertEqual(response.status_code, 200)
+        handle_cancellations.assert_called_once()
+        self.assertCountEqual(handle_cancellations.call_args.args[0], [self.order.id, other.id])
+
+
+class ProductBatchLookupTests(TestCase):
+    def _items(self, count):
+        return [{'product_type': 'book', 'product_id': uuid.uuid4()} for _ in range(count)]
+
+    def _response(self, status_code, payload):
+        response = mock.Mock(status_code=status_code)
+        response.json.return_value = payload
+        return response
+
+    def _found(self, url, json, **kwargs):
+        return self._response(200, {'products': [
+            {'product_type': ref['product_type'], 'id': ref['product_id']} for ref in json['items']
+        ]})
+
+    def test_large_orders_are_looked_up_in_chunks(self):
+        items = self._items(PRODUCT_BATCH_SIZE * 2 + 50)
+        client = mock.Mock()
+        client.post.side_effect = self._found
+
+        with mock.patch('orders.services.get_client', return_value=client):
+            products = ProductServiceClient().get_products(items)
+
+        self.assertEqual(client.post.call_count, 3)
+        self.assertTrue(all(len(call.kwargs['json']['items']) <= PRODUCT_BATCH_SIZE
+                            for call in client.post.call_args_list))
+        self.assertEqual(len(products), len(items))
+
+    def test_rejected_lookup_raises_instead_of_skipping_validation(self):
+        client = mock.Mock()
+        client.post.return_value = self._response(400, {'items': ['bad product_type']})
+
+        with mock.patch('orders.services.get_client', return_value=client):
+            with self.assertRaises(ProductLookupRejected) as raised:
+                ProductServiceClient().get_products(self._items(2))
+        self.assertEqual(raised.exception.detail, {'items': ['bad product_type']})
+
+    def test_server_error_means_service_unavailable(self):
+        client = mock.Mock()
+        client.post.return_value = self._response(503, {})
+
+        with mock.patch('orders.services.get_client', return_value=client):
+            self.assertIsNone(ProductServiceClient().get_products(self._items(2)))
+
+    def test_dependency_calls_are_bounded_by_the_validation_deadline(self):
+        client = mock.Mock()
+        client.post.side_effect = self._found
+        client.get.return_value = self._response(200, {})
+
+        with mock.patch('orders.services.get_client', return_value=client):
+            customer_exists, products = fetch_order_dependencies(uuid.uuid4(), self._items(1), timeout=1.5)
+
+        self.assertTrue(customer_exists)
+        self.assertEqual(len(products), 1)
+        for call in (client.get.call_args, client.post.call_args):
+            self.assertIs(call.kwargs['retry'], False)
+            self.assertLessEqual(call.kwargs['timeout'], 1.5)
+
+
+class ServiceClientRetryTests(TestCase):
+    def _client(self, *outcomes):
+        client = ServiceClient(config={'MAX_RETRIES': 2, 'BACKOFF_FACTOR': 0.1, 'METRICS_LOG_INTERVAL': 0})
+        client.session = mock.Mock()
+        client.session.request.side_effect = [
+            mock.Mock(status_code=outcome) if isinstance(outcome, int) else outcome
+            for outcome in outcomes
+        ]
+        return client
+
+    def test_idempotent_request_is_retried_with_jittered_exponential_backoff(self):
+        client = self._client(requests.ConnectionError('reset'), 503, 200)
+
+        # uniform() returning its upper bound exposes the backoff ceiling
+        with mock.patch('orders.http_client.random.uniform', side_effect=lambda low, high: high), \
+                mock.patch('orders.http_client.time.sleep') as sleep:
+            response = client.get('http://product-service/api/products/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(client.session.request.call_count, 3)
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [0.1, 0.2])
+        self.assertEqual(client.metrics.snapshot()['product-service']['retries'], 2)
+
+    def test_retries_stop_after_max_retries(self):
+        client = self._client(503, 503, 503, 200)
+
+        with mock.patch('orders.http_client.time.sleep'):
+            response = client.get('http://product-service/api/products/')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(client.session.request.call_count, 3)
+        self.assertEqual(client.metrics.snapshot()['product-service']['errors'], 1)
+
+    def test_post_is_not_retried_unless_asked(self):
+        client = self._client(requests.ConnectionError('reset'), 200)
+
+        with mock.patch('orders.http_client.time.sleep') as sleep:
+            with self.assertRaises(requests.ConnectionError):
+                client.post('http://payment-service/api/payments/', json={})
 
-# Create your tests here.
+        self.assertEqual(client.session.request.call_count, 1)
+        sleep.assert_not_called()
@@ -4,12 +4,14 @@ from rest_framework.response import Response
 from django.conf import settings
 import requests
 import json
+from decimal import Decimal
 
-from .models import Order, OrderItem, OrderStatusHistory, OrderStatus
+from .models import Order, OrderItem, OrderStatus
 from .serializers import (
     OrderSerializer, OrderCreateSerializer, OrderStatusUpdateSerializer,
-    OrderItemSerializer
+    OrderItemSerializer, BulkOrderStatusUpdateSerializer
 )
+from .services import ProductLookupRejected, fetch_order_dependencies
 
 class OrderViewSet(viewsets.ModelViewSet):
     queryset = Order.objects.all().order_by('-created_at')
@@ -23,9 +25,16 @@ class OrderViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        # Validate customer exists
+        # Validate customer and fetch all products concurrently
         customer_id = serializer.validated_data['customer_id']
-        customer_exists = self._validate_customer(customer_id)
+        items_data = serializer.validated_data.get('items', [])
+        try:
+            customer_exists, products = fetch_order_dependencies(customer_id, items_data)
+        except ProductLookupRejected as e:
+            return Response(
+                {"detail": "Invalid products", "errors": e.detail},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         if not customer_exists:
             return Response(
                 {"detail": "Customer not found"}, 
@@ -33,16 +42,15 @@ class OrderViewSet(viewsets.ModelViewSet):
             )
         
         # Validate products exist and have stock
-        items_data = serializer.validated_data.get('items', [])
-        invalid_items = self._validate_products(items_data)
+        invalid_items = self._validate_products(items_data, products)
         if invalid_items:
             return Response(
                 {"detail": "Invalid products", "invalid_items": invalid_items},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Fetch and enhance product details
-        self._enhance_product_data(items_data)
+        # Enhance items with the fetched product details
+        self._enhance_product_data(items_data, products)
         
         # Create the order
         self.perform_create(serializer)
@@ -62,28 +70,53 @@ class OrderViewSet(viewsets.ModelViewSet):
             new_status = serializer.validated_data['status']
             comment = serializer.validated_data.get('comment', '')
             
-            # Update order status
-            order.status = new_status
-            order.save()
+            # Same rules as bulk_update_status: the transition is checked
+            # under the row lock and a status the order already has is skipped
+            changed, errors = Order.objects.bulk_update_status([(order.id, new_status, comment)])
+            if errors:
+                return Response({'detail': errors[0]['detail']}, status=status.HTTP_400_BAD_REQUEST)
             
-            # Create status history entry
-            OrderStatusHistory.objects.create(
-                order=order,
-                status=new_status,
-                comment=comment
-            )
-            
-            # If the order is canceled, perhaps we could restore inventory
-            if new_status == OrderStatus.CANCELED:
-                self._handle_cancellation(order)
+            self._handle_cancellations(changed.get(OrderStatus.CANCELED, []))
                 
             return Response({
-                'status': 'status updated',
+                'status': 'status updated' if changed else 'status unchanged',
                 'new_status': new_status
             })
         else:
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'])
+    def bulk_update_status(self, request):
+        """Update the status of many orders at once
+        
+        Takes {"updates": [{"order_id", "status", "comment"}, ...]} (or just
+        the list). All updates are applied or, if any transition is invalid,
+        none are.
+        """
+        data = {'updates': request.data} if isinstance(request.data, list) else request.data
+        serializer = BulkOrderStatusUpdateSerializer(data=data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        updates = [
+            (update['order_id'], update['status'], update['comment'])
+            for update in serializer.validated_data['updates']
+        ]
+        changed, errors = Order.objects.bulk_update_status(updates)
+        if errors:
+            return Response({
+                'detail': 'Invalid status updates, no orders were changed',
+                'errors': errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        self._handle_cancellations(changed.get(OrderStatus.CANCELED, []))
+        
+        return Response({
+            'status': 'statuses updated',
+            'updated': sum(len(ids) for ids in changed.values()),
+            'orders': changed
+        })
+    
     @action(detail=True, methods=['get'])
     def history(self, request, pk=None):
         order = self.get_object()
@@ -92,84 +125,66 @@ class OrderViewSet(viewsets.ModelViewSet):
         serializer = OrderStatusHistorySerializer(history, many=True)
         return Response(serializer.data)
     
-    def _validate_customer(self, customer_id):
-        """Validate customer exists by calling customer service"""
-        # In a real-world scenario, you'd make an API call to the customer service
-        try:
-            customer_service_url = f"{settings.MICROSERVICE_URLS['CUSTOMER_SERVICE']}/customers/{customer_id}/"
-            response = requests.get(customer_service_url)
-            return response.status_code == 200
-        except requests.RequestException:
-            # Log the error but continue - fault tolerance in microservices
-            return True  # Assume customer exists if service is down
-    
-    def _validate_products(self, items_data):
+    def _validate_products(self, items_data, products):
         """Validate products exist and have stock"""
         invalid_items = []
         
+        if products is None:
+            # Product service is down - fault tolerance, skip validation
+            return invalid_items
+        
         for item in items_data:
             product_id = item['product_id']
-            product_type = item['product_type']
             quantity = item['quantity']
+            product_data = products.get((item['product_type'], str(product_id)))
             
             # Check if product exists and has enough stock
-            try:
-                product_service_url = f"{settings.MICROSERVICE_URLS['PRODUCT_SERVICE']}/{product_type}s/{product_id}/"
-                response = requests.get(product_service_url)
-                
-                if response.status_code != 200:
-                    invalid_items.append({
-                        'product_id': product_id,
-                        'reason': 'Product not found'
-                    })
-                    continue
-                
-                product_data = response.json()
-                if product_data['stock_quantity'] < quantity:
-                    invalid_items.append({
-                        'product_id': product_id,
-                        'reason': 'Insufficient stock',
-                        'available': product_data['stock_quantity'],
-                        'requested': quantity
-                    })
-            except requests.RequestException:
-                # Log the error but continue - fault tolerance
-                pass
+            if product_data is None:
+                invalid_items.append({
+                    'product_id': product_id,
+                    'reason': 'Product not found'
+                })
+            elif product_data['stock_quantity'] < quantity:
+                invalid_items.append({
+                    'product_id': product_id,
+                    'reason': 'Insufficient stock',
+                    'available': product_data['stock_quantity'],
+                    'requested': quantity
+                })
                 
         return invalid_items
     
-    def _enhance_product_data(self, items_data):
-        """Fetch full product details from product service"""
+    def _enhance_product_data(self, items_data, products):
+        """Attach product details from the batch lookup to each item"""
         for item in items_data:
             product_id = item['product_id']
-            product_type = item['product_type']
+            product_data = (products or {}).get((item['product_type'], str(product_id)))
             
-            try:
-                product_service_url = f"{settings.MICROSERVICE_URLS['PRODUCT_SERVICE']}/{product_type}s/{product_id}/"
-                response = requests.get(product_service_url)
-                
-                if response.status_code == 200:
-                    product_data = response.json()
-                    # Store relevant product data for order history
-                    item['product_data'] = {
-                        'id': product_data['id'],
-                        'name': product_data['name'],
-                        'price': product_data['price'],
-                        'category': product_data['category'],
-                        # Add more fields as needed
-                    }
-                    # Set unit price from product data
-                    item['unit_price'] = product_data['price']
-            except requests.RequestException:
-                # Log the error but continue
+            if product_data is not None:
+                # Store relevant product data for order history
+                item['product_data'] = {
+                    'id': product_data['id'],
+                    'name': product_data['name'],
+                    'price': product_data['price'],
+                    'category': product_data['category'],
+                    # Add more fields as needed
+                }
+                # Set unit price from product data; the lookup returns it as
+                # a JSON string, the model and subtotal need a Decimal
+                item['unit_price'] = Decimal(str(product_data['price']))
+            elif products is None:
                 # Use placeholder data if service is down
                 item['product_data'] = {
                     'id': product_id,
                     'name': 'Unknown Product',
                 }
     
-    def _handle_cancellation(self, order):
-        """Handle order cancellation - could restore inventory"""
+    def _handle_cancellations(self, order_ids):
+        """Handle canceled orders - could restore inventory
+        
+        Called once per request with every order it canceled, so stock can
+        be restored with one batched call whatever the number of orders.
+        """
         # This would typically call the product service to restore stock
         pass
 
@@ -60,6 +60,31 @@ MICROSERVICE_URLS = {
     'ORDER_SERVICE': 'http://localhost:8003/api',
 }
 
+# Shared HTTP client for inter-service calls (see payments/http_client.py)
+HTTP_CLIENT = {
+    'CONNECT_TIMEOUT': 2.0,
+    'READ_TIMEOUT': 5.0,
+    'MAX_RETRIES': 2,
+    'BACKOFF_FACTOR': 0.1,
+    'POOL_CONNECTIONS': 10,
+    'POOL_MAXSIZE': 50,
+    'METRICS_LOG_INTERVAL': 60,  # Per-host call/latency summary in the log
+}
+
+# Transactional outbox (see outbox.py): relay_outbox delivers queued calls in
+# batches; failed deliveries are retried after RETRY_BACKOFF * 2**n seconds,
+# capped at MAX_BACKOFF, until they succeed. A relay whose poll fails (e.g.
+# the database is busy) waits up to MAX_ERROR_BACKOFF seconds before retrying
+OUTBOX = {
+    'WORKERS': 1,
+    'BATCH_SIZE': 100,
+    'POLL_INTERVAL': 1.0,
+    'RETRY_BACKOFF': 5,
+    'MAX_BACKOFF': 3600,
+    'VISIBILITY_TIMEOUT': 60,
+    'MAX_ERROR_BACKOFF': 60,
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
@@ -73,6 +98,30 @@ PAYMENT_GATEWAYS = {
     }
 }
 
+# Gateway calls run on a background event loop (see payments/dispatcher.py):
+# at most MAX_IN_FLIGHT calls at once per process, results written back by
+# FINISH_WORKERS threads
+PAYMENT_DISPATCHER = {
+    'MAX_IN_FLIGHT': 500,
+    'FINISH_WORKERS': 4,
+}
+
+# Responses to process/refund requests sent with an Idempotency-Key header
+# are stored for TTL seconds; a retry with the same key gets the stored
+# response instead of a second gateway call
+PAYMENT_IDEMPOTENCY = {
+    'TTL': 24 * 60 * 60,
+}
+
+# reconcile_payments: payments PROCESSING or REFUNDING for longer than
+# STALE_AFTER seconds are checked with the gateway, BATCH_SIZE at a time with
+# up to CONCURRENCY status calls in flight
+PAYMENT_RECONCILIATION = {
+    'BATCH_SIZE': 500,
+    'CONCURRENCY': 50,
+    'STALE_AFTER': 15 * 60,
+}
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -140,3 +189,10 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.1/howto/static-files/
 
 STATIC_URL = '/static/'
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
+# AutoField, as in the existing migrations of the models without a UUID
+# primary key (IdempotencyKey, and OutboxMessage, which is read in id order)
+
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
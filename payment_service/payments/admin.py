@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Payment, PaymentHistory
+from .models import IdempotencyKey, OutboxMessage, Payment, PaymentHistory
 
 class PaymentHistoryInline(admin.TabularInline):
     model = PaymentHistory
@@ -35,4 +35,18 @@ class PaymentHistoryAdmin(admin.ModelAdmin):
     
     def payment_id(self, obj):
         return obj.payment.id
-    payment_id.short_description = 'Payment ID'
\ No newline at end of file
+    payment_id.short_description = 'Payment ID'
+
+@admin.register(IdempotencyKey)
+class IdempotencyKeyAdmin(admin.ModelAdmin):
+    list_display = ('key', 'endpoint', 'payment', 'response_status', 'created_at', 'expires_at')
+    list_filter = ('endpoint', 'response_status')
+    search_fields = ('key', 'payment__id')
+    readonly_fields = ('created_at',)
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'service', 'path', 'status', 'attempts', 'available_at', 'created_at')
+    list_filter = ('status', 'service')
+    search_fields = ('path', 'key', 'last_error')
+    readonly_fields = ('created_at',)
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+class GatewayDispatcher:
+    """Runs async gateway calls on one background event loop
+
+    Request threads submit a call and return straight away. Waiting on the
+    gateway costs no thread, so a single process keeps up to max_in_flight
+    calls going at once. Each result is handed to an on_done callback on a
+    small thread pool, which is where the (blocking) database writes go.
+    """
+
+    def __init__(self, max_in_flight=500, finish_workers=4, name='payment-gateway'):
+        self.max_in_flight = max_in_flight
+        self.name = name
+        self._finish_executor = ThreadPoolExecutor(finish_workers, thread_name_prefix=f'{name}-finish')
+        self._loop = None
+        self._semaphore = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, call, *args, on_done=None, on_error=None):
+        """Schedule call(*args) (a coroutine function) and return a Future
+
+        on_done(result) runs on the finish pool once the gateway answers;
+        the Future resolves to its return value. If the gateway call
+        raises, on_error(exception) runs on the finish pool instead and
+        the Future holds the exception.
+        """
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(self._run(call, args, on_done, on_error), loop)
+
+    async def _run(self, call, args, on_done, on_error):
+        if self._semaphore is None:
+            # Created on the loop thread so it belongs to this loop
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        async with self._semaphore:
+            try:
+                result = await call(*args)
+            except Exception as e:
+                logger.exception("%s: gateway call %s failed", self.name, getattr(call, '__name__', call))
+                error = e
+            else:
+                error = None
+        if error is not None:
+            if on_error is not None:
+                await self._finish(on_error, error, call)
+            raise error
+        if on_done is None:
+            return result
+        return await self._finish(on_done, result, call)
+
+    async def _finish(self, callback, value, call):
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._finish_executor, callback, value)
+        except Exception:
+            logger.exception("%s: handling the result of %s failed", self.name, getattr(call, '__name__', call))
+            raise
+
+    def _ensure_loop(self):
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name=self.name, daemon=True).start()
+                self._loop = loop
+        return self._loop
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_gateway_dispatcher():
+    """Return the process-wide GatewayDispatcher"""
+    global _dispatcher
+    if _dispatcher is None:
+        with _dispatcher_lock:
+            if _dispatcher is None:
+                config = getattr(settings, 'PAYMENT_DISPATCHER', {})
+                _dispatcher = GatewayDispatcher(
+                    max_in_flight=config.get('MAX_IN_FLIGHT', 500),
+                    finish_workers=config.get('FINISH_WORKERS', 4),
+                )
+    return _dispatcher
@@ -1,3 +1,4 @@
+import asyncio
 import random
 import uuid
 import time
@@ -19,21 +20,44 @@ class PaymentGateway(ABC):
     @abstractmethod
     def check_payment_status(self, transaction_id):
         pass
+    
+    @abstractmethod
+    def check_refund_status(self, transaction_id):
+        pass
 
-class DemoPaymentGateway(PaymentGateway):
-    """Demo payment gateway for testing"""
+class AsyncPaymentGateway(ABC):
+    """Abstract base class for payment gateways with a non-blocking client
+    
+    Same calls and results as PaymentGateway, as coroutines, so one event
+    loop can keep many gateway calls in flight (see payments/dispatcher.py).
+    """
+    
+    @abstractmethod
+    async def process_payment(self, amount, currency, payment_details):
+        pass
+    
+    @abstractmethod
+    async def refund_payment(self, transaction_id, amount=None):
+        pass
+    
+    @abstractmethod
+    async def check_payment_status(self, transaction_id):
+        pass
+    
+    @abstractmethod
+    async def check_refund_status(self, transaction_id):
+        pass
+
+class DemoGatewayResults:
+    """Simulated gateway outcomes shared by the sync and async demo gateways"""
     
     def __init__(self):
         # Get configuration from settings
         config = settings.PAYMENT_GATEWAYS.get('DEMO_GATEWAY', {})
         self.api_key = config.get('API_KEY', 'fake_api_key')
         self.success_rate = config.get('SUCCESS_RATE', 0.9)
-        
-    def process_payment(self, amount, currency, payment_details):
-        """Process a payment"""
-        # Simulate processing time
-        time.sleep(0.5)
-        
+    
+    def _payment_result(self, payment_details):
         # Generate transaction ID
         transaction_id = str(uuid.uuid4())
         
@@ -41,6 +65,7 @@ class DemoPaymentGateway(PaymentGateway):
         is_successful = random.random() < self.success_rate
         
         # For cash on delivery, always succeed
+        payment_details = payment_details or {}
         if payment_details.get('method') == 'CASH_ON_DELIVERY':
             is_successful = True
         
@@ -66,11 +91,7 @@ class DemoPaymentGateway(PaymentGateway):
                 'timestamp': datetime.now().isoformat()
             }
     
-    def refund_payment(self, transaction_id, amount=None):
-        """Refund a payment"""
-        # Simulate processing time
-        time.sleep(0.5)
-        
+    def _refund_result(self, transaction_id):
         # Generate refund ID
         refund_id = str(uuid.uuid4())
         
@@ -96,11 +117,7 @@ class DemoPaymentGateway(PaymentGateway):
                 'timestamp': datetime.now().isoformat()
             }
     
-    def check_payment_status(self, transaction_id):
-        """Check status of a payment"""
-        # Simulate processing time
-        time.sleep(0.2)
-        
+    def _status_result(self, transaction_id):
         # For demo purposes, most transactions are completed
         status = random.choices(
             ['COMPLETED', 'PROCESSING', 'FAILED'], 
@@ -113,8 +130,76 @@ class DemoPaymentGateway(PaymentGateway):
             'status': status,
             'timestamp': datetime.now().isoformat()
         }
+    
+    def _refund_status_result(self, transaction_id):
+        # FAILED: no refund went through, the payment is still paid
+        status = random.choices(
+            ['REFUNDED', 'REFUNDING', 'FAILED'], 
+            weights=[0.9, 0.05, 0.05], 
+            k=1
+        )[0]
+        
+        return {
+            'transaction_id': transaction_id,
+            'status': status,
+            'timestamp': datetime.now().isoformat()
+        }
+
+class DemoPaymentGateway(DemoGatewayResults, PaymentGateway):
+    """Demo payment gateway for testing"""
+    
+    def process_payment(self, amount, currency, payment_details):
+        """Process a payment"""
+        # Simulate processing time
+        time.sleep(0.5)
+        return self._payment_result(payment_details)
+    
+    def refund_payment(self, transaction_id, amount=None):
+        """Refund a payment"""
+        # Simulate processing time
+        time.sleep(0.5)
+        return self._refund_result(transaction_id)
+    
+    def check_payment_status(self, transaction_id):
+        """Check status of a payment"""
+        # Simulate processing time
+        time.sleep(0.2)
+        return self._status_result(transaction_id)
+    
+    def check_refund_status(self, transaction_id):
+        """Check status of a payment's refund"""
+        # Simulate processing time
+        time.sleep(0.2)
+        return self._refund_status_result(transaction_id)
+
+class DemoAsyncPaymentGateway(DemoGatewayResults, AsyncPaymentGateway):
+    """Demo payment gateway whose calls wait without blocking a thread"""
+    
+    async def process_payment(self, amount, currency, payment_details):
+        """Process a payment"""
+        await asyncio.sleep(0.5)
+        return self._payment_result(payment_details)
+    
+    async def refund_payment(self, transaction_id, amount=None):
+        """Refund a payment"""
+        await asyncio.sleep(0.5)
+        return self._refund_result(transaction_id)
+    
+    async def check_payment_status(self, transaction_id):
+        """Check status of a payment"""
+        await asyncio.sleep(0.2)
+        return self._status_result(transaction_id)
+    
+    async def check_refund_status(self, transaction_id):
+        """Check status of a payment's refund"""
+        await asyncio.sleep(0.2)
+        return self._refund_status_result(transaction_id)
 
 # Factory to get the configured payment gateway
 def get_payment_gateway():
     """Return the default payment gateway"""
-    return DemoPaymentGateway()
\ No newline at end of file
+    return DemoPaymentGateway()
+
+def get_async_payment_gateway():
+    """Return the default payment gateway's non-blocking client"""
+    return DemoAsyncPaymentGateway()
\ No newline at end of file
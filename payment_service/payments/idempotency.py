@@ -0,0 +1,74 @@
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+def get_key(request):
+    """The request's Idempotency-Key header, or None if it wasn't sent"""
+    return request.headers.get(HEADER)
+
+def invalid_key_response(key):
+    """A 400 response for a malformed key, or None if the key is usable"""
+    if key is not None and not 0 < len(key.strip()) <= MAX_KEY_LENGTH:
+        return Response({
+            'success': False,
+            'message': f'{HEADER} must be 1 to {MAX_KEY_LENGTH} characters'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    return None
+
+def request_hash(data):
+    """Fingerprint of a request body, to catch a key reused for another request"""
+    body = json.dumps(data, sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+def find_response(key, endpoint, fingerprint):
+    """Replay the stored response for key, or None if there is no live one"""
+    stored = IdempotencyKey.objects.filter(
+        key=key, endpoint=endpoint, expires_at__gt=timezone.now()
+    ).first()
+    if stored is None:
+        return None
+    if stored.request_hash != fingerprint:
+        return Response({
+            'success': False,
+            'message': f'{HEADER} was already used for a different request'
+        }, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    response = Response(stored.response_body, status=stored.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+def store_response(key, endpoint, fingerprint, payment, response):
+    """Keep response for TTL seconds so retries with key can be replayed
+
+    Called inside the transaction that holds the payment's row lock, so the
+    stored response becomes visible together with the change it describes.
+    An expired record for the same key is overwritten.
+    """
+    ttl = getattr(settings, 'PAYMENT_IDEMPOTENCY', {}).get('TTL', 24 * 60 * 60)
+    IdempotencyKey.objects.update_or_create(
+        key=key,
+        endpoint=endpoint,
+        defaults={
+            'request_hash': fingerprint,
+            'payment': payment,
+            'response_status': response.status_code,
+            'response_body': response.data,
+            'expires_at': timezone.now() + timedelta(seconds=ttl),
+        }
+    )
+
+def purge_expired():
+    """Delete expired keys, returns the number deleted"""
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
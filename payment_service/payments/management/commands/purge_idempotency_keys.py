@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from payments.idempotency import purge_expired
+
+class Command(BaseCommand):
+    help = 'Delete stored idempotency responses whose TTL has passed'
+    
+    def handle(self, *args, **options):
+        deleted = purge_expired()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} expired idempotency keys'))
@@ -0,0 +1,46 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from payments.reconciliation import PaymentReconciler
+
+class Command(BaseCommand):
+    help = 'Settle payments stuck in PROCESSING or REFUNDING by checking their status with the gateway'
+
+    def add_arguments(self, parser):
+        config = getattr(settings, 'PAYMENT_RECONCILIATION', {})
+        parser.add_argument('--batch-size', type=int, default=config.get('BATCH_SIZE', 500),
+                            help='Payments read and written per batch')
+        parser.add_argument('--concurrency', type=int, default=config.get('CONCURRENCY', 50),
+                            help='Gateway status checks in flight at once')
+        parser.add_argument('--stale-after', type=int, default=config.get('STALE_AFTER', 900),
+                            help='Seconds a payment must have been PROCESSING or REFUNDING '
+                                 'to be checked')
+        parser.add_argument('--interval', type=float, default=None,
+                            help='Keep running, reconciling every INTERVAL seconds')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                self._reconcile(options)
+                if options['interval'] is None:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+    def _reconcile(self, options):
+        reconciler = PaymentReconciler(
+            batch_size=options['batch_size'],
+            concurrency=options['concurrency'],
+            stale_after=options['stale_after'],
+        )
+        started = time.monotonic()
+        stats = reconciler.run()
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {stats['checked']} payments in {elapsed:.1f}s: "
+            f"{stats['completed']} completed, {stats['failed']} failed, "
+            f"{stats['refunded']} refunded, {stats['reverted']} refunds reverted, "
+            f"{stats['unchanged']} unchanged, {stats['errors']} errors"
+        ))
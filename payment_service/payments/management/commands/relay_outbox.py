@@ -0,0 +1,49 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from payments.outbox import OutboxRelay
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox messages to the other services'
+    
+    def add_arguments(self, parser):
+        config = getattr(settings, 'OUTBOX', {})
+        parser.add_argument('--workers', type=int, default=config.get('WORKERS', 1),
+                            help='Number of relay threads')
+        parser.add_argument('--batch-size', type=int, default=config.get('BATCH_SIZE', 100),
+                            help='Messages claimed per batch')
+        parser.add_argument('--poll-interval', type=float, default=config.get('POLL_INTERVAL', 1.0),
+                            help='Seconds an idle relay waits before polling the outbox again')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the outbox has no due messages left')
+    
+    def handle(self, *args, **options):
+        relays = [
+            OutboxRelay(
+                batch_size=options['batch_size'],
+                poll_interval=options['poll_interval'],
+                index=index,
+                once=options['once'],
+            )
+            for index in range(options['workers'])
+        ]
+        self.stdout.write(f"Starting {len(relays)} outbox relays (Ctrl+C to stop)")
+        
+        started = time.monotonic()
+        for relay in relays:
+            relay.start()
+        try:
+            while any(relay.is_alive() for relay in relays):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            for relay in relays:
+                relay.stop()
+            for relay in relays:
+                relay.join()
+        
+        delivered = sum(relay.delivered for relay in relays)
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Delivered {delivered} outbox messages in {elapsed:.1f}s'
+        ))
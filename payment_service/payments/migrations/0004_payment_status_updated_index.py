@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0003_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['status', 'updated_at'], name='payments_pa_status_d4d624_idx'),
+        ),
+    ]
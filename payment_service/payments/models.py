@@ -1,4 +1,6 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 import uuid
 import json
 
@@ -7,6 +9,7 @@ class PaymentStatus(models.TextChoices):
     PROCESSING = 'PROCESSING', 'Processing'
     COMPLETED = 'COMPLETED', 'Completed'
     FAILED = 'FAILED', 'Failed'
+    REFUNDING = 'REFUNDING', 'Refund in progress'
     REFUNDED = 'REFUNDED', 'Refunded'
     CANCELED = 'CANCELED', 'Canceled'
 
@@ -37,6 +40,12 @@ class Payment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    class Meta:
+        indexes = [
+            # Finds stale PROCESSING and REFUNDING payments for reconciliation
+            models.Index(fields=['status', 'updated_at']),
+        ]
+    
     def __str__(self):
         return f"Payment {self.id} - {self.status} - {self.amount} {self.currency}"
     
@@ -63,4 +72,59 @@ class PaymentHistory(models.Model):
         verbose_name_plural = 'Payment histories'
     
     def __str__(self):
-        return f"{self.payment.id} - {self.status} at {self.timestamp}"
\ No newline at end of file
+        return f"{self.payment.id} - {self.status} at {self.timestamp}"
+
+class IdempotencyKey(models.Model):
+    """Stored response of a request made with an Idempotency-Key header"""
+    key = models.CharField(max_length=255)
+    endpoint = models.CharField(max_length=50)
+    request_hash = models.CharField(max_length=64)
+    payment = models.ForeignKey(Payment, on_delete=models.CASCADE, related_name='idempotency_keys')
+    response_status = models.PositiveSmallIntegerField()
+    response_body = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    class Meta:
+        unique_together = ('key', 'endpoint')
+    
+    def __str__(self):
+        return f"{self.endpoint} {self.key} -> {self.response_status}"
+
+
+class OutboxStatus(models.TextChoices):
+    PENDING = 'PENDING', 'Pending'
+    PROCESSING = 'PROCESSING', 'Processing'
+    FAILED = 'FAILED', 'Failed'
+
+class OutboxMessage(models.Model):
+    """A call to another service, stored with the change it reports
+
+    Written in the same transaction as that change and delivered by the
+    outbox relay (see outbox.py); delivered messages are deleted.
+    """
+    service = models.CharField(max_length=50)  # Key in settings.MICROSERVICE_URLS
+    path = models.CharField(max_length=255)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    key = models.CharField(max_length=100, blank=True)  # Messages sharing a key are delivered in order
+    status = models.CharField(
+        max_length=20,
+        choices=OutboxStatus.choices,
+        default=OutboxStatus.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)  # Not sent before this (retry backoff)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=64, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['key', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.service}{self.path} ({self.status})"
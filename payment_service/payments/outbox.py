@@ -0,0 +1,195 @@
+# Transactional outbox, copied verbatim into payment_service and
+# shipment_service: each service is deployed on its own and shares no package
+# with the others. Keep the copies identical; both services run the same
+# outbox tests.
+import logging
+import os
+import socket
+import threading
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from .http_client import get_client
+from .models import OutboxMessage, OutboxStatus
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_UPDATE_FIELDS = ['status', 'available_at', 'locked_at', 'locked_by', 'last_error']
+
+# Answers worth trying again; any other 4xx means the receiver rejected the message
+RETRY_STATUS_CODES = {408, 409, 425, 429}
+
+def _config(key, default):
+    return getattr(settings, 'OUTBOX', {}).get(key, default)
+
+def message(service, path, payload, key=''):
+    """Build an unsaved outbox message, for callers that bulk_create them"""
+    return OutboxMessage(service=service, path=path, payload=payload, key=str(key))
+
+def enqueue(service, path, payload, key=''):
+    """Queue a POST of payload to path on service
+
+    Call it inside the transaction that makes the change being reported:
+    the message is stored if and only if the change is. Messages with the
+    same key (e.g. an order id) are delivered in the order they were queued.
+    """
+    outbox_message = message(service, path, payload, key)
+    outbox_message.save()
+    return outbox_message
+
+def claim_messages(batch_size, worker_id):
+    """Lock up to batch_size due messages for this worker and return them
+
+    A message waits while an older one with the same key is undelivered, so
+    per-key order survives retries and several relay workers. Messages left
+    PROCESSING for longer than VISIBILITY_TIMEOUT (their worker died) are
+    claimed again.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=_config('VISIBILITY_TIMEOUT', 60))
+    older_undelivered = OutboxMessage.objects.filter(
+        key=OuterRef('key'), id__lt=OuterRef('id')
+    ).exclude(status=OutboxStatus.FAILED)
+
+    with transaction.atomic():
+        claimable = OutboxMessage.objects.filter(
+            Q(status=OutboxStatus.PENDING, available_at__lte=now) |
+            Q(status=OutboxStatus.PROCESSING, locked_at__lt=stale)
+        )
+        message_ids = list(
+            claimable.select_for_update(skip_locked=True)
+            .filter(Q(key='') | ~Exists(older_undelivered))
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not message_ids:
+            return []
+
+        # Only rows still claimable are taken: where SKIP LOCKED is a no-op
+        # (SQLite) another relay may have claimed some of them meanwhile
+        claimable.filter(id__in=message_ids).update(
+            status=OutboxStatus.PROCESSING,
+            locked_at=now,
+            locked_by=worker_id,
+            attempts=F('attempts') + 1,
+        )
+
+    return list(OutboxMessage.objects.filter(id__in=message_ids, locked_by=worker_id, locked_at=now))
+
+def deliver(outbox_message):
+    """POST one message; returns True once the receiver accepted it
+
+    Raises requests.RequestException when delivery should be retried.
+    """
+    url = f"{settings.MICROSERVICE_URLS[outbox_message.service]}{outbox_message.path}"
+    # retry=True is safe: delivery is at-least-once and receivers must be idempotent anyway
+    response = get_client().post(url, json=outbox_message.payload, retry=True)
+    if response.status_code >= 500 or response.status_code in RETRY_STATUS_CODES:
+        response.raise_for_status()
+    if response.status_code >= 400:
+        logger.warning("%s rejected outbox message %s: HTTP %s",
+                       outbox_message.service, outbox_message.id, response.status_code)
+        return False
+    return True
+
+def relay_messages(messages):
+    """Deliver a batch of claimed messages and record the outcome
+
+    Delivered messages are deleted with one query, rejected ones are kept as
+    FAILED and the rest go back to PENDING with exponential backoff, capped at
+    MAX_BACKOFF: they are retried until delivered.
+    """
+    now = timezone.now()
+    delivered, kept = [], []
+    for outbox_message in messages:
+        try:
+            accepted = deliver(outbox_message)
+        except requests.RequestException as e:
+            _retry_later(outbox_message, e, now)
+            kept.append(outbox_message)
+            continue
+        if accepted:
+            delivered.append(outbox_message.id)
+        else:
+            outbox_message.status = OutboxStatus.FAILED
+            outbox_message.last_error = 'Rejected by the receiver'
+            _unlock(outbox_message)
+            kept.append(outbox_message)
+
+    if delivered:
+        OutboxMessage.objects.filter(id__in=delivered).delete()
+    OutboxMessage.objects.bulk_update(kept, MESSAGE_UPDATE_FIELDS)
+    return len(delivered)
+
+def release_messages(messages, error):
+    """Put a batch that could not be relayed back on the queue"""
+    now = timezone.now()
+    for outbox_message in messages:
+        _retry_later(outbox_message, error, now)
+    OutboxMessage.objects.bulk_update(messages, MESSAGE_UPDATE_FIELDS)
+
+def _unlock(outbox_message):
+    outbox_message.locked_at = None
+    outbox_message.locked_by = ''
+
+def _retry_later(outbox_message, error, now):
+    backoff = _config('RETRY_BACKOFF', 5) * 2 ** min(outbox_message.attempts - 1, 16)
+    outbox_message.status = OutboxStatus.PENDING
+    outbox_message.available_at = now + timedelta(seconds=min(backoff, _config('MAX_BACKOFF', 3600)))
+    outbox_message.last_error = str(error)
+    _unlock(outbox_message)
+
+class OutboxRelay(threading.Thread):
+    """Claims and delivers outbox batches until stop() is called"""
+
+    def __init__(self, batch_size, poll_interval, index=0, once=False):
+        super().__init__(name=f'outbox-relay-{index}', daemon=True)
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.once = once
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{index}'
+        self.delivered = 0
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        errors = 0
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    idle = self._poll()
+                except Exception:
+                    # e.g. SQLite's "database is locked": back off and keep going,
+                    # messages claimed meanwhile are reclaimed after VISIBILITY_TIMEOUT
+                    errors += 1
+                    logger.exception("%s: polling the outbox failed", self.name)
+                    self._stop_event.wait(min(self.poll_interval * 2 ** errors, _config('MAX_ERROR_BACKOFF', 60)))
+                    continue
+                errors = 0
+                if idle:
+                    if self.once:
+                        break
+                    self._stop_event.wait(self.poll_interval)
+        finally:
+            close_old_connections()
+
+    def _poll(self):
+        """Claim and relay one batch, returns True if no message was due"""
+        close_old_connections()
+        messages = claim_messages(self.batch_size, self.worker_id)
+        if not messages:
+            return True
+
+        try:
+            self.delivered += relay_messages(messages)
+        except Exception as e:
+            logger.exception("%s: batch of %d messages failed", self.name, len(messages))
+            release_messages(messages, e)
+        return False
@@ -0,0 +1,143 @@
+import functools
+import logging
+import time
+
+from django.db import OperationalError, close_old_connections, transaction
+
+from . import outbox
+from .dispatcher import get_gateway_dispatcher
+from .gateways import get_async_payment_gateway
+from .models import Payment, PaymentHistory, PaymentStatus
+
+logger = logging.getLogger(__name__)
+
+def submit_payment(payment):
+    """Mark a payment PROCESSING and hand it to the gateway without waiting
+
+    The outcome is written by complete_payment once the gateway answers;
+    clients poll the payment for it.
+    """
+    payment.status = PaymentStatus.PROCESSING
+    payment.save(update_fields=['status', 'updated_at'])
+    PaymentHistory.objects.create(
+        payment=payment,
+        status=PaymentStatus.PROCESSING,
+        notes="Payment processing started"
+    )
+
+    gateway = get_async_payment_gateway()
+    call = functools.partial(
+        gateway.process_payment,
+        amount=payment.amount,
+        currency=payment.currency,
+        payment_details=payment.payment_details,
+    )
+    # Submit only once the PROCESSING state is committed, so a fast gateway
+    # answer never finds the payment in its old state
+    transaction.on_commit(lambda: get_gateway_dispatcher().submit(
+        call, on_done=functools.partial(_in_worker, complete_payment, payment.id)
+    ))
+
+def complete_payment(payment_id, result):
+    """Record the gateway's answer for a submitted payment"""
+    with transaction.atomic():
+        payment = Payment.objects.select_for_update().get(id=payment_id)
+        if payment.status != PaymentStatus.PROCESSING:
+            # Already settled elsewhere (e.g. by reconciliation)
+            logger.info("Ignoring gateway result for payment %s in status %s", payment_id, payment.status)
+            return payment
+
+        if result['success']:
+            # Update payment with transaction ID and status
+            payment.transaction_id = result['transaction_id']
+            payment.status = PaymentStatus.COMPLETED
+            notes = f"Payment completed: {result['message']}"
+        else:
+            payment.status = PaymentStatus.FAILED
+            notes = f"Payment failed: {result['message']}"
+        payment.save(update_fields=['transaction_id', 'status', 'updated_at'])
+        PaymentHistory.objects.create(payment=payment, status=payment.status, notes=notes)
+        if result['success']:
+            _notify_order_service(payment)
+    return payment
+
+def submit_refund(payment, amount, reason):
+    """Mark a payment REFUNDING and send the refund to the gateway without waiting"""
+    payment.status = PaymentStatus.REFUNDING
+    payment.save(update_fields=['status', 'updated_at'])
+    PaymentHistory.objects.create(
+        payment=payment,
+        status=PaymentStatus.REFUNDING,
+        notes=f"Refund requested: {reason}"
+    )
+
+    gateway = get_async_payment_gateway()
+    call = functools.partial(gateway.refund_payment, transaction_id=payment.transaction_id, amount=amount)
+    # A refund call that raises leaves no answer to wait for: the payment goes
+    # back to COMPLETED. A crash before either runs is left to reconciliation.
+    transaction.on_commit(lambda: get_gateway_dispatcher().submit(
+        call,
+        on_done=functools.partial(_in_worker, complete_refund, payment.id, reason),
+        on_error=functools.partial(_in_worker, revert_refund, payment.id, reason),
+    ))
+
+def complete_refund(payment_id, reason, result):
+    """Record the gateway's answer for a submitted refund"""
+    with transaction.atomic():
+        payment = Payment.objects.select_for_update().get(id=payment_id)
+        if payment.status != PaymentStatus.REFUNDING:
+            logger.info("Ignoring refund result for payment %s in status %s", payment_id, payment.status)
+            return payment
+
+        if result['success']:
+            payment.status = PaymentStatus.REFUNDED
+            notes = f"Payment refunded: {reason}"
+        else:
+            # The payment stays completed
+            payment.status = PaymentStatus.COMPLETED
+            notes = f"Refund failed: {result['message']} (Reason: {reason})"
+        payment.save(update_fields=['status', 'updated_at'])
+        PaymentHistory.objects.create(payment=payment, status=payment.status, notes=notes)
+        if result['success']:
+            _notify_order_service(payment)
+    return payment
+
+def revert_refund(payment_id, reason, error):
+    """Put a REFUNDING payment back to COMPLETED after its refund call raised"""
+    return complete_refund(payment_id, reason, {'success': False, 'message': f"Gateway error: {error}"})
+
+def _in_worker(complete, *args, attempts=8):
+    # Runs on the dispatcher's finish pool: give it fresh DB connections and
+    # retry when concurrent writers make the database busy (SQLite locking)
+    close_old_connections()
+    try:
+        for attempt in range(attempts):
+            try:
+                return complete(*args)
+            except OperationalError:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(0.05 * 2 ** attempt)
+    finally:
+        close_old_connections()
+
+def order_notification(payment):
+    """Outbox message telling order service about a payment status change"""
+    return outbox.message(
+        'ORDER_SERVICE',
+        f"/orders/{payment.order_id}/update_payment/",
+        {
+            'status': payment.status,
+            'transaction_id': payment.transaction_id,
+            'payment_id': str(payment.id)
+        },
+        key=payment.order_id,
+    )
+
+def _notify_order_service(payment):
+    """Queue a notification to order service about a payment status change
+
+    Must run inside the transaction that changed the payment; the outbox
+    relay delivers it once that transaction commits.
+    """
+    order_notification(payment).save()
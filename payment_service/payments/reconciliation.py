@@ -0,0 +1,142 @@
+import asyncio
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .gateways import get_async_payment_gateway
+from .models import OutboxMessage, Payment, PaymentHistory, PaymentStatus
+from .processing import order_notification
+
+logger = logging.getLogger(__name__)
+
+# Gateway answers that settle a stale payment, per status it is stuck in
+FINAL_STATUSES = {
+    PaymentStatus.PROCESSING: (PaymentStatus.COMPLETED, PaymentStatus.FAILED),
+    PaymentStatus.REFUNDING: (PaymentStatus.REFUNDED, PaymentStatus.FAILED),
+}
+
+# History notes per outcome (keys of PaymentReconciler.stats)
+OUTCOME_NOTES = {
+    'completed': "Payment completed (reconciled with gateway)",
+    'failed': "Payment failed (reconciled with gateway)",
+    'refunded': "Payment refunded (reconciled with gateway)",
+    'reverted': "Refund failed (reconciled with gateway)",
+}
+
+class PaymentReconciler:
+    """Settles payments left in PROCESSING or REFUNDING by asking the gateway
+
+    A PROCESSING payment ends COMPLETED or FAILED. A REFUNDING one ends
+    REFUNDED, or goes back to COMPLETED if the refund never went through.
+
+    Stale payments are read in keyset batches on id, so memory use stays
+    at one batch however many are stuck. Each batch is checked with at
+    most `concurrency` gateway calls in flight. The results are then
+    written in one transaction, as one bulk update plus bulk inserts of
+    the history rows and the order service notifications.
+    """
+
+    def __init__(self, gateway=None, batch_size=500, concurrency=50, stale_after=900):
+        self.gateway = gateway or get_async_payment_gateway()
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.stale_after = stale_after
+        self.stats = {
+            'checked': 0, 'completed': 0, 'failed': 0, 'refunded': 0, 'reverted': 0,
+            'unchanged': 0, 'errors': 0,
+        }
+
+    def run(self):
+        """Reconcile every payment stale at call time, returns the stats"""
+        cutoff = timezone.now() - timedelta(seconds=self.stale_after)
+        for batch in self._batches(cutoff):
+            results = asyncio.run(self._check_batch(batch))
+            self._apply(batch, results, cutoff)
+        return self.stats
+
+    def _batches(self, cutoff):
+        stale = (
+            Payment.objects
+            .filter(status__in=FINAL_STATUSES, updated_at__lt=cutoff)
+            .only('id', 'order_id', 'transaction_id', 'status', 'updated_at')
+            .order_by('id')
+        )
+        last_id = None
+        while True:
+            page = stale if last_id is None else stale.filter(id__gt=last_id)
+            batch = list(page[:self.batch_size])
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1].id
+
+    async def _check_batch(self, payments):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def check(payment):
+            async with semaphore:
+                if payment.status == PaymentStatus.REFUNDING:
+                    return await self.gateway.check_refund_status(payment.transaction_id)
+                # A payment the gateway never answered for has no transaction id
+                # yet; it is looked up by our payment id (the merchant reference)
+                return await self.gateway.check_payment_status(payment.transaction_id or str(payment.id))
+
+        return await asyncio.gather(*(check(payment) for payment in payments), return_exceptions=True)
+
+    def _apply(self, payments, results, cutoff):
+        self.stats['checked'] += len(payments)
+        outcomes = {}
+        for payment, result in zip(payments, results):
+            if isinstance(result, Exception):
+                logger.warning("Status check for payment %s failed: %s", payment.id, result)
+                self.stats['errors'] += 1
+            elif result.get('status') in FINAL_STATUSES[payment.status]:
+                outcomes[payment.id] = (payment.status, result)
+            else:
+                self.stats['unchanged'] += 1
+        if not outcomes:
+            return
+
+        now = timezone.now()
+        with transaction.atomic():
+            locked = (
+                Payment.objects.select_for_update()
+                .filter(id__in=outcomes, updated_at__lt=cutoff)
+                .only('id', 'order_id', 'transaction_id', 'status', 'updated_at')
+            )
+            # Skip payments a late gateway answer settled since they were read
+            settled = [payment for payment in locked if payment.status == outcomes[payment.id][0]]
+            history, notify = [], []
+            for payment in settled:
+                outcome = self._settle(payment, outcomes[payment.id][1])
+                self.stats[outcome] += 1
+                payment.updated_at = now  # bulk_update doesn't apply auto_now
+                history.append(PaymentHistory(
+                    payment=payment, status=payment.status, notes=OUTCOME_NOTES[outcome]
+                ))
+                if outcome in ('completed', 'refunded'):
+                    notify.append(payment)
+
+            Payment.objects.bulk_update(settled, ['status', 'transaction_id', 'updated_at'])
+            PaymentHistory.objects.bulk_create(history)
+            OutboxMessage.objects.bulk_create([order_notification(payment) for payment in notify])
+
+        self.stats['unchanged'] += len(outcomes) - len(settled)
+
+    def _settle(self, payment, result):
+        """Apply the gateway's answer to payment, returns the outcome's stats key"""
+        if payment.status == PaymentStatus.REFUNDING:
+            if result['status'] == PaymentStatus.REFUNDED:
+                payment.status = PaymentStatus.REFUNDED
+                return 'refunded'
+            # The refund never went through: the payment stays paid
+            payment.status = PaymentStatus.COMPLETED
+            return 'reverted'
+
+        payment.status = result['status']
+        if payment.status == PaymentStatus.COMPLETED:
+            payment.transaction_id = payment.transaction_id or result.get('transaction_id')
+            return 'completed'
+        return 'failed'
@@ -1,3 +1,268 @@
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+import requests
+from django.db import IntegrityError, OperationalError
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from . import idempotency, outbox
+from .models import IdempotencyKey, OutboxMessage, OutboxStatus, Payment, PaymentStatus
+from .reconciliation import PaymentReconciler
+
+
+class FakeGateway:
+    """Answers status checks from fixed results, recording what was asked"""
+
+    def __init__(self, payment_status='COMPLETED', refund_status='REFUNDED'):
+        self.payment_status = payment_status
+        self.refund_status = refund_status
+        self.calls = []
+
+    async def check_payment_status(self, transaction_id):
+        self.calls.append(('payment', transaction_id))
+        return {'transaction_id': transaction_id, 'status': self.payment_status}
+
+    async def check_refund_status(self, transaction_id):
+        self.calls.append(('refund', transaction_id))
+        return {'transaction_id': transaction_id, 'status': self.refund_status}
+
+
+class PaymentReconcilerTests(TestCase):
+    def _payment(self, status, stale=True):
+        payment = Payment.objects.create(
+            order_id=uuid.uuid4(),
+            amount=Decimal('25.00'),
+            status=status,
+            transaction_id='txn-1' if status == PaymentStatus.REFUNDING else None,
+        )
+        if stale:
+            # update() skips auto_now, so the payment looks stuck
+            Payment.objects.filter(id=payment.id).update(updated_at=timezone.now() - timedelta(hours=1))
+        return payment
+
+    def _reconcile(self, gateway):
+        return PaymentReconciler(gateway=gateway, stale_after=60).run()
+
+    def test_stale_refunding_payment_is_refunded(self):
+        payment = self._payment(PaymentStatus.REFUNDING)
+        gateway = FakeGateway(refund_status='REFUNDED')
+
+        stats = self._reconcile(gateway)
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, PaymentStatus.REFUNDED)
+        self.assertEqual(gateway.calls, [('refund', 'txn-1')])
+        self.assertEqual(stats['refunded'], 1)
+        self.assertEqual(payment.history.get().status, PaymentStatus.REFUNDED)
+        notification = OutboxMessage.objects.get()
+        self.assertEqual(notification.payload['status'], PaymentStatus.REFUNDED)
+
+    def test_stale_refunding_payment_whose_refund_failed_goes_back_to_completed(self):
+        payment = self._payment(PaymentStatus.REFUNDING)
+
+        stats = self._reconcile(FakeGateway(refund_status='FAILED'))
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, PaymentStatus.COMPLETED)
+        self.assertEqual(stats['reverted'], 1)
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_refund_still_in_progress_is_left_alone(self):
+        payment = self._payment(PaymentStatus.REFUNDING)
+
+        stats = self._reconcile(FakeGateway(refund_status='REFUNDING'))
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, PaymentStatus.REFUNDING)
+        self.assertEqual(stats['unchanged'], 1)
+
+    def test_stale_processing_payment_is_completed(self):
+        payment = self._payment(PaymentStatus.PROCESSING)
+        gateway = FakeGateway(payment_status='COMPLETED')
+
+        stats = self._reconcile(gateway)
+
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, PaymentStatus.COMPLETED)
+        self.assertEqual(gateway.calls, [('payment', str(payment.id))])
+        self.assertEqual(stats['completed'], 1)
+
+    def test_recent_payments_are_not_checked(self):
+        self._payment(PaymentStatus.REFUNDING, stale=False)
+        gateway = FakeGateway()
+
+        stats = self._reconcile(gateway)
+
+        self.assertEqual(gateway.calls, [])
+        self.assertEqual(stats['checked'], 0)
+
+
+@mock.patch('payments.processing.get_gateway_dispatcher')
+class IdempotentSubmitTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.payment = Payment.objects.create(order_id=uuid.uuid4(), amount=Decimal('25.00'))
+
+    def _process(self, key='key-1', payment=None):
+        return self.client.post(
+            '/api/payments/process/',
+            {'payment_id': str((payment or self.payment).id)},
+            format='json',
+            HTTP_IDEMPOTENCY_KEY=key,
+        )
+
+    def test_retry_with_the_same_key_replays_the_stored_response(self, get_dispatcher):
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self._process()
+        with self.captureOnCommitCallbacks(execute=True):
+            retry = self._process()
+
+        self.assertEqual(first.status_code, 202)
+        self.assertEqual(retry.status_code, 202)
+        self.assertEqual(retry.data['payment_id'], str(self.payment.id))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        # Submitted to the gateway once
+        self.assertEqual(get_dispatcher.return_value.submit.call_count, 1)
+        self.assertEqual(self.payment.history.count(), 1)
+
+    def test_key_reused_for_a_different_request_is_rejected(self, get_dispatcher):
+        other = Payment.objects.create(order_id=uuid.uuid4(), amount=Decimal('10.00'))
+        self._process()
+
+        response = self._process(payment=other)
+
+        self.assertEqual(response.status_code, 422)
+        other.refresh_from_db()
+        self.assertEqual(other.status, PaymentStatus.PENDING)
+
+    def test_request_that_waited_for_the_lock_gets_the_first_response(self, get_dispatcher):
+        first = self._process()
+        # The first request committed while this one waited for the row lock:
+        # the check before the lock misses, the one under the lock finds it
+        find_response = idempotency.find_response
+        checks = []
+
+        def miss_before_the_lock(*args):
+            checks.append(args)
+            return None if len(checks) == 1 else find_response(*args)
+
+        with mock.patch.object(idempotency, 'find_response', side_effect=miss_before_the_lock):
+            retry = self._process()
+
+        self.assertEqual(len(checks), 2)
+        self.assertEqual(retry.status_code, first.status_code)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(self.payment.history.count(), 1)
+
+    def test_key_stored_meanwhile_by_another_request_returns_409(self, get_dispatcher):
+        # A concurrent request with the same key, for another payment, holds
+        # another row lock; the unique key makes one of them fail
+        with mock.patch.object(idempotency, 'store_response', side_effect=IntegrityError):
+            response = self._process()
+
+        self.assertEqual(response.status_code, 409)
+        self.payment.refresh_from_db()
+        self.assertEqual(self.payment.status, PaymentStatus.PENDING)
+        self.assertFalse(self.payment.history.exists())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class OutboxTests(TestCase):
+    def _enqueue(self, key=''):
+        return outbox.enqueue('ORDER_SERVICE', '/orders/1/update/', {'status': 'X'}, key=key)
+
+    def _relay(self, messages, status_code=200, error=None):
+        response = mock.Mock(status_code=status_code)
+        response.raise_for_status.side_effect = requests.HTTPError(str(status_code))
+        with mock.patch.object(outbox, 'get_client') as get_client:
+            get_client.return_value.post.side_effect = error
+            get_client.return_value.post.return_value = response
+            return outbox.relay_messages(messages)
+
+    def test_claimed_messages_are_not_claimed_again(self):
+        first, second, third = (self._enqueue() for _ in range(3))
+
+        claimed = outbox.claim_messages(2, 'relay-1')
+        rest = outbox.claim_messages(10, 'relay-2')
+
+        self.assertEqual([m.id for m in claimed], [first.id, second.id])
+        self.assertEqual([m.id for m in rest], [third.id])
+        self.assertTrue(all(m.status == OutboxStatus.PROCESSING and m.attempts == 1 for m in claimed))
+        self.assertEqual(outbox.claim_messages(10, 'relay-3'), [])
+
+    def test_stale_claim_is_taken_over(self):
+        message = self._enqueue()
+        outbox.claim_messages(10, 'relay-1')
+        OutboxMessage.objects.filter(id=message.id).update(locked_at=timezone.now() - timedelta(minutes=5))
+
+        claimed = outbox.claim_messages(10, 'relay-2')
+
+        self.assertEqual([m.id for m in claimed], [message.id])
+        self.assertEqual(claimed[0].attempts, 2)
+
+    def test_messages_with_the_same_key_are_delivered_in_order(self):
+        first = self._enqueue(key='order-1')
+        second = self._enqueue(key='order-1')
+        other = self._enqueue(key='order-2')
+
+        claimed = outbox.claim_messages(10, 'relay-1')
+        # The second message waits until the first is delivered
+        self.assertEqual([m.id for m in claimed], [first.id, other.id])
+        self.assertEqual(self._relay(claimed), 2)
+
+        claimed = outbox.claim_messages(10, 'relay-1')
+        self.assertEqual([m.id for m in claimed], [second.id])
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        message = self._enqueue(key='order-1')
+        waiting = self._enqueue(key='order-1')
+        before = timezone.now()
+
+        self._relay(outbox.claim_messages(10, 'relay-1'), error=requests.ConnectionError('down'))
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxStatus.PENDING)
+        self.assertEqual(message.locked_by, '')
+        self.assertIn('down', message.last_error)
+        # RETRY_BACKOFF seconds after the first attempt, and its key stays blocked
+        self.assertGreaterEqual(message.available_at, before + timedelta(seconds=outbox._config('RETRY_BACKOFF', 5)))
+        self.assertEqual(outbox.claim_messages(10, 'relay-1'), [])
+
+        OutboxMessage.objects.filter(id=message.id).update(available_at=timezone.now(), attempts=30)
+        self._relay(outbox.claim_messages(10, 'relay-1'), status_code=503)
+
+        message.refresh_from_db()
+        self.assertLessEqual(
+            message.available_at, timezone.now() + timedelta(seconds=outbox._config('MAX_BACKOFF', 3600))
+        )
+        self.assertEqual(OutboxMessage.objects.get(id=waiting.id).attempts, 0)
+
+    def test_rejected_message_is_kept_as_failed_and_unblocks_its_key(self):
+        message = self._enqueue(key='order-1')
+        waiting = self._enqueue(key='order-1')
+
+        self.assertEqual(self._relay(outbox.claim_messages(10, 'relay-1'), status_code=400), 0)
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxStatus.FAILED)
+        self.assertEqual([m.id for m in outbox.claim_messages(10, 'relay-1')], [waiting.id])
+
+    def test_relay_survives_a_failed_poll(self):
+        relay = outbox.OutboxRelay(batch_size=10, poll_interval=0.01, once=True)
+        polls = []
+
+        def claim(*args):
+            polls.append(args)
+            if len(polls) == 1:
+                raise OperationalError('database is locked')
+            return []
+
+        with mock.patch.object(outbox, 'claim_messages', side_effect=claim), \
+                mock.patch.object(outbox, 'close_old_connections'):
+            relay.run()
 
-# Create your tests here.
+        self.assertEqual(len(polls), 2)
@@ -1,16 +1,17 @@
-import requests
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from django.db import IntegrityError, transaction
 from django.shortcuts import get_object_or_404
-from django.conf import settings
 
 from .models import Payment, PaymentHistory, PaymentStatus
 from .serializers import (
     PaymentSerializer, PaymentCreateSerializer, 
     ProcessPaymentSerializer, RefundPaymentSerializer
 )
-from .gateways import get_payment_gateway
+from . import idempotency
+from .processing import submit_payment, submit_refund
 
 class PaymentViewSet(viewsets.ModelViewSet):
     queryset = Payment.objects.all()
@@ -22,162 +23,127 @@ class PaymentViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['post'])
     def process(self, request):
-        """Process a pending payment"""
+        """Submit a pending payment to the gateway
+        
+        Returns 202 straight away; poll the status URL for the outcome.
+        Send an Idempotency-Key header to make retries safe.
+        """
         serializer = ProcessPaymentSerializer(data=request.data)
         if serializer.is_valid():
             payment_id = serializer.validated_data['payment_id']
-            payment = get_object_or_404(Payment, id=payment_id)
-            
-            # Skip processing if already processed
-            if payment.status not in [PaymentStatus.PENDING, PaymentStatus.FAILED]:
-                return Response({
-                    'success': False,
-                    'message': f'Payment cannot be processed (current status: {payment.status})'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Update payment status
-            payment.status = PaymentStatus.PROCESSING
-            payment.save()
-            
-            # Create history record
-            PaymentHistory.objects.create(
-                payment=payment,
-                status=PaymentStatus.PROCESSING,
-                notes="Payment processing started"
-            )
-            
-            # Get payment gateway
-            gateway = get_payment_gateway()
-            
-            # Process payment
-            result = gateway.process_payment(
-                amount=payment.amount,
-                currency=payment.currency,
-                payment_details=payment.payment_details
-            )
-            
-            if result['success']:
-                # Update payment with transaction ID and status
-                payment.transaction_id = result['transaction_id']
-                payment.status = PaymentStatus.COMPLETED
-                payment.save()
-                
-                # Create history record
-                PaymentHistory.objects.create(
-                    payment=payment,
-                    status=PaymentStatus.COMPLETED,
-                    notes=f"Payment completed: {result['message']}"
-                )
-                
-                # Notify order service
-                try:
-                    self._notify_order_service(payment)
-                except requests.RequestException:
-                    # Log error but continue (payment still successful)
-                    pass
-                
-                return Response({
-                    'success': True,
-                    'payment_id': payment.id,
-                    'transaction_id': payment.transaction_id,
-                    'status': payment.status,
-                    'message': result['message']
-                })
-            else:
-                # Update payment status
-                payment.status = PaymentStatus.FAILED
-                payment.save()
-                
-                # Create history record
-                PaymentHistory.objects.create(
-                    payment=payment,
-                    status=PaymentStatus.FAILED,
-                    notes=f"Payment failed: {result['message']}"
-                )
-                
-                return Response({
-                    'success': False,
-                    'payment_id': payment.id,
-                    'status': payment.status,
-                    'message': result['message'],
-                    'error_code': result.get('error_code')
-                }, status=status.HTTP_400_BAD_REQUEST)
+            return self._submit_once(request, payment_id, self._process_payment)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['post'])
     def refund(self, request):
-        """Refund a completed payment"""
+        """Submit a refund of a completed payment to the gateway
+        
+        Returns 202 straight away; poll the status URL for the outcome.
+        Send an Idempotency-Key header to make retries safe.
+        """
         serializer = RefundPaymentSerializer(data=request.data)
         if serializer.is_valid():
             payment_id = serializer.validated_data['payment_id']
-            payment = get_object_or_404(Payment, id=payment_id)
-            
-            # Validate payment can be refunded
-            if payment.status != PaymentStatus.COMPLETED:
-                return Response({
-                    'success': False,
-                    'message': f'Payment cannot be refunded (current status: {payment.status})'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # Get refund amount (default to full payment)
-            refund_amount = serializer.validated_data.get('amount', payment.amount)
-            
-            # Get payment gateway
-            gateway = get_payment_gateway()
-            
-            # Process refund
-            result = gateway.refund_payment(
-                transaction_id=payment.transaction_id,
-                amount=refund_amount
+            return self._submit_once(
+                request, payment_id,
+                lambda payment: self._refund_payment(payment, serializer.validated_data)
             )
-            
-            if result['success']:
-                # Update payment status
-                payment.status = PaymentStatus.REFUNDED
-                payment.save()
-                
-                # Create history record
-                reason = serializer.validated_data.get('reason', 'No reason provided')
-                PaymentHistory.objects.create(
-                    payment=payment,
-                    status=PaymentStatus.REFUNDED,
-                    notes=f"Payment refunded: {reason}"
-                )
-                
-                # Notify order service
-                try:
-                    self._notify_order_service(payment)
-                except requests.RequestException:
-                    # Log error but continue (refund still successful)
-                    pass
-                
-                return Response({
-                    'success': True,
-                    'payment_id': payment.id,
-                    'refund_id': result.get('refund_id'),
-                    'status': payment.status,
-                    'message': result['message']
-                })
-            else:
-                # Create history record for failed refund attempt
-                reason = serializer.validated_data.get('reason', 'No reason provided')
-                PaymentHistory.objects.create(
-                    payment=payment,
-                    status=payment.status,  # Status hasn't changed
-                    notes=f"Refund failed: {result['message']} (Reason: {reason})"
-                )
-                
-                return Response({
-                    'success': False,
-                    'payment_id': payment.id,
-                    'status': payment.status,
-                    'message': result['message'],
-                    'error_code': result.get('error_code')
-                }, status=status.HTTP_400_BAD_REQUEST)
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    def _submit_once(self, request, payment_id, submit):
+        """Run submit(payment) with the payment row locked
+        
+        The lock makes the status check and the submission atomic, so two
+        concurrent requests can't both send the payment to the gateway. With
+        an Idempotency-Key header the response is stored, and a retry with
+        the same key gets it back without touching the gateway.
+        """
+        key = idempotency.get_key(request)
+        invalid = idempotency.invalid_key_response(key)
+        if invalid is not None:
+            return invalid
+        
+        if key is not None:
+            fingerprint = idempotency.request_hash(request.data)
+            stored = idempotency.find_response(key, self.action, fingerprint)
+            if stored is not None:
+                return stored
+        
+        try:
+            with transaction.atomic():
+                payment = get_object_or_404(Payment.objects.select_for_update(), id=payment_id)
+                if key is not None:
+                    # A retry that waited for the lock finds the first request's response
+                    stored = idempotency.find_response(key, self.action, fingerprint)
+                    if stored is not None:
+                        return stored
+                
+                response = submit(payment)
+                if key is not None:
+                    idempotency.store_response(key, self.action, fingerprint, payment, response)
+                return response
+        except IntegrityError:
+            # The same key was stored meanwhile for another payment; nothing was submitted
+            return Response({
+                'success': False,
+                'message': f'A request with this {idempotency.HEADER} is already in progress'
+            }, status=status.HTTP_409_CONFLICT)
+    
+    def _process_payment(self, payment):
+        # Skip processing if already processed
+        if payment.status not in [PaymentStatus.PENDING, PaymentStatus.FAILED]:
+            return Response({
+                'success': False,
+                'message': f'Payment cannot be processed (current status: {payment.status})'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        submit_payment(payment)
+        
+        return Response({
+            'success': True,
+            'payment_id': payment.id,
+            'status': payment.status,
+            'message': 'Payment submitted to the gateway',
+            'status_url': reverse('payment-payment-status', args=[payment.id], request=self.request)
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    def _refund_payment(self, payment, data):
+        # Validate payment can be refunded
+        if payment.status != PaymentStatus.COMPLETED:
+            return Response({
+                'success': False,
+                'message': f'Payment cannot be refunded (current status: {payment.status})'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Get refund amount (default to full payment)
+        refund_amount = data.get('amount', payment.amount)
+        reason = data.get('reason', 'No reason provided')
+        
+        submit_refund(payment, refund_amount, reason)
+        
+        return Response({
+            'success': True,
+            'payment_id': payment.id,
+            'status': payment.status,
+            'message': 'Refund submitted to the gateway',
+            'status_url': reverse('payment-payment-status', args=[payment.id], request=self.request)
+        }, status=status.HTTP_202_ACCEPTED)
+    
+    @action(detail=True, methods=['get'], url_path='status')
+    def payment_status(self, request, pk=None):
+        """Lightweight status for clients polling a submitted payment or refund"""
+        payment = self.get_object()
+        latest = payment.history.first()
+        return Response({
+            'payment_id': payment.id,
+            'status': payment.status,
+            'transaction_id': payment.transaction_id,
+            'pending': payment.status in [PaymentStatus.PROCESSING, PaymentStatus.REFUNDING],
+            'message': latest.notes if latest else None
+        })
+    
     @action(detail=True, methods=['get'])
     def history(self, request, pk=None):
         """Get payment history"""
@@ -186,16 +152,3 @@ class PaymentViewSet(viewsets.ModelViewSet):
         history = payment.history.all()
         serializer = PaymentHistorySerializer(history, many=True)
         return Response(serializer.data)
-    
-    def _notify_order_service(self, payment):
-        """Notify order service about payment status changes"""
-        url = f"{settings.MICROSERVICE_URLS['ORDER_SERVICE']}/orders/{payment.order_id}/update_payment/"
-        
-        data = {
-            'status': payment.status,
-            'transaction_id': payment.transaction_id,
-            'payment_id': str(payment.id)
-        }
-        
-        response = requests.post(url, json=data)
-        return response.status_code == 200
\ No newline at end of file
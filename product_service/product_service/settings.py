@@ -56,6 +56,55 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'product_service.urls'
 
+# Shared HTTP client for inter-service calls (see products/http_client.py)
+HTTP_CLIENT = {
+    'CONNECT_TIMEOUT': 2.0,
+    'READ_TIMEOUT': 5.0,
+    'MAX_RETRIES': 2,
+    'BACKOFF_FACTOR': 0.1,
+    'POOL_CONNECTIONS': 10,
+    'POOL_MAXSIZE': 50,
+    'METRICS_LOG_INTERVAL': 60,  # Per-host call/latency summary in the log
+}
+
+MICROSERVICE_URLS = {
+    'COMMENT_SERVICE': 'http://localhost:8006/api',
+}
+
+# Sentiment recommendations score products against an in-memory aspect
+# matrix, rebuilt from the aspect index every REFRESH_INTERVAL seconds.
+# Top-rated lists (TOP_RATED_SIZE per category) are served from memory,
+# rebuilt when sentiment changes or every TOP_RATED_REFRESH_INTERVAL
+# seconds, and cacheable by clients for TOP_RATED_MAX_AGE seconds
+RECOMMENDATIONS = {
+    'REFRESH_INTERVAL': 60,
+    'TOP_RATED_SIZE': 50,
+    'TOP_RATED_REFRESH_INTERVAL': 300,
+    'TOP_RATED_MAX_AGE': 60,
+}
+
+# Endpoints notified when a product's price, stock or availability changes
+PRODUCT_EVENT_SUBSCRIBERS = [
+    'http://localhost:8000/api/product-events/',  # cart_service product cache
+]
+
+# Sent in the X-Service-Token header of product events; must match the
+# subscribers' PRODUCT_EVENT_TOKEN
+PRODUCT_EVENT_TOKEN = 'dev-product-event-token'
+
+# Review sentiment is stored as it arrives (SentimentEvent) and applied to
+# ProductSentiment by the apply_sentiment_events worker every FLUSH_INTERVAL
+# seconds, claiming BATCH_SIZE pending events at a time. A claim older than
+# CLAIM_TIMEOUT seconds is taken over; applied events are kept RETENTION
+# seconds so reviews re-sent by comment service are still recognised
+# (see products/sentiment.py)
+SENTIMENT_AGGREGATION = {
+    'FLUSH_INTERVAL': 5.0,
+    'BATCH_SIZE': 5000,
+    'CLAIM_TIMEOUT': 300,
+    'RETENTION': 7 * 24 * 60 * 60,
+}
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
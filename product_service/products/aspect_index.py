@@ -0,0 +1,65 @@
+from collections import defaultdict
+from django.db import transaction
+
+from .models import PRODUCT_MODELS, AspectPosting, ProductSentiment
+
+def build_postings(sentiment, aspects=None):
+    """Build the postings for a product's positively reviewed aspects"""
+    aspects = sentiment.aspect_sentiment if aspects is None else aspects
+    postings = []
+    for aspect in aspects:
+        data = sentiment.aspect_sentiment.get(aspect)
+        if data and data['score'] > 0:
+            postings.append(AspectPosting(
+                aspect=aspect[:100],
+                product_type=sentiment.product_type,
+                product_id=sentiment.product_id,
+                weight=data['score'] * data['count'],
+            ))
+    return postings
+
+def update_postings(sentiment, aspects):
+    """Refresh the postings of the given aspects after a sentiment update
+
+    Only the aspects that changed are touched; an aspect whose score
+    dropped to zero or below loses its posting.
+    """
+    aspects = list(aspects)
+    if not aspects:
+        return
+    with transaction.atomic():
+        AspectPosting.objects.filter(product_id=sentiment.product_id, aspect__in=aspects).delete()
+        AspectPosting.objects.bulk_create(build_postings(sentiment, aspects))
+
+def remove_product(product_id):
+    AspectPosting.objects.filter(product_id=product_id).delete()
+
+def rebuild_index(batch_size=500):
+    """Rebuild every posting from ProductSentiment, returns products indexed"""
+    indexed = 0
+    with transaction.atomic():
+        AspectPosting.objects.all().delete()
+        postings = []
+        for sentiment in ProductSentiment.objects.iterator(chunk_size=batch_size):
+            postings.extend(build_postings(sentiment))
+            indexed += 1
+            if len(postings) >= batch_size:
+                AspectPosting.objects.bulk_create(postings)
+                postings = []
+        AspectPosting.objects.bulk_create(postings)
+    return indexed
+
+def load_products(keys):
+    """Fetch products for (product_type, product_id) keys, one query per type"""
+    ids_by_type = defaultdict(list)
+    for product_type, product_id in keys:
+        ids_by_type[product_type].append(product_id)
+
+    products = {}
+    for product_type, ids in ids_by_type.items():
+        model = PRODUCT_MODELS.get(product_type)
+        if model is None:
+            continue
+        for product in model.objects.filter(pk__in=ids, is_active=True):
+            products[(product_type, product.pk)] = product
+    return products
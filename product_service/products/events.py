@@ -0,0 +1,32 @@
+import logging
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import transaction
+
+from .http_client import get_client
+
+logger = logging.getLogger(__name__)
+
+# Deliveries run off the request thread so saves don't wait on subscribers
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='product-events')
+
+def publish_product_change(product_type, product_id, changed_fields):
+    """Notify subscribers (e.g. cart caches) that a product has changed"""
+    payload = {
+        'product_type': product_type,
+        'product_id': str(product_id),
+        'changed_fields': list(changed_fields),
+    }
+    # Only publish once the change is actually committed
+    transaction.on_commit(lambda: _executor.submit(_deliver, payload))
+
+def _deliver(payload):
+    # Subscribers only accept events carrying the shared token
+    headers = {'X-Service-Token': getattr(settings, 'PRODUCT_EVENT_TOKEN', '')}
+    for url in getattr(settings, 'PRODUCT_EVENT_SUBSCRIBERS', []):
+        try:
+            # Invalidation is idempotent, so retrying the POST is safe
+            get_client().post(url, json=payload, headers=headers, retry=True)
+        except requests.RequestException as e:
+            logger.warning("Could not deliver product event to %s: %s", url, e)
@@ -0,0 +1,199 @@
+# Pooled HTTP client for calls between services, copied verbatim into every
+# service: each one is deployed on its own and shares no package with the
+# others. Keep the copies identical; the retry and backoff behaviour is
+# tested in order_service (orders/tests.py).
+import logging
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Defaults used when settings.HTTP_CLIENT does not override them
+DEFAULT_CONFIG = {
+    'CONNECT_TIMEOUT': 2.0,     # seconds to establish the TCP connection
+    'READ_TIMEOUT': 5.0,        # seconds to wait for the response
+    'MAX_RETRIES': 2,           # retries after the first attempt
+    'BACKOFF_FACTOR': 0.1,      # base delay (seconds) for exponential backoff
+    'POOL_CONNECTIONS': 10,     # number of per-host pools kept alive
+    'POOL_MAXSIZE': 50,         # keep-alive connections per host
+    'METRICS_LOG_INTERVAL': 60, # seconds between per-host metrics log lines (0 disables)
+}
+
+# Only these methods are retried automatically; others need retry=True
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'}
+RETRY_STATUS_CODES = {502, 503, 504}
+
+
+class LatencyMetrics:
+    """Thread-safe per-host call counters and latency samples"""
+
+    def __init__(self, max_samples=1000, log_interval=60):
+        self.max_samples = max_samples
+        self.log_interval = log_interval
+        self._lock = threading.Lock()
+        self._hosts = {}
+        self._last_logged = time.monotonic()
+
+    def record(self, host, elapsed, ok, retries=0):
+        with self._lock:
+            stats = self._hosts.setdefault(host, {
+                'calls': 0,
+                'errors': 0,
+                'retries': 0,
+                'total_time': 0.0,
+                'samples': [],
+            })
+            stats['calls'] += 1
+            stats['retries'] += retries
+            stats['total_time'] += elapsed
+            if not ok:
+                stats['errors'] += 1
+
+            # Keep a bounded reservoir of samples for percentile estimates
+            samples = stats['samples']
+            if len(samples) < self.max_samples:
+                samples.append(elapsed)
+            else:
+                index = random.randrange(stats['calls'])
+                if index < self.max_samples:
+                    samples[index] = elapsed
+
+    def snapshot(self):
+        """Return a summary of the recorded calls per host"""
+        with self._lock:
+            result = {}
+            for host, stats in self._hosts.items():
+                samples = sorted(stats['samples'])
+                result[host] = {
+                    'calls': stats['calls'],
+                    'errors': stats['errors'],
+                    'retries': stats['retries'],
+                    'avg_ms': 1000 * stats['total_time'] / stats['calls'],
+                    'p50_ms': 1000 * self._percentile(samples, 0.50),
+                    'p99_ms': 1000 * self._percentile(samples, 0.99),
+                }
+            return result
+
+    def log_if_due(self):
+        """Log one summary line per host once every log_interval seconds"""
+        if not self.log_interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_logged < self.log_interval:
+                return
+            self._last_logged = now
+        for host, stats in self.snapshot().items():
+            logger.info(
+                "http %s: %d calls, %d errors, %d retries, avg %.1f ms, p50 %.1f ms, p99 %.1f ms",
+                host, stats['calls'], stats['errors'], stats['retries'],
+                stats['avg_ms'], stats['p50_ms'], stats['p99_ms'],
+            )
+
+    def reset(self):
+        with self._lock:
+            self._hosts.clear()
+
+    @staticmethod
+    def _percentile(samples, fraction):
+        if not samples:
+            return 0.0
+        index = min(len(samples) - 1, int(fraction * len(samples)))
+        return samples[index]
+
+
+class ServiceClient:
+    """Pooled, keep-alive HTTP client for calls to other microservices"""
+
+    def __init__(self, config=None):
+        self.config = {**DEFAULT_CONFIG, **getattr(settings, 'HTTP_CLIENT', {}), **(config or {})}
+        self.timeout = (self.config['CONNECT_TIMEOUT'], self.config['READ_TIMEOUT'])
+        self.metrics = LatencyMetrics(log_interval=self.config['METRICS_LOG_INTERVAL'])
+
+        # One session shares its connection pools (one per host) across threads
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.config['POOL_CONNECTIONS'],
+            pool_maxsize=self.config['POOL_MAXSIZE'],
+            max_retries=0,  # Retries are handled below so they can use jitter
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method, url, retry=None, **kwargs):
+        """Send a request with timeouts and bounded, jittered retries
+
+        Raises requests.RequestException when every attempt fails, just like
+        the plain requests API, so callers keep their existing error handling.
+        """
+        method = method.upper()
+        kwargs.setdefault('timeout', self.timeout)
+        if retry is None:
+            retry = method in IDEMPOTENT_METHODS
+        max_retries = self.config['MAX_RETRIES'] if retry else 0
+
+        host = urlsplit(url).netloc
+        try:
+            return self._send(method, url, host, max_retries, **kwargs)
+        finally:
+            self.metrics.log_if_due()
+
+    def _send(self, method, url, host, max_retries, **kwargs):
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= max_retries:
+                    elapsed = time.monotonic() - start
+                    self.metrics.record(host, elapsed, ok=response.status_code < 500, retries=attempt)
+                    logger.debug("%s %s -> %s in %.1f ms", method, url, response.status_code, elapsed * 1000)
+                    return response
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= max_retries:
+                    self.metrics.record(host, time.monotonic() - start, ok=False, retries=attempt)
+                    logger.warning("%s %s failed after %d attempt(s): %s", method, url, attempt + 1, e)
+                    raise
+            except requests.RequestException:
+                self.metrics.record(host, time.monotonic() - start, ok=False, retries=attempt)
+                raise
+
+            # Full jitter keeps retries from many workers from arriving in lockstep
+            delay = random.uniform(0, self.config['BACKOFF_FACTOR'] * (2 ** attempt))
+            time.sleep(delay)
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request('PATCH', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide ServiceClient, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ServiceClient()
+    return _client
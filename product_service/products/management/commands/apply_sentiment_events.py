@@ -0,0 +1,35 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from products.sentiment import get_sentiment_aggregator
+
+class Command(BaseCommand):
+    help = 'Apply stored review sentiment events to the product sentiment aggregates'
+    
+    def add_arguments(self, parser):
+        config = getattr(settings, 'SENTIMENT_AGGREGATION', {})
+        parser.add_argument('--interval', type=float, default=config.get('FLUSH_INTERVAL', 5.0),
+                            help='Seconds between passes over the pending events')
+        parser.add_argument('--once', action='store_true',
+                            help='Apply the pending events once and exit')
+    
+    def handle(self, *args, **options):
+        aggregator = get_sentiment_aggregator()
+        try:
+            while True:
+                close_old_connections()
+                started = time.monotonic()
+                written = aggregator.flush()
+                purged = aggregator.purge()
+                if written or purged or options['once']:
+                    elapsed = time.monotonic() - started
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Updated {written} products and purged {purged} applied events in {elapsed:.1f}s'
+                    ))
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,16 @@
+import time
+from django.core.management.base import BaseCommand
+from products.search import rebuild_index
+
+class Command(BaseCommand):
+    help = 'Rebuild the product search index from the product tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Number of index entries inserted per query')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        indexed = rebuild_index(batch_size=options['batch_size'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Indexed {indexed} products in {elapsed:.1f}s'))
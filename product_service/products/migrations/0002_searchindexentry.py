@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('product_type', models.CharField(max_length=20)),
+                ('product_id', models.UUIDField()),
+                ('weight', models.FloatField(default=1.0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='searchindexentry',
+            index=models.Index(fields=['term'], name='search_term_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='searchindexentry',
+            index=models.Index(fields=['product_type', 'product_id'], name='search_product_idx'),
+        ),
+    ]
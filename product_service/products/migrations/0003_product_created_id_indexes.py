@@ -0,0 +1,23 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_searchindexentry'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['created_at', 'id'], name='book_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clothing',
+            index=models.Index(fields=['created_at', 'id'], name='clothing_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mobile',
+            index=models.Index(fields=['created_at', 'id'], name='mobile_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_product_created_id_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSentiment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.UUIDField(unique=True)),
+                ('product_type', models.CharField(blank=True, max_length=20)),
+                ('avg_sentiment_score', models.FloatField(default=0.0)),
+                ('review_count', models.IntegerField(default=0)),
+                ('aspect_sentiment', models.JSONField(default=dict)),
+                ('top_positive_aspects', models.JSONField(default=list)),
+                ('top_negative_aspects', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_productsentiment'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AspectPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('aspect', models.CharField(max_length=100)),
+                ('product_type', models.CharField(max_length=20)),
+                ('product_id', models.UUIDField()),
+                ('weight', models.FloatField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='aspectposting',
+            index=models.Index(fields=['product_id'], name='aspect_posting_product_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='aspectposting',
+            constraint=models.UniqueConstraint(fields=('aspect', 'product_id'), name='aspect_posting_unique'),
+        ),
+    ]
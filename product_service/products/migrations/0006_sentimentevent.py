@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_aspectposting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SentimentEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('comment_id', models.UUIDField(blank=True, null=True, unique=True)),
+                ('product_id', models.UUIDField()),
+                ('sentiment_score', models.FloatField()),
+                ('aspects', models.JSONField(default=list)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['applied_at', 'id'], name='sentiment_event_pending_idx')],
+            },
+        ),
+    ]
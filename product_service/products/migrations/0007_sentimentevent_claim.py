@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_sentimentevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sentimentevent',
+            name='locked_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sentimentevent',
+            name='locked_by',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
@@ -1,4 +1,6 @@
+import heapq
 from django.db import models
+from django.utils import timezone
 from djongo import models as djongo_models
 import uuid
 
@@ -19,6 +21,25 @@ class BaseProduct(models.Model):
     
     class Meta:
         abstract = True
+        indexes = [
+            # Backs cursor pagination of the catalog listings
+            models.Index(fields=['created_at', 'id'], name='%(class)s_created_id_idx'),
+        ]
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember loaded values so saves can tell which fields changed
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def get_changed_fields(self, fields):
+        """Return the given fields whose value differs from the loaded one"""
+        loaded = getattr(self, '_loaded_values', {})
+        return [
+            field for field in fields
+            if field in loaded and loaded[field] != getattr(self, field)
+        ]
 
 class Book(BaseProduct):
     author = models.CharField(max_length=255)
@@ -71,8 +92,51 @@ class ProductImage(models.Model):
     def __str__(self):
         return f"Image for {self.product_type} {self.product_id}"
 
+# Product type name -> concrete model, for code that spans every category
+PRODUCT_MODELS = {
+    'book': Book,
+    'clothing': Clothing,
+    'mobile': Mobile,
+}
+
+class SearchIndexEntry(models.Model):
+    """One posting of the product search inverted index (term -> product)"""
+    term = models.CharField(max_length=64)
+    product_type = models.CharField(max_length=20)  # 'book', 'clothing', 'mobile'
+    product_id = models.UUIDField()
+    weight = models.FloatField(default=1.0)  # Field-weighted term frequency
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['term'], name='search_term_idx'),
+            models.Index(fields=['product_type', 'product_id'], name='search_product_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.term} -> {self.product_type} {self.product_id}"
+
+class AspectPosting(models.Model):
+    """One posting of the review aspect index (positive aspect -> product)"""
+    aspect = models.CharField(max_length=100)
+    product_type = models.CharField(max_length=20)  # 'book', 'clothing', 'mobile'
+    product_id = models.UUIDField()
+    weight = models.FloatField()  # Aspect sentiment score * mentions
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['aspect', 'product_id'], name='aspect_posting_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['product_id'], name='aspect_posting_product_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.aspect} -> {self.product_type} {self.product_id}"
+
 class ProductSentiment(models.Model):
-    product = models.OneToOneField('Product', on_delete=models.CASCADE, related_name='sentiment')
+    # Products live in one table per category, so they are referenced by id
+    product_id = models.UUIDField(unique=True)
+    product_type = models.CharField(max_length=20, blank=True)  # 'book', 'clothing', 'mobile'
     avg_sentiment_score = models.FloatField(default=0.0)
     review_count = models.IntegerField(default=0)
     
@@ -85,55 +149,91 @@ class ProductSentiment(models.Model):
     
     updated_at = models.DateTimeField(auto_now=True)
     
+    def __str__(self):
+        return f"Sentiment for {self.product_type} {self.product_id}"
+    
+    @property
+    def product(self):
+        model = PRODUCT_MODELS.get(self.product_type)
+        return model.objects.filter(pk=self.product_id).first() if model else None
+    
     def update_with_sentiment(self, sentiment_score, aspects, rating=None):
         """Update the sentiment aggregations with new data"""
+        self.apply_delta(1, sentiment_score, {
+            aspect: (1, sentiment_score) for aspect in aspects
+        })
+        self.save()
+    
+    def apply_delta(self, review_count, score_sum, aspect_deltas, mentioned_at=None):
+        """Merge a batch of reviews into the aggregates (does not save)
+        
+        aspect_deltas maps aspect -> (mentions, summed sentiment score), as
+        built by products.sentiment.SentimentAggregator.
+        """
+        if not review_count:
+            return
+        
         # Update average sentiment (weighted running average)
         total = self.avg_sentiment_score * self.review_count
-        self.review_count += 1
-        self.avg_sentiment_score = (total + sentiment_score) / self.review_count
+        self.review_count += review_count
+        self.avg_sentiment_score = (total + score_sum) / self.review_count
         
         # Update aspect sentiment
-        for aspect in aspects:
-            if aspect in self.aspect_sentiment:
-                aspect_data = self.aspect_sentiment[aspect]
-                # Update running average for this aspect
-                total = aspect_data['score'] * aspect_data['count']
-                aspect_data['count'] += 1
-                aspect_data['score'] = (total + sentiment_score) / aspect_data['count']
-                # Update last mention timestamp
-                aspect_data['last_mentioned'] = timezone.now().isoformat()
-            else:
-                self.aspect_sentiment[aspect] = {
-                    'score': sentiment_score,
-                    'count': 1,
-                    'last_mentioned': timezone.now().isoformat()
-                }
+        last_mentioned = (mentioned_at or timezone.now()).isoformat()
+        for aspect, (count, aspect_score_sum) in aspect_deltas.items():
+            aspect_data = self.aspect_sentiment.setdefault(aspect, {'score': 0.0, 'count': 0})
+            total = aspect_data['score'] * aspect_data['count']
+            aspect_data['count'] += count
+            aspect_data['score'] = (total + aspect_score_sum) / aspect_data['count']
+            aspect_data['last_mentioned'] = last_mentioned
         
         # Recalculate top positive and negative aspects
         self._recalculate_top_aspects()
-        
-        self.save()
     
-    def _recalculate_top_aspects(self, limit=5):
+    def _recalculate_top_aspects(self, limit=5, min_mentions=2):
         """Recalculate top positive and negative aspects"""
-        # Get aspects with at least 2 mentions
-        frequent_aspects = {k: v for k, v in self.aspect_sentiment.items() 
-                            if v['count'] >= 2}
-        
-        # Sort by score (descending for positive, ascending for negative)
-        sorted_aspects = sorted(frequent_aspects.items(), 
-                              key=lambda x: x[1]['score'], 
-                              reverse=True)
+        # Only aspects with enough mentions; heaps keep this O(n log limit)
+        positive = []
+        negative = []
+        for aspect, data in self.aspect_sentiment.items():
+            if data['count'] < min_mentions:
+                continue
+            if data['score'] > 0:
+                positive.append((data['score'], aspect))
+            elif data['score'] < 0:
+                negative.append((data['score'], aspect))
         
-        # Get top positive and negative aspects
         self.top_positive_aspects = [
-            {'aspect': a[0], 'score': a[1]['score']} 
-            for a in sorted_aspects[:limit] 
-            if a[1]['score'] > 0
+            {'aspect': aspect, 'score': score}
+            for score, aspect in heapq.nlargest(limit, positive)
         ]
-        
         self.top_negative_aspects = [
-            {'aspect': a[0], 'score': a[1]['score']} 
-            for a in reversed(sorted_aspects)[:limit] 
-            if a[1]['score'] < 0
-        ]
\ No newline at end of file
+            {'aspect': aspect, 'score': score}
+            for score, aspect in heapq.nsmallest(limit, negative)
+        ]
+
+class SentimentEvent(models.Model):
+    """A review's sentiment as received from comment service
+    
+    Stored before the batch is acknowledged and applied to ProductSentiment
+    later (see products/sentiment.py). comment_id is unique, so a review
+    comment service sends again is counted once, as long as its event is
+    kept (SENTIMENT_AGGREGATION['RETENTION']).
+    """
+    comment_id = models.UUIDField(unique=True, null=True, blank=True)
+    product_id = models.UUIDField()
+    sentiment_score = models.FloatField()
+    aspects = models.JSONField(default=list)
+    received_at = models.DateTimeField(auto_now_add=True)
+    # Claim of the flush applying the event (see SentimentAggregator._claim)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=64, blank=True)
+    applied_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['applied_at', 'id'], name='sentiment_event_pending_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Sentiment {self.sentiment_score} for {self.product_id}"
@@ -0,0 +1,12 @@
+from rest_framework.pagination import CursorPagination
+
+class ProductCursorPagination(CursorPagination):
+    """Cursor pagination over (created_at, id), newest first
+    
+    Pages are fetched with an indexed range scan instead of OFFSET, so deep
+    pages cost the same as the first one.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
@@ -0,0 +1,127 @@
+import base64
+import bisect
+import json
+import re
+from collections import Counter
+from django.db import transaction
+from django.db.models import Sum, Count
+
+from .models import PRODUCT_MODELS, SearchIndexEntry
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOP_WORDS = {'a', 'an', 'and', 'by', 'for', 'in', 'of', 'on', 'or', 'the', 'to', 'with'}
+
+# Fields indexed for search and how much a match in each one counts
+FIELD_WEIGHTS = {
+    'name': 3.0,
+    'author': 2.0,
+    'brand': 2.0,
+    'model': 2.0,
+    'description': 1.0,
+}
+
+MAX_RESULTS = 500      # Hard cap on ranked matches considered per query
+MAX_PAGE_SIZE = 50
+DEFAULT_PAGE_SIZE = 20
+
+def tokenize(text):
+    """Split text into lowercase search terms"""
+    return [
+        token for token in TOKEN_RE.findall((text or '').lower())
+        if len(token) > 1 and token not in STOP_WORDS
+    ]
+
+def build_entries(product_type, product):
+    """Build the index postings for one product"""
+    weights = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for term in tokenize(getattr(product, field, '')):
+            weights[term[:64]] += weight
+
+    return [
+        SearchIndexEntry(term=term, product_type=product_type,
+                         product_id=product.pk, weight=weight)
+        for term, weight in weights.items()
+    ]
+
+def index_product(product_type, product):
+    """Replace a product's postings; inactive products are dropped from the index"""
+    with transaction.atomic():
+        remove_product(product_type, product.pk)
+        if product.is_active:
+            SearchIndexEntry.objects.bulk_create(build_entries(product_type, product))
+
+def remove_product(product_type, product_id):
+    SearchIndexEntry.objects.filter(product_type=product_type, product_id=product_id).delete()
+
+def rebuild_index(batch_size=500):
+    """Rebuild the whole index from the product tables, returns products indexed"""
+    indexed = 0
+    with transaction.atomic():
+        SearchIndexEntry.objects.all().delete()
+        for product_type, model in PRODUCT_MODELS.items():
+            entries = []
+            for product in model.objects.filter(is_active=True).iterator(chunk_size=batch_size):
+                entries.extend(build_entries(product_type, product))
+                indexed += 1
+                if len(entries) >= batch_size:
+                    SearchIndexEntry.objects.bulk_create(entries)
+                    entries = []
+            SearchIndexEntry.objects.bulk_create(entries)
+    return indexed
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+def decode_cursor(cursor):
+    try:
+        return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode())))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+def _sort_key(match):
+    # Products matching more query terms first, then by weighted score;
+    # type and id break ties so the order (and the cursor) is stable
+    return (-match['matches'], -match['score'], match['product_type'], str(match['product_id']))
+
+def search(query, category=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """Run a ranked search over the inverted index
+
+    Returns a dict with the page of matches (product_type, product_id,
+    score), per-category facet counts, the total number of ranked matches
+    (capped at MAX_RESULTS) and the cursor for the next page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    terms = list(dict.fromkeys(tokenize(query)))
+    result = {'results': [], 'facets': {'category': {}}, 'count': 0, 'next_cursor': None}
+    if not terms:
+        return result
+
+    postings = SearchIndexEntry.objects.filter(term__in=terms)
+
+    # Facet counts cover every match, regardless of the category filter
+    facets = (postings.values('product_type')
+              .annotate(count=Count('product_id', distinct=True)))
+    result['facets']['category'] = {f['product_type']: f['count'] for f in facets}
+
+    if category:
+        postings = postings.filter(product_type=category)
+
+    matches = list(
+        postings.values('product_type', 'product_id')
+        .annotate(score=Sum('weight'), matches=Count('term', distinct=True))
+        .order_by('-matches', '-score')[:MAX_RESULTS]
+    )
+    matches.sort(key=_sort_key)
+    result['count'] = len(matches)
+
+    start = 0
+    if cursor:
+        after = decode_cursor(cursor)
+        start = bisect.bisect_right([_sort_key(m) for m in matches], after)
+
+    page = matches[start:start + limit]
+    result['results'] = page
+    if start + limit < len(matches):
+        result['next_cursor'] = encode_cursor(list(_sort_key(page[-1])))
+    return result
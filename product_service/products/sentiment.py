@@ -0,0 +1,173 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.dispatch import Signal
+from django.utils import timezone
+
+from . import aspect_index
+from .models import PRODUCT_MODELS, ProductSentiment, SentimentEvent
+
+logger = logging.getLogger(__name__)
+
+# Sent after a flush that wrote at least one product's sentiment
+sentiment_flushed = Signal()
+
+class PendingSentiment:
+    """Review sentiment for one product that has not been written yet"""
+    __slots__ = ('review_count', 'score_sum', 'aspects', 'mentioned_at')
+
+    def __init__(self):
+        self.review_count = 0
+        self.score_sum = 0.0
+        self.aspects = {}  # aspect -> [mentions, summed score]
+        self.mentioned_at = None
+
+    def add(self, score, aspects, mentioned_at):
+        self.review_count += 1
+        self.score_sum += score
+        for aspect in set(aspects):
+            totals = self.aspects.setdefault(aspect, [0, 0.0])
+            totals[0] += 1
+            totals[1] += score
+        self.mentioned_at = max(filter(None, (self.mentioned_at, mentioned_at)), default=None)
+
+class SentimentAggregator:
+    """Stores review sentiment events and applies them once per product per pass
+
+    add_many() stores the events (SentimentEvent) before the caller
+    acknowledges them, so a restart loses nothing; a review whose
+    comment_id was already received is dropped, so re-sent batches are
+    counted once. flush(), run by the apply_sentiment_events worker,
+    merges pending events in memory and applies them with one write per
+    product touched, however many reviews it got.
+
+    Events are claimed with a conditional update before they are applied:
+    MongoDB (djongo) has no row locks or transactions to rely on, and an
+    event claimed by one flush never matches another's. A claim older than
+    claim_timeout (its worker died) is taken over.
+    """
+
+    def __init__(self, batch_size=5000, claim_timeout=300, retention=7 * 24 * 60 * 60):
+        self.batch_size = batch_size
+        self.claim_timeout = claim_timeout
+        self.retention = retention
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.events = 0
+        self.flushes = 0
+        self.rows_written = 0
+
+    def add(self, product_id, score, aspects, comment_id=None):
+        self.add_many([(product_id, score, aspects, comment_id)])
+
+    def add_many(self, events):
+        """Store (product_id, score, aspects, comment_id) events for the next flush"""
+        SentimentEvent.objects.bulk_create(
+            [
+                # A unique index treats missing ids as equal on MongoDB, and an
+                # event without one can't be deduplicated anyway
+                SentimentEvent(comment_id=comment_id or uuid.uuid4(), product_id=product_id,
+                               sentiment_score=score, aspects=list(aspects))
+                for product_id, score, aspects, comment_id in events
+            ],
+            ignore_conflicts=True,  # Already received (same comment_id)
+        )
+        self.events += len(events)
+
+    def flush(self):
+        """Apply every pending event, returns the number of products written"""
+        written = 0
+        while True:
+            events = self._claim()
+            if not events:
+                break
+
+            events_by_product = {}
+            for event in events:
+                events_by_product.setdefault(event.product_id, []).append(event)
+            for product_id, product_events in events_by_product.items():
+                try:
+                    self._write(product_id, product_events)
+                    written += 1
+                except Exception:
+                    # The events stay claimed and are retried once the claim times out
+                    logger.exception("Could not write sentiment for product %s", product_id)
+
+        self.flushes += 1
+        self.rows_written += written
+        if written:
+            sentiment_flushed.send(sender=self.__class__, products=written)
+        return written
+
+    def purge(self):
+        """Delete events applied more than retention seconds ago, returns the number deleted
+
+        Applied events are only kept so that a review comment service sends
+        again is still recognised.
+        """
+        cutoff = timezone.now() - timedelta(seconds=self.retention)
+        deleted, _ = SentimentEvent.objects.filter(applied_at__lt=cutoff).delete()
+        return deleted
+
+    def _claim(self):
+        now = timezone.now()
+        stale = now - timedelta(seconds=self.claim_timeout)
+        claimable = SentimentEvent.objects.filter(applied_at__isnull=True).filter(
+            Q(locked_at__isnull=True) | Q(locked_at__lt=stale)
+        )
+        event_ids = list(claimable.order_by('id').values_list('id', flat=True)[:self.batch_size])
+        if not event_ids:
+            return []
+
+        # Only events still claimable are taken: another flush may have
+        # claimed some of them since they were read
+        claimable.filter(id__in=event_ids).update(locked_at=now, locked_by=self.worker_id)
+        return list(SentimentEvent.objects.filter(id__in=event_ids, locked_by=self.worker_id, locked_at=now))
+
+    def _write(self, product_id, events):
+        delta = PendingSentiment()
+        for event in events:
+            delta.add(event.sentiment_score, event.aspects, event.received_at)
+
+        with transaction.atomic():
+            sentiment, _ = ProductSentiment.objects.select_for_update().get_or_create(product_id=product_id)
+            if not sentiment.product_type:
+                sentiment.product_type = _find_product_type(product_id)
+            sentiment.apply_delta(
+                delta.review_count,
+                delta.score_sum,
+                {aspect: tuple(totals) for aspect, totals in delta.aspects.items()},
+                mentioned_at=delta.mentioned_at,
+            )
+            sentiment.save()
+            SentimentEvent.objects.filter(id__in=[event.id for event in events]).update(applied_at=timezone.now())
+            # Only the aspects reviewed since the last flush can have changed
+            aspect_index.update_postings(sentiment, delta.aspects)
+
+def _find_product_type(product_id):
+    for product_type, model in PRODUCT_MODELS.items():
+        if model.objects.filter(pk=product_id).exists():
+            return product_type
+    return ''
+
+_aggregator = None
+_aggregator_lock = threading.Lock()
+
+def get_sentiment_aggregator():
+    """Return the process-wide SentimentAggregator"""
+    global _aggregator
+    if _aggregator is None:
+        with _aggregator_lock:
+            if _aggregator is None:
+                config = getattr(settings, 'SENTIMENT_AGGREGATION', {})
+                _aggregator = SentimentAggregator(
+                    batch_size=config.get('BATCH_SIZE', 5000),
+                    claim_timeout=config.get('CLAIM_TIMEOUT', 300),
+                    retention=config.get('RETENTION', 7 * 24 * 60 * 60),
+                )
+    return _aggregator
@@ -1,21 +1,32 @@
 from rest_framework import serializers
 from .models import Book, Clothing, Mobile, ProductImage
 
-class BookSerializer(serializers.ModelSerializer):
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer that takes an optional `fields` list to serialize only those fields"""
+    
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+        
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+class BookSerializer(DynamicFieldsModelSerializer):
     category = serializers.ReadOnlyField(default='book')
     
     class Meta:
         model = Book
         fields = '__all__'
 
-class ClothingSerializer(serializers.ModelSerializer):
+class ClothingSerializer(DynamicFieldsModelSerializer):
     category = serializers.ReadOnlyField(default='clothing')
     
     class Meta:
         model = Clothing
         fields = '__all__'
 
-class MobileSerializer(serializers.ModelSerializer):
+class MobileSerializer(DynamicFieldsModelSerializer):
     category = serializers.ReadOnlyField(default='mobile')
     
     class Meta:
@@ -25,4 +36,25 @@ class MobileSerializer(serializers.ModelSerializer):
 class ProductImageSerializer(serializers.ModelSerializer):
     class Meta:
         model = ProductImage
-        fields = '__all__'
\ No newline at end of file
+        fields = '__all__'
+
+class ProductReferenceSerializer(serializers.Serializer):
+    product_type = serializers.ChoiceField(choices=[('book', 'Book'),
+                                                    ('clothing', 'Clothing'),
+                                                    ('mobile', 'Mobile')])
+    product_id = serializers.UUIDField()
+
+class ProductBatchSerializer(serializers.Serializer):
+    items = ProductReferenceSerializer(many=True, allow_empty=False, max_length=200)
+
+class SentimentEventSerializer(serializers.Serializer):
+    product_id = serializers.UUIDField()
+    sentiment_score = serializers.FloatField(min_value=-1.0, max_value=1.0)
+    sentiment_aspects = serializers.ListField(
+        child=serializers.CharField(max_length=100), required=False, default=list
+    )
+    rating = serializers.IntegerField(min_value=1, max_value=5, required=False, allow_null=True)
+    comment_id = serializers.UUIDField(required=False)
+
+class SentimentBatchSerializer(serializers.Serializer):
+    events = SentimentEventSerializer(many=True, allow_empty=False, max_length=1000)
@@ -0,0 +1,54 @@
+from django.db.models.signals import post_save, post_delete
+
+from .models import Book, Clothing, Mobile
+from . import aspect_index
+from .events import publish_product_change
+from .search import FIELD_WEIGHTS, index_product, remove_product
+
+PRODUCT_TYPES = {
+    Book: 'book',
+    Clothing: 'clothing',
+    Mobile: 'mobile',
+}
+
+# Changes to these fields make cached product snapshots stale
+WATCHED_FIELDS = ['price', 'stock_quantity', 'is_active', 'name']
+
+# Changes to these fields change a product's search postings
+INDEXED_FIELDS = [*FIELD_WEIGHTS, 'is_active', 'category']
+
+def product_saved(sender, instance, created, **kwargs):
+    product_type = PRODUCT_TYPES[sender]
+    
+    # Keep the search index in step with the product row; stock and price
+    # updates don't touch indexed text, so they skip the rewrite
+    known = hasattr(instance, '_loaded_values')
+    if created or not known:
+        index_product(product_type, instance)
+        # Nothing to compare against: the saved row becomes the baseline
+        instance._loaded_values = {
+            field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields
+        }
+        return
+    
+    indexed_changes = instance.get_changed_fields(INDEXED_FIELDS)
+    if indexed_changes:
+        index_product(product_type, instance)
+    
+    changed_fields = instance.get_changed_fields(WATCHED_FIELDS)
+    if changed_fields:
+        publish_product_change(product_type, instance.pk, changed_fields)
+    
+    # The saved values are now the baseline for the next comparison
+    for field in {*indexed_changes, *changed_fields}:
+        instance._loaded_values[field] = getattr(instance, field)
+
+def product_deleted(sender, instance, **kwargs):
+    remove_product(PRODUCT_TYPES[sender], instance.pk)
+    aspect_index.remove_product(instance.pk)
+    publish_product_change(PRODUCT_TYPES[sender], instance.pk, ['deleted'])
+
+def connect_signals():
+    for model in PRODUCT_TYPES:
+        post_save.connect(product_saved, sender=model, dispatch_uid=f'product_saved_{model.__name__}')
+        post_delete.connect(product_deleted, sender=model, dispatch_uid=f'product_deleted_{model.__name__}')
@@ -1,6 +1,9 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import BookViewSet, ClothingViewSet, MobileViewSet, ProductImageViewSet, ProductSearchView
+from .views import (
+    BookViewSet, ClothingViewSet, MobileViewSet, ProductImageViewSet, ProductSearchView,
+    ProductBatchView, ProductSentimentBatchView
+)
 
 router = DefaultRouter()
 router.register(r'books', BookViewSet)
@@ -8,6 +11,8 @@ router.register(r'clothing', ClothingViewSet)
 router.register(r'mobiles', MobileViewSet)
 router.register(r'images', ProductImageViewSet)
 router.register(r'search', ProductSearchView, basename='search')
+router.register(r'products/batch', ProductBatchView, basename='product-batch')
+router.register(r'products/sentiment/batch', ProductSentimentBatchView, basename='product-sentiment-batch')
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -2,11 +2,52 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Book, Clothing, Mobile, ProductImage
-from .serializers import BookSerializer, ClothingSerializer, MobileSerializer, ProductImageSerializer
+from .pagination import ProductCursorPagination
+from . import search
+from .serializers import (
+    BookSerializer, ClothingSerializer, MobileSerializer, ProductImageSerializer,
+    ProductBatchSerializer, SentimentBatchSerializer
+)
+from .sentiment import get_sentiment_aggregator
 
-class BookViewSet(viewsets.ModelViewSet):
+# Product type -> (model, serializer) for endpoints that span every category
+PRODUCT_TYPES = {
+    'book': (Book, BookSerializer),
+    'clothing': (Clothing, ClothingSerializer),
+    'mobile': (Mobile, MobileSerializer),
+}
+
+class SparseFieldsetMixin:
+    """Lets read requests pick columns with ?fields=name,price,stock_quantity"""
+    
+    def get_requested_fields(self):
+        if self.request is None or self.request.method not in ('GET', 'HEAD'):
+            return None
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        return [field.strip() for field in fields.split(',') if field.strip()]
+    
+    def get_serializer(self, *args, **kwargs):
+        fields = self.get_requested_fields()
+        if fields is not None:
+            kwargs['fields'] = fields
+        return super().get_serializer(*args, **kwargs)
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        fields = self.get_requested_fields()
+        if fields is not None:
+            # Only load the requested columns (plus what pagination orders by)
+            model_fields = {f.name for f in queryset.model._meta.concrete_fields}
+            columns = {'id', 'created_at'} | (set(fields) & model_fields)
+            queryset = queryset.only(*columns)
+        return queryset
+
+class BookViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
+    pagination_class = ProductCursorPagination
     
     @action(detail=True, methods=['get'])
     def images(self, request, pk=None):
@@ -15,9 +56,10 @@ class BookViewSet(viewsets.ModelViewSet):
         serializer = ProductImageSerializer(images, many=True)
         return Response(serializer.data)
 
-class ClothingViewSet(viewsets.ModelViewSet):
+class ClothingViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Clothing.objects.all()
     serializer_class = ClothingSerializer
+    pagination_class = ProductCursorPagination
     
     @action(detail=True, methods=['get'])
     def images(self, request, pk=None):
@@ -26,9 +68,10 @@ class ClothingViewSet(viewsets.ModelViewSet):
         serializer = ProductImageSerializer(images, many=True)
         return Response(serializer.data)
 
-class MobileViewSet(viewsets.ModelViewSet):
+class MobileViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Mobile.objects.all()
     serializer_class = MobileSerializer
+    pagination_class = ProductCursorPagination
     
     @action(detail=True, methods=['get'])
     def images(self, request, pk=None):
@@ -43,28 +86,100 @@ class ProductImageViewSet(viewsets.ModelViewSet):
 
 class ProductSearchView(viewsets.ViewSet):
     def list(self, request):
-        """Search products across all categories"""
+        """Ranked search across all categories using the inverted index"""
         query = request.query_params.get('q', '')
         category = request.query_params.get('category', '')
+        cursor = request.query_params.get('cursor')
+        
+        if category and category not in PRODUCT_TYPES:
+            return Response({"error": f"Unknown category: {category}"}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            limit = int(request.query_params.get('limit', search.DEFAULT_PAGE_SIZE))
+            result = search.search(query, category=category or None, cursor=cursor, limit=limit)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Load only the products on this page, one query per category
+        ids_by_type = {}
+        for match in result['results']:
+            ids_by_type.setdefault(match['product_type'], []).append(match['product_id'])
+        
+        products = {}
+        for product_type, ids in ids_by_type.items():
+            model, serializer_class = PRODUCT_TYPES[product_type]
+            for product in model.objects.filter(id__in=ids, is_active=True):
+                products[(product_type, product.pk)] = serializer_class(product).data
         
         results = []
+        for match in result['results']:
+            product_data = products.get((match['product_type'], match['product_id']))
+            if product_data is not None:
+                results.append({
+                    **product_data,
+                    'product_type': match['product_type'],
+                    'score': match['score'],
+                })
         
-        if not category or category == 'book':
-            books = Book.objects.filter(name__icontains=query, is_active=True)
-            book_data = BookSerializer(books, many=True).data
-            results.extend(book_data)
-            
-        if not category or category == 'clothing':
-            clothes = Clothing.objects.filter(name__icontains=query, is_active=True)
-            clothing_data = ClothingSerializer(clothes, many=True).data
-            results.extend(clothing_data)
-            
-        if not category or category == 'mobile':
-            mobiles = Mobile.objects.filter(name__icontains=query, is_active=True)
-            mobile_data = MobileSerializer(mobiles, many=True).data
-            results.extend(mobile_data)
-            
-        return Response(results)
+        return Response({
+            'count': result['count'],
+            'next_cursor': result['next_cursor'],
+            'facets': result['facets'],
+            'results': results,
+        })
+
+class ProductBatchView(viewsets.ViewSet):
+    def create(self, request):
+        """Fetch many products across all categories in one request"""
+        # Accept either a bare list of references or {"items": [...]}
+        data = {'items': request.data} if isinstance(request.data, list) else request.data
+        serializer = ProductBatchSerializer(data=data)
+        serializer.is_valid(raise_exception=True)
+        
+        # Group the requested ids so each table is queried only once
+        ids_by_type = {}
+        for ref in serializer.validated_data['items']:
+            ids_by_type.setdefault(ref['product_type'], set()).add(ref['product_id'])
+        
+        products = []
+        found = set()
+        for product_type, ids in ids_by_type.items():
+            model, serializer_class = PRODUCT_TYPES[product_type]
+            queryset = model.objects.filter(id__in=ids)
+            for product_data in serializer_class(queryset, many=True).data:
+                product_data['product_type'] = product_type
+                products.append(product_data)
+                found.add((product_type, str(product_data['id'])))
+        
+        not_found = [
+            {'product_type': product_type, 'product_id': str(product_id)}
+            for product_type, ids in ids_by_type.items()
+            for product_id in ids
+            if (product_type, str(product_id)) not in found
+        ]
+        
+        return Response({'products': products, 'not_found': not_found})
+
+class ProductSentimentBatchView(viewsets.ViewSet):
+    """Takes review sentiment from comment service in batches
+    
+    Events are stored, deduplicated by comment_id, and applied to
+    ProductSentiment once per product per pass of the
+    apply_sentiment_events worker (see products/sentiment.py).
+    """
+    
+    def create(self, request):
+        serializer = SentimentBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        events = serializer.validated_data['events']
+        # Stored before answering, so an acknowledged review is never lost;
+        # reviews already received (same comment_id) are ignored
+        get_sentiment_aggregator().add_many([
+            (event['product_id'], event['sentiment_score'], event['sentiment_aspects'], event.get('comment_id'))
+            for event in events
+        ])
+        return Response({'accepted': len(events)}, status=status.HTTP_202_ACCEPTED)
 
 class ProductViewSet(viewsets.ModelViewSet):
     # ...existing code...
@@ -76,12 +191,8 @@ class ProductViewSet(viewsets.ModelViewSet):
         
         sentiment_score = request.data.get('sentiment_score')
         sentiment_aspects = request.data.get('sentiment_aspects', [])
-        rating = request.data.get('rating')
-        
-        # Get or create ProductSentiment object
-        sentiment, created = ProductSentiment.objects.get_or_create(product=product)
         
-        # Update sentiment data
-        sentiment.update_with_sentiment(sentiment_score, sentiment_aspects, rating)
+        # Stored and applied with other reviews of this product
+        get_sentiment_aggregator().add(product.pk, sentiment_score, sentiment_aspects)
         
-        return Response({'status': 'sentiment processed'})
\ No newline at end of file
+        return Response({'status': 'sentiment processed'})
@@ -0,0 +1,112 @@
+import threading
+import time
+
+import numpy as np
+from scipy import sparse
+from django.conf import settings
+from django.db import connection
+
+from products.models import AspectPosting
+
+class AspectMatrix:
+    """Sparse product x aspect matrix of positive review sentiment
+
+    Built from the aspect index (AspectPosting), so cell (product, aspect)
+    holds that aspect's score * mentions for the product. Scoring every
+    product against a set of aspects is one CSR matrix-vector product.
+    """
+
+    def __init__(self, keys, aspects, matrix):
+        self.keys = keys                # row -> (product_type, product_id)
+        self.aspects = aspects          # aspect -> column
+        self.matrix = matrix
+        self.rows = {product_id: row for row, (_, product_id) in enumerate(keys)}
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls):
+        keys = []
+        rows_by_product = {}
+        aspects = {}
+        rows, cols, weights = [], [], []
+
+        postings = AspectPosting.objects.values_list('product_type', 'product_id', 'aspect', 'weight')
+        for product_type, product_id, aspect, weight in postings.iterator(chunk_size=5000):
+            row = rows_by_product.get(product_id)
+            if row is None:
+                row = rows_by_product[product_id] = len(keys)
+                keys.append((product_type, product_id))
+            rows.append(row)
+            cols.append(aspects.setdefault(aspect, len(aspects)))
+            weights.append(weight)
+
+        matrix = sparse.csr_matrix(
+            (np.asarray(weights, dtype=np.float32), (rows, cols)),
+            shape=(len(keys), len(aspects)),
+        )
+        return cls(keys, aspects, matrix)
+
+    def query_vector(self, aspects):
+        """Indicator vector of the given aspects (unknown ones are ignored)"""
+        vector = np.zeros(len(self.aspects), dtype=np.float32)
+        for aspect in aspects:
+            column = self.aspects.get(aspect)
+            if column is not None:
+                vector[column] = 1.0
+        return vector
+
+    def top_k(self, vector, limit, exclude=()):
+        """Best scoring products for a query vector
+
+        Returns (score, product_type, product_id) tuples, best first, for
+        products scoring above zero; products in exclude (ids) are skipped.
+        """
+        if not self.keys or limit <= 0:
+            return []
+
+        scores = self.matrix @ vector
+        for product_id in exclude:
+            row = self.rows.get(product_id)
+            if row is not None:
+                scores[row] = 0.0
+
+        # argpartition finds the k best in O(n); only those k get sorted
+        k = min(limit, len(scores))
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [
+            (float(scores[row]), *self.keys[row])
+            for row in best
+            if scores[row] > 0
+        ]
+
+_matrix = None
+_matrix_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+
+def _refresh():
+    global _matrix
+    try:
+        _matrix = AspectMatrix.build()
+    finally:
+        connection.close()  # This thread's own connection
+        _refresh_lock.release()
+
+def get_aspect_matrix():
+    """Return the process-wide AspectMatrix
+
+    The first call builds it; after that a matrix older than
+    REFRESH_INTERVAL seconds is rebuilt in the background while requests
+    keep using the current one.
+    """
+    global _matrix
+    if _matrix is None:
+        with _matrix_lock:
+            if _matrix is None:
+                _matrix = AspectMatrix.build()
+        return _matrix
+
+    refresh_interval = getattr(settings, 'RECOMMENDATIONS', {}).get('REFRESH_INTERVAL', 60)
+    if time.monotonic() - _matrix.built_at > refresh_interval and _refresh_lock.acquire(blocking=False):
+        threading.Thread(target=_refresh, name='aspect-matrix-refresh', daemon=True).start()
+    return _matrix
@@ -1,6 +1,18 @@
-from products.models import Product, ProductSentiment
+import heapq
+import logging
+import uuid
+
+import requests
+from django.conf import settings
 from django.db.models import Q, F, ExpressionWrapper, FloatField
 
+from products import aspect_index
+from products.http_client import get_client
+from products.models import ProductSentiment
+from .engine import get_aspect_matrix
+
+logger = logging.getLogger(__name__)
+
 class RecommendationService:
     @staticmethod
     def get_sentiment_based_recommendations(user_id=None, product_id=None, limit=10):
@@ -17,84 +29,75 @@ class RecommendationService:
         """Find products with similar positive aspects"""
         try:
             # Get source product sentiment
-            source_sentiment = ProductSentiment.objects.select_related('product').get(product_id=product_id)
-            
-            # Extract positive aspects from the source product
-            positive_aspects = [a['aspect'] for a in source_sentiment.top_positive_aspects]
-            
-            if not positive_aspects:
-                return RecommendationService.get_top_rated_products(limit)
-            
-            # Find products that share these positive aspects
-            product_scores = {}
-            
-            for sentiment in ProductSentiment.objects.select_related('product').exclude(product_id=product_id):
-                score = 0
-                # Check each aspect in this product
-                for aspect, data in sentiment.aspect_sentiment.items():
-                    if aspect in positive_aspects and data['score'] > 0:
-                        score += data['score'] * data['count']
-                
-                if score > 0:
-                    product_scores[sentiment.product] = score
-            
-            # Sort by score and return top products
-            sorted_products = sorted(product_scores.items(), key=lambda x: x[1], reverse=True)[:limit]
-            return [{'product': p[0], 'score': p[1]} for p in sorted_products]
-            
+            source_sentiment = ProductSentiment.objects.get(product_id=product_id)
         except ProductSentiment.DoesNotExist:
             return RecommendationService.get_top_rated_products(limit)
+        
+        positive_aspects = [a['aspect'] for a in source_sentiment.top_positive_aspects]
+        if not positive_aspects:
+            return RecommendationService.get_top_rated_products(limit)
+        
+        matrix = get_aspect_matrix()
+        ranked = matrix.top_k(matrix.query_vector(positive_aspects), limit * 2,
+                              exclude=[source_sentiment.product_id])
+        return RecommendationService._load_ranked(ranked, limit)
     
     @staticmethod
     def get_personalized_recommendations(user_id, limit=10):
         """Get personalized recommendations based on user's past reviews"""
-        # Fetch aspects the user has positively commented on
-        user_comments = Comment.objects.filter(user_id=user_id, sentiment_score__gt=0)
+        # Fetch the user's product reviews from comment service
+        user_comments = RecommendationService._get_user_reviews(user_id)
+        liked = [c for c in user_comments if (c.get('sentiment_score') or 0) > 0]
         
-        if not user_comments.exists():
+        if not liked:
             return RecommendationService.get_top_rated_products(limit)
         
         # Collect aspects the user likes
         user_aspects = {}
-        for comment in user_comments:
-            for aspect in comment.sentiment_aspects:
-                if aspect in user_aspects:
-                    user_aspects[aspect] += comment.sentiment_score
-                else:
-                    user_aspects[aspect] = comment.sentiment_score
+        for comment in liked:
+            for aspect in comment.get('sentiment_aspects') or []:
+                user_aspects[aspect] = user_aspects.get(aspect, 0) + comment['sentiment_score']
         
         # Sort aspects by sentiment score
-        sorted_aspects = sorted(user_aspects.items(), key=lambda x: x[1], reverse=True)
-        top_aspects = [a[0] for a in sorted_aspects[:10]]
+        top_aspects = heapq.nlargest(10, user_aspects, key=user_aspects.get)
         
         if not top_aspects:
             return RecommendationService.get_top_rated_products(limit)
         
-        # Find products that have these aspects rated positively
-        product_scores = {}
-        
-        for sentiment in ProductSentiment.objects.select_related('product'):
-            score = 0
-            for aspect, data in sentiment.aspect_sentiment.items():
-                if aspect in top_aspects and data['score'] > 0:
-                    score += data['score'] * data['count']
-            
-            if score > 0:
-                product_scores[sentiment.product] = score
-        
-        # Filter out products the user has already reviewed
-        reviewed_products = user_comments.values_list('entity_id', flat=True)
-        product_scores = {p: s for p, s in product_scores.items() if str(p.id) not in reviewed_products}
-        
-        # Sort by score and return top products
-        sorted_products = sorted(product_scores.items(), key=lambda x: x[1], reverse=True)[:limit]
-        return [{'product': p[0], 'score': p[1]} for p in sorted_products]
+        # Score every product on these aspects at once, skipping products
+        # the user has already reviewed
+        matrix = get_aspect_matrix()
+        reviewed_products = {uuid.UUID(c['entity_id']) for c in user_comments}
+        ranked = matrix.top_k(matrix.query_vector(top_aspects), limit * 2, exclude=reviewed_products)
+        return RecommendationService._load_ranked(ranked, limit)
+    
+    @staticmethod
+    def _load_ranked(ranked, limit):
+        # Ask for a few extra upstream in case some products are inactive
+        products = aspect_index.load_products((t, pid) for _, t, pid in ranked)
+        return [
+            {'product': products[(product_type, pid)], 'score': score}
+            for score, product_type, pid in ranked
+            if (product_type, pid) in products
+        ][:limit]
+    
+    @staticmethod
+    def _get_user_reviews(user_id):
+        """Product reviews written by a user, with their sentiment"""
+        url = f"{settings.MICROSERVICE_URLS['COMMENT_SERVICE']}/comments/"
+        try:
+            response = get_client().get(url, params={'customer_id': user_id, 'entity_type': 'PRODUCT'})
+        except requests.RequestException:
+            logger.warning("Comment service unavailable, no personalized recommendations for %s", user_id)
+            return []
+        if response.status_code != 200:
+            return []
+        return response.json()
     
     @staticmethod
     def get_top_rated_products(limit=10):
         """Get products with highest sentiment scores"""
         top_products = (ProductSentiment.objects
-                       .select_related('product')
                        .filter(review_count__gte=5)  # Only consider products with sufficient reviews
                        .order_by('-avg_sentiment_score')[:limit])
         
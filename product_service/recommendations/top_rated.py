@@ -0,0 +1,121 @@
+import hashlib
+import json
+import threading
+import time
+from django.conf import settings
+from django.db import connection
+
+from products import aspect_index
+from products.models import PRODUCT_MODELS, ProductImage, ProductSentiment
+from products.sentiment import sentiment_flushed
+
+ALL_CATEGORIES = 'all'
+MIN_REVIEWS = 5  # Only consider products with sufficient reviews
+
+class TopRatedSnapshot:
+    """Materialized top-rated lists, ready to serve"""
+
+    def __init__(self, lists):
+        self.lists = lists  # category -> list of formatted products, best first
+        self.etags = {
+            category: hashlib.sha1(json.dumps(items, sort_keys=True).encode()).hexdigest()
+            for category, items in lists.items()
+        }
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls, size):
+        """Query the best rated products for every category and overall"""
+        rated = ProductSentiment.objects.filter(review_count__gte=MIN_REVIEWS).order_by('-avg_sentiment_score')
+        ranked = {ALL_CATEGORIES: list(rated.values_list('product_type', 'product_id', 'avg_sentiment_score')[:size])}
+        for category in PRODUCT_MODELS:
+            ranked[category] = list(
+                rated.filter(product_type=category)
+                .values_list('product_type', 'product_id', 'avg_sentiment_score')[:size]
+            )
+
+        keys = {(t, pid) for rows in ranked.values() for t, pid, _ in rows}
+        products = aspect_index.load_products(keys)
+        images = dict(
+            ProductImage.objects.filter(product_id__in=[pid for _, pid in keys], is_primary=True)
+            .values_list('product_id', 'image_url')
+        )
+
+        lists = {}
+        for category, rows in ranked.items():
+            lists[category] = [
+                {
+                    'id': str(pid),
+                    'product_type': product_type,
+                    'name': products[(product_type, pid)].name,
+                    'price': float(products[(product_type, pid)].price),
+                    'score': float(score),
+                    'image_url': images.get(pid),
+                }
+                for product_type, pid, score in rows
+                if (product_type, pid) in products
+            ]
+        return cls(lists)
+
+class TopRatedCache:
+    """Serves the top-rated lists from memory
+
+    The first request builds the snapshot. After that it is rebuilt in the
+    background, while requests keep getting the current one, once it is
+    older than refresh_interval or once invalidate() is called after new
+    sentiment was written.
+    """
+
+    def __init__(self, size=50, refresh_interval=300):
+        self.size = size
+        self.refresh_interval = refresh_interval
+        self._snapshot = None
+        self._dirty = False
+        self._build_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def get(self):
+        if self._snapshot is None:
+            with self._build_lock:
+                if self._snapshot is None:
+                    self._snapshot = TopRatedSnapshot.build(self.size)
+            return self._snapshot
+
+        stale = time.monotonic() - self._snapshot.built_at > self.refresh_interval
+        if (stale or self._dirty) and self._refresh_lock.acquire(blocking=False):
+            self._dirty = False
+            threading.Thread(target=self._refresh, name='top-rated-refresh', daemon=True).start()
+        return self._snapshot
+
+    def invalidate(self):
+        self._dirty = True
+
+    def _refresh(self):
+        try:
+            self._snapshot = TopRatedSnapshot.build(self.size)
+        finally:
+            connection.close()  # This thread's own connection
+            self._refresh_lock.release()
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_top_rated_cache():
+    """Return the process-wide TopRatedCache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                config = getattr(settings, 'RECOMMENDATIONS', {})
+                _cache = TopRatedCache(
+                    size=config.get('TOP_RATED_SIZE', 50),
+                    refresh_interval=config.get('TOP_RATED_REFRESH_INTERVAL', 300),
+                )
+    return _cache
+
+def _sentiment_flushed(sender, **kwargs):
+    # New sentiment can change the rankings; rebuild on the next request
+    if _cache is not None:
+        _cache.invalidate()
+
+sentiment_flushed.connect(_sentiment_flushed, dispatch_uid='top_rated_invalidate')
@@ -1,7 +1,9 @@
 from rest_framework import viewsets
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from django.conf import settings
 from .services import RecommendationService
+from .top_rated import ALL_CATEGORIES, get_top_rated_cache
 
 class RecommendationViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
@@ -32,8 +34,22 @@ class RecommendationViewSet(viewsets.ViewSet):
     def top_rated(self, request):
         """Get top rated products by sentiment score"""
         limit = int(request.query_params.get('limit', 10))
-        recommendations = RecommendationService.get_top_rated_products(limit)
-        return Response(self._format_recommendations(recommendations))
+        category = request.query_params.get('category', ALL_CATEGORIES)
+        
+        # Same answer for every visitor: served from the in-memory snapshot,
+        # which is refreshed in the background (see top_rated.py)
+        snapshot = get_top_rated_cache().get()
+        if category not in snapshot.lists:
+            return Response({"error": f"Unknown category: {category}"}, status=400)
+        
+        max_age = getattr(settings, 'RECOMMENDATIONS', {}).get('TOP_RATED_MAX_AGE', 60)
+        headers = {
+            'ETag': f'"{snapshot.etags[category]}-{limit}"',
+            'Cache-Control': f'public, max-age={max_age}',
+        }
+        if request.headers.get('If-None-Match') == headers['ETag']:
+            return Response(status=304, headers=headers)
+        return Response(snapshot.lists[category][:limit], headers=headers)
     
     def _format_recommendations(self, recommendations):
         """Format recommendation data for API response"""
@@ -43,7 +59,7 @@ class RecommendationViewSet(viewsets.ViewSet):
                 'name': item['product'].name,
                 'price': float(item['product'].price),
                 'score': float(item['score']),
-                'image_url': item['product'].image_url
+                'image_url': getattr(item['product'], 'image_url', None)
             }
             for item in recommendations
         ]
\ No newline at end of file
@@ -109,6 +109,31 @@ MICROSERVICE_URLS = {
     'PRODUCT_SERVICE': 'http://localhost:8001/api',
 }
 
+# Shared HTTP client for inter-service calls (see shipments/http_client.py)
+HTTP_CLIENT = {
+    'CONNECT_TIMEOUT': 2.0,
+    'READ_TIMEOUT': 5.0,
+    'MAX_RETRIES': 2,
+    'BACKOFF_FACTOR': 0.1,
+    'POOL_CONNECTIONS': 10,
+    'POOL_MAXSIZE': 50,
+    'METRICS_LOG_INTERVAL': 60,  # Per-host call/latency summary in the log
+}
+
+# Transactional outbox (see outbox.py): relay_outbox delivers queued calls in
+# batches; failed deliveries are retried after RETRY_BACKOFF * 2**n seconds,
+# capped at MAX_BACKOFF, until they succeed. A relay whose poll fails (e.g.
+# the database is busy) waits up to MAX_ERROR_BACKOFF seconds before retrying
+OUTBOX = {
+    'WORKERS': 1,
+    'BATCH_SIZE': 100,
+    'POLL_INTERVAL': 1.0,
+    'RETRY_BACKOFF': 5,
+    'MAX_BACKOFF': 3600,
+    'VISIBILITY_TIMEOUT': 60,
+    'MAX_ERROR_BACKOFF': 60,
+}
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -162,3 +187,10 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.1/howto/static-files/
 
 STATIC_URL = '/static/'
+
+# Default primary key field type
+# https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
+# AutoField, as in the existing migrations of the models without a UUID
+# primary key (OutboxMessage, which is read in id order)
+
+DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
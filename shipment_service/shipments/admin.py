@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Shipment, ShipmentUpdate
+from .models import OutboxMessage, Shipment, ShipmentUpdate
 
 class ShipmentUpdateInline(admin.TabularInline):
     model = ShipmentUpdate
@@ -43,4 +43,11 @@ class ShipmentUpdateAdmin(admin.ModelAdmin):
     list_display = ('shipment', 'status', 'timestamp', 'location')
     list_filter = ('status', 'timestamp')
     search_fields = ('shipment__tracking_number', 'shipment__order_id', 'location', 'description')
-    readonly_fields = ('id', 'timestamp')
\ No newline at end of file
+    readonly_fields = ('id', 'timestamp')
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ('id', 'service', 'path', 'status', 'attempts', 'available_at', 'created_at')
+    list_filter = ('status', 'service')
+    search_fields = ('path', 'key', 'last_error')
+    readonly_fields = ('created_at',)
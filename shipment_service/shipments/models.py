@@ -1,4 +1,6 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 import uuid
 from datetime import datetime, timedelta
 import random
@@ -109,4 +111,41 @@ class ShipmentUpdate(models.Model):
         ordering = ['-timestamp']
     
     def __str__(self):
-        return f"{self.shipment.tracking_number} - {self.status} at {self.timestamp}"
\ No newline at end of file
+        return f"{self.shipment.tracking_number} - {self.status} at {self.timestamp}"
+
+class OutboxStatus(models.TextChoices):
+    PENDING = 'PENDING', 'Pending'
+    PROCESSING = 'PROCESSING', 'Processing'
+    FAILED = 'FAILED', 'Failed'
+
+class OutboxMessage(models.Model):
+    """A call to another service, stored with the change it reports
+
+    Written in the same transaction as that change and delivered by the
+    outbox relay (see outbox.py); delivered messages are deleted.
+    """
+    service = models.CharField(max_length=50)  # Key in settings.MICROSERVICE_URLS
+    path = models.CharField(max_length=255)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    key = models.CharField(max_length=100, blank=True)  # Messages sharing a key are delivered in order
+    status = models.CharField(
+        max_length=20,
+        choices=OutboxStatus.choices,
+        default=OutboxStatus.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)  # Not sent before this (retry backoff)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=64, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+            models.Index(fields=['key', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"{self.service}{self.path} ({self.status})"
@@ -1,3 +1,107 @@
+from datetime import timedelta
+from unittest import mock
+
+import requests
+from django.db import OperationalError
 from django.test import TestCase
+from django.utils import timezone
+
+from . import outbox
+from .models import OutboxMessage, OutboxStatus
+
+
+class OutboxTests(TestCase):
+    def _enqueue(self, key=''):
+        return outbox.enqueue('ORDER_SERVICE', '/orders/1/update/', {'status': 'X'}, key=key)
+
+    def _relay(self, messages, status_code=200, error=None):
+        response = mock.Mock(status_code=status_code)
+        response.raise_for_status.side_effect = requests.HTTPError(str(status_code))
+        with mock.patch.object(outbox, 'get_client') as get_client:
+            get_client.return_value.post.side_effect = error
+            get_client.return_value.post.return_value = response
+            return outbox.relay_messages(messages)
+
+    def test_claimed_messages_are_not_claimed_again(self):
+        first, second, third = (self._enqueue() for _ in range(3))
+
+        claimed = outbox.claim_messages(2, 'relay-1')
+        rest = outbox.claim_messages(10, 'relay-2')
+
+        self.assertEqual([m.id for m in claimed], [first.id, second.id])
+        self.assertEqual([m.id for m in rest], [third.id])
+        self.assertTrue(all(m.status == OutboxStatus.PROCESSING and m.attempts == 1 for m in claimed))
+        self.assertEqual(outbox.claim_messages(10, 'relay-3'), [])
+
+    def test_stale_claim_is_taken_over(self):
+        message = self._enqueue()
+        outbox.claim_messages(10, 'relay-1')
+        OutboxMessage.objects.filter(id=message.id).update(locked_at=timezone.now() - timedelta(minutes=5))
+
+        claimed = outbox.claim_messages(10, 'relay-2')
+
+        self.assertEqual([m.id for m in claimed], [message.id])
+        self.assertEqual(claimed[0].attempts, 2)
+
+    def test_messages_with_the_same_key_are_delivered_in_order(self):
+        first = self._enqueue(key='order-1')
+        second = self._enqueue(key='order-1')
+        other = self._enqueue(key='order-2')
+
+        claimed = outbox.claim_messages(10, 'relay-1')
+        # The second message waits until the first is delivered
+        self.assertEqual([m.id for m in claimed], [first.id, other.id])
+        self.assertEqual(self._relay(claimed), 2)
+
+        claimed = outbox.claim_messages(10, 'relay-1')
+        self.assertEqual([m.id for m in claimed], [second.id])
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        message = self._enqueue(key='order-1')
+        waiting = self._enqueue(key='order-1')
+        before = timezone.now()
+
+        self._relay(outbox.claim_messages(10, 'relay-1'), error=requests.ConnectionError('down'))
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxStatus.PENDING)
+        self.assertEqual(message.locked_by, '')
+        self.assertIn('down', message.last_error)
+        # RETRY_BACKOFF seconds after the first attempt, and its key stays blocked
+        self.assertGreaterEqual(message.available_at, before + timedelta(seconds=outbox._config('RETRY_BACKOFF', 5)))
+        self.assertEqual(outbox.claim_messages(10, 'relay-1'), [])
+
+        OutboxMessage.objects.filter(id=message.id).update(available_at=timezone.now(), attempts=30)
+        self._relay(outbox.claim_messages(10, 'relay-1'), status_code=503)
+
+        message.refresh_from_db()
+        self.assertLessEqual(
+            message.available_at, timezone.now() + timedelta(seconds=outbox._config('MAX_BACKOFF', 3600))
+        )
+        self.assertEqual(OutboxMessage.objects.get(id=waiting.id).attempts, 0)
+
+    def test_rejected_message_is_kept_as_failed_and_unblocks_its_key(self):
+        message = self._enqueue(key='order-1')
+        waiting = self._enqueue(key='order-1')
+
+        self.assertEqual(self._relay(outbox.claim_messages(10, 'relay-1'), status_code=400), 0)
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, OutboxStatus.FAILED)
+        self.assertEqual([m.id for m in outbox.claim_messages(10, 'relay-1')], [waiting.id])
+
+    def test_relay_survives_a_failed_poll(self):
+        relay = outbox.OutboxRelay(batch_size=10, poll_interval=0.01, once=True)
+        polls = []
+
+        def claim(*args):
+            polls.append(args)
+            if len(polls) == 1:
+                raise OperationalError('database is locked')
+            return []
+
+        with mock.patch.object(outbox, 'claim_messages', side_effect=claim), \
+                mock.patch.object(outbox, 'close_old_connections'):
+            relay.run()
 
-# Create your tests here.
+        self.assertEqual(len(polls), 2)
@@ -1,9 +1,8 @@
-import requests
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from django.conf import settings
 from django.utils import timezone
 import random
 
@@ -13,6 +12,7 @@ from .serializers import (
     UpdateShipmentStatusSerializer, ProcessShipmentSerializer, 
     DeliverShipmentSerializer, ShipmentUpdateSerializer
 )
+from . import outbox
 
 class ShipmentViewSet(viewsets.ModelViewSet):
     queryset = Shipment.objects.all().order_by('-created_at')
@@ -67,24 +67,21 @@ class ShipmentViewSet(viewsets.ModelViewSet):
             if new_status == ShipmentStatus.DELIVERED:
                 shipment.actual_delivery = timezone.now()
             
-            shipment.save()
-            
-            # Create status update record
-            update = ShipmentUpdate.objects.create(
-                shipment=shipment,
-                status=new_status,
-                location=location,
-                description=description or f"Status changed from {old_status} to {new_status}"
-            )
-            
-            # Notify order service about status change if needed
-            try:
+            with transaction.atomic():
+                shipment.save()
+                
+                # Create status update record
+                update = ShipmentUpdate.objects.create(
+                    shipment=shipment,
+                    status=new_status,
+                    location=location,
+                    description=description or f"Status changed from {old_status} to {new_status}"
+                )
+                
+                # Notify order service about status change if needed
                 if new_status in [ShipmentStatus.IN_TRANSIT, ShipmentStatus.DELIVERED, 
                                  ShipmentStatus.RETURNED, ShipmentStatus.CANCELLED]:
                     self._notify_order_service(shipment)
-            except requests.RequestException:
-                # Log error but don't fail the request
-                pass
             
             # Return updated shipment
             serializer = self.get_serializer(shipment)
@@ -139,21 +136,18 @@ class ShipmentViewSet(viewsets.ModelViewSet):
             shipment.status = ShipmentStatus.IN_TRANSIT
             shipment.shipping_date = timezone.now()
             shipment.estimated_delivery = shipment._calculate_estimated_delivery()
-            shipment.save()
-            
-            # Create status update
-            ShipmentUpdate.objects.create(
-                shipment=shipment,
-                status=ShipmentStatus.IN_TRANSIT,
-                description="Shipment has been picked up by the carrier"
-            )
-            
-            # Notify order service
-            try:
+            with transaction.atomic():
+                shipment.save()
+                
+                # Create status update
+                ShipmentUpdate.objects.create(
+                    shipment=shipment,
+                    status=ShipmentStatus.IN_TRANSIT,
+                    description="Shipment has been picked up by the carrier"
+                )
+                
+                # Notify order service
                 self._notify_order_service(shipment)
-            except requests.RequestException:
-                # Log error but don't fail the request
-                pass
             
             # Return updated shipment
             serializer = self.get_serializer(shipment)
@@ -178,25 +172,21 @@ class ShipmentViewSet(viewsets.ModelViewSet):
             # Update status to DELIVERED
             shipment.status = ShipmentStatus.DELIVERED
             shipment.actual_delivery = timezone.now()
-            shipment.save()
-            
             # Create status update
             description = "Shipment has been delivered successfully"
             if proof:
                 description += f" (Proof: {proof})"
-                
-            ShipmentUpdate.objects.create(
-                shipment=shipment,
-                status=ShipmentStatus.DELIVERED,
-                description=description
-            )
             
-            # Notify order service
-            try:
+            with transaction.atomic():
+                shipment.save()
+                ShipmentUpdate.objects.create(
+                    shipment=shipment,
+                    status=ShipmentStatus.DELIVERED,
+                    description=description
+                )
+                
+                # Notify order service
                 self._notify_order_service(shipment)
-            except requests.RequestException:
-                # Log error but don't fail the request
-                pass
             
             # Return updated shipment
             serializer = self.get_serializer(shipment)
@@ -231,9 +221,11 @@ class ShipmentViewSet(viewsets.ModelViewSet):
         return Response(response_data)
     
     def _notify_order_service(self, shipment):
-        """Notify order service about shipment status changes"""
-        url = f"{settings.MICROSERVICE_URLS['ORDER_SERVICE']}/orders/{shipment.order_id}/update_shipment/"
+        """Queue a notification to order service about a shipment status change
         
+        Must run inside the transaction that saved the shipment; the outbox
+        relay delivers it once that transaction commits.
+        """
         data = {
             'status': shipment.status,
             'tracking_number': shipment.tracking_number,
@@ -244,8 +236,9 @@ class ShipmentViewSet(viewsets.ModelViewSet):
             'tracking_url': shipment.get_tracking_url()
         }
         
-        response = requests.post(url, json=data)
-        return response.status_code == 200
+        return outbox.enqueue(
+            'ORDER_SERVICE', f"/orders/{shipment.order_id}/update_shipment/", data, key=shipment.order_id
+        )
     
     def _generate_simulated_updates(self, shipment):
         """Generate simulated updates for demo purposes"""